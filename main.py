@@ -100,6 +100,7 @@ from modules.shell_engine import ShellEngine
 import modules.category_manager
 import modules.ai_handler
 import modules.ollama_manager
+import modules.ollama_scheduler
 from modules.category_manager import (
     init_category_manager,
     CATEGORY_MAP as CM_CATEGORY_MAP, CATEGORY_DESCRIPTIONS as CM_CATEGORY_DESCRIPTIONS
@@ -107,6 +108,7 @@ from modules.category_manager import (
 from modules.ui_manager import UIManager
 from modules.curses_ui_manager import CursesUIManager
 from modules.embedding_manager import EmbeddingManager
+from modules.router_tools import get_all_tools
 
 app_instance = None
 ui_manager_instance = None
@@ -140,6 +142,8 @@ def normal_input_accept_handler(buff):
         logger.info("Input submission is from edit mode context.")
 
     async def _handle_input():
+        # New input supersedes model calls still working on the previous one (translation, routing, ...).
+        modules.ollama_scheduler.get_scheduler().cancel_group(modules.ollama_scheduler.GROUP_INTERACTIVE)
         command_lock_timeout = config.get('timeouts', {}).get('command_lock_timeout_seconds', 15.0)
         
         try:
@@ -502,18 +506,25 @@ async def main_async_runner():
         else:
             ui_manager_instance.append_output("✅ Ollama service is active and ready.", style_class='success')
             logger.info("Ollama service is active.")
+            shell_engine_instance.ollama_manager_module.start_model_warmup(config)
             embedding_manager_instance = EmbeddingManager(config)
             embedding_manager_instance.initialize()
+            embedding_manager_instance.start_tool_index_build(get_all_tools())
             shell_engine_instance.embedding_manager_instance = embedding_manager_instance
     else:
         # In quiet mode, we still need to check for the service, but we don't print messages.
         ollama_service_ready = await shell_engine_instance.ollama_manager_module.is_ollama_server_running()
         if ollama_service_ready:
+            shell_engine_instance.ollama_manager_module.start_model_warmup(config)
             embedding_manager_instance = EmbeddingManager(config)
             embedding_manager_instance.initialize()
+            embedding_manager_instance.start_tool_index_build(get_all_tools())
             shell_engine_instance.embedding_manager_instance = embedding_manager_instance
 
 
+    # Keep the cached Ollama health state fresh so per-input checks are O(1).
+    shell_engine_instance.ollama_manager_module.start_health_heartbeat(config)
+
     init_category_manager(SCRIPT_DIR, CONFIG_DIR, ui_manager_instance.append_output)
 
     history = FileHistory(HISTORY_FILE_PATH)
@@ -571,6 +582,9 @@ async def main_async_runner():
         kwargs_for_ui_init["shell_engine_instance"] = shell_engine_instance
 
     layout_or_stdscr = ui_manager_instance.initialize_ui_elements(**kwargs_for_ui_init)
+
+    # Build the router agent off the startup path; it is ready by the time the UI is interactive.
+    shell_engine_instance.start_router_agent_warmup()
     # --- FIX END ---
 
     # --- FIX START: Conditional Application Execution ---
@@ -609,6 +623,9 @@ async def main_async_runner():
         await app_instance.run_async()
     # --- FIX END ---
 
+    shell_engine_instance.ollama_manager_module.stop_model_warmup()
+    shell_engine_instance.ollama_manager_module.stop_health_heartbeat()
+    await shell_engine_instance.shutdown()
     logger.info("micro_X Shell application run_async completed.")
 
 
@@ -1,8 +1,13 @@
 # modules/ai_handler.py
 
+import asyncio
 import logging
+import re
+from modules import man_index
+from modules.security_patterns import get_dangerous_pattern_matcher
 from modules.lc_agent import run_agent as run_lc_agent
 from utils.lc_explainer import get_ai_explanation as get_lc_explanation
+from utils.lc_explainer import stream_ai_explanation as stream_lc_explanation
 
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
@@ -22,6 +27,9 @@ async def get_validated_ai_command(human_query: str, config_param: dict, append_
     Returns:
         tuple[str | None, str | None]: A tuple containing the validated command
         and the raw AI response from the agent's final step.
+
+    Raises:
+        OllamaRequestCancelled: If new input was submitted while the agent was working.
     """
     logger.info(f"Delegating validated translation for: '{human_query}' to LangGraph agent.")
     
@@ -35,9 +43,35 @@ async def get_validated_ai_command(human_query: str, config_param: dict, append_
         
     return validated_command, raw_response
 
+def _needs_danger_warning(command: str, config_param: dict) -> bool:
+    """Returns True if the command matches a dangerous pattern or uses a 'warn_on_commands' entry.
+
+    Such commands are explained by the LLM, whose prompt asks it to flag the danger;
+    the local index would only list what the flags do.
+    """
+    if get_dangerous_pattern_matcher(config_param).match(command):
+        return True
+    warn_on_commands = set(config_param.get("security", {}).get("warn_on_commands", []))
+    return any(word in warn_on_commands for word in re.split(r"[\s|;&()]+", command))
+
+async def _explain_locally(command_to_explain: str, config_param: dict) -> str | None:
+    """Returns an explanation from the local man index, or None if the LLM should explain the command."""
+    if _needs_danger_warning(command_to_explain, config_param):
+        logger.info(f"Not explaining '{command_to_explain}' from the man index: it needs a danger warning.")
+        return None
+    # Building an index entry may run `man`/`--help` once per command, so keep it off the event loop.
+    local_explanation = await asyncio.to_thread(man_index.explain_command, command_to_explain, config_param)
+    if local_explanation:
+        logger.info(f"Explained '{command_to_explain}' from the local man index.")
+    return local_explanation
+
 async def explain_linux_command_with_ai(command_to_explain: str, config_param: dict, append_output_func) -> str | None:
     """
-    Wrapper that calls the LangChain-based explanation utility.
+    Explains a command, preferring the local man-page/--help index over the LLM.
+
+    The LangChain-based explainer is only called when the index cannot cover the
+    command (unknown commands or flags, redirections, command lists, ...) or when
+    the command is dangerous and the explanation must warn about it.
 
     Args:
         command_to_explain: The command string to be explained.
@@ -48,5 +82,30 @@ async def explain_linux_command_with_ai(command_to_explain: str, config_param: d
         The AI-generated explanation as a string, or a fallback
         message/None on error.
     """
-    # This function now delegates to the LangChain implementation.
-    return await get_lc_explanation(command_to_explain, config_param)
\ No newline at end of file
+    local_explanation = await _explain_locally(command_to_explain, config_param)
+    if local_explanation:
+        return local_explanation
+
+    return await get_lc_explanation(command_to_explain, config_param)
+
+async def stream_explanation_with_ai(command_to_explain: str, config_param: dict, on_chunk) -> str | None:
+    """
+    Streaming counterpart of explain_linux_command_with_ai().
+
+    A local man-index explanation is delivered as a single chunk; otherwise the
+    LLM explanation is passed to on_chunk piece by piece as it is generated.
+
+    Args:
+        command_to_explain: The command string to be explained.
+        config_param: The main application configuration object.
+        on_chunk: Callable receiving each new piece of explanation text.
+
+    Returns:
+        The complete explanation, or None if it was cancelled.
+    """
+    local_explanation = await _explain_locally(command_to_explain, config_param)
+    if local_explanation:
+        on_chunk(local_explanation)
+        return local_explanation
+
+    return await stream_lc_explanation(command_to_explain, config_param, on_chunk)
@@ -1,10 +1,14 @@
 # modules/category_manager.py
 
 import os
+import re
 import sys
 import json
+import fcntl
 import shlex
+import fnmatch
 import logging
+import contextlib
 
 # --- New Import ---
 from modules import config_handler
@@ -20,11 +24,15 @@ _append_output_func_ref = None # Reference to main.append_output
 # --- Constants to be used by this module and potentially imported by main.py ---
 DEFAULT_CATEGORY_FILENAME = "default_command_categories.json"
 USER_CATEGORY_FILENAME = "user_command_categories.json"
+USER_CATEGORY_JOURNAL_FILENAME = "user_command_categories.journal.jsonl"
+# Journal entries after which the journal is folded into the user category file.
+JOURNAL_COMPACTION_THRESHOLD = 200
 UNKNOWN_CATEGORY_SENTINEL = "##UNKNOWN_CATEGORY##"
 
 # --- Path variables, constructed during initialization ---
 DEFAULT_CATEGORY_FILE_PATH = None
 USER_CATEGORY_FILE_PATH = None
+USER_CATEGORY_JOURNAL_FILE_PATH = None
 
 # --- Core category data structures ---
 # These can be imported by main.py for display or logic if needed
@@ -38,6 +46,27 @@ CATEGORY_DESCRIPTIONS = {
     "interactive_tui": "Full interactive tmux session"
 }
 _CURRENTLY_LOADED_CATEGORIES = {} # Internal cache for merged categories
+# Hash indexes (command -> category) for O(1) classification. _COMMAND_INDEX describes
+# the _CURRENTLY_LOADED_CATEGORIES object in _INDEXED_CATEGORIES and is rebuilt if that
+# dict is replaced; _DEFAULT_COMMAND_INDEX covers the default categories alone.
+# _RULE_MATCHER holds the compiled category rules (see CategoryRuleMatcher).
+_COMMAND_INDEX = {}
+_INDEXED_CATEGORIES = None
+_DEFAULT_COMMAND_INDEX = {}
+_RULE_MATCHER = None
+# The user's own categorizations (command -> category), i.e. the user file with the
+# change journal replayed on top, and the number of entries currently in the journal.
+_USER_ASSIGNMENTS = None
+_JOURNAL_ENTRY_COUNT = 0
+
+# --- Category rules ---
+# Besides exact command strings, category lists may contain rules, written as
+# "<kind>:<body>". From most to least specific (exact commands always win):
+RULE_PREFIX = "prefix" # "prefix:git log"   - the command's arguments start with these words
+RULE_GLOB = "glob"     # "glob:docker * ps" - shell-style wildcard match of the whole command
+RULE_REGEX = "re"      # "re:^make( |$)"     - regular expression search in the command
+RULE_BASE = "base"     # "base:vim"          - the program name (first word, without its path)
+RULE_KINDS = (RULE_PREFIX, RULE_GLOB, RULE_REGEX, RULE_BASE)
 
 
 def init_category_manager(script_dir_path: str, config_dir_name: str, append_output_func_ref):
@@ -53,7 +82,7 @@ def init_category_manager(script_dir_path: str, config_dir_name: str, append_out
                                            to display messages to the user.
     """
     global _SCRIPT_DIR_PATH, _CONFIG_DIR_NAME_CONST, _append_output_func_ref
-    global DEFAULT_CATEGORY_FILE_PATH, USER_CATEGORY_FILE_PATH
+    global DEFAULT_CATEGORY_FILE_PATH, USER_CATEGORY_FILE_PATH, USER_CATEGORY_JOURNAL_FILE_PATH
 
     _SCRIPT_DIR_PATH = script_dir_path
     _CONFIG_DIR_NAME_CONST = config_dir_name
@@ -63,6 +92,7 @@ def init_category_manager(script_dir_path: str, config_dir_name: str, append_out
     config_path_base = os.path.join(_SCRIPT_DIR_PATH, _CONFIG_DIR_NAME_CONST)
     DEFAULT_CATEGORY_FILE_PATH = os.path.join(config_path_base, DEFAULT_CATEGORY_FILENAME)
     USER_CATEGORY_FILE_PATH = os.path.join(config_path_base, USER_CATEGORY_FILENAME)
+    USER_CATEGORY_JOURNAL_FILE_PATH = os.path.join(config_path_base, USER_CATEGORY_JOURNAL_FILENAME)
 
     logger.info(f"Category manager initialized. Default categories: {DEFAULT_CATEGORY_FILE_PATH}, User categories: {USER_CATEGORY_FILE_PATH}")
     load_and_merge_command_categories() # Perform initial load
@@ -92,9 +122,263 @@ def _load_single_category_file(file_path: str) -> dict:
     return categories
 
 
+def parse_category_rule(entry: str) -> tuple[str, str] | None:
+    """Returns (kind, body) if a category entry is a rule such as "prefix:git log", else None."""
+    kind, separator, body = entry.partition(":")
+    if separator and kind in RULE_KINDS and body.strip():
+        return kind, body.strip()
+    return None
+
+
+def _split_command_words(cmd: str) -> list[str]:
+    try:
+        return shlex.split(cmd)
+    except ValueError:
+        return cmd.split()
+
+
+class CategoryRuleMatcher:
+    """Classifies commands with the prefix, glob, regex and base rules found in the categories.
+
+    Rules are compiled once: prefixes into a dict keyed by word tuples (checked
+    longest first), globs into one anchored alternation ordered by specificity
+    (most literal characters first), regexes individually (in list order), and
+    program names into a dict. A more specific kind always beats a less specific
+    one; invalid rules are logged and skipped.
+    """
+
+    def __init__(self, categories: dict):
+        self._prefixes = {}
+        self._max_prefix_words = 0
+        self._bases = {}
+        self._regexes = []
+        globs = []
+        for category_name, entries in categories.items():
+            for entry in entries:
+                rule = parse_category_rule(entry)
+                if rule is None:
+                    continue
+                kind, body = rule
+                if kind == RULE_PREFIX:
+                    words = tuple(_split_command_words(body))
+                    self._prefixes.setdefault(words, category_name)
+                    self._max_prefix_words = max(self._max_prefix_words, len(words))
+                elif kind == RULE_BASE:
+                    self._bases.setdefault(os.path.basename(body), category_name)
+                elif kind == RULE_GLOB:
+                    globs.append((body, category_name))
+                else:
+                    try:
+                        self._regexes.append((re.compile(body), category_name))
+                    except re.error as e:
+                        logger.warning(f"Ignoring invalid category rule '{entry}': {e}")
+
+        # Sort globs by literal (non-wildcard) length so e.g. 'git log *' beats 'git *'.
+        globs.sort(key=lambda glob: len(re.sub(r"[*?\[\]]", "", glob[0])), reverse=True)
+        self._glob_categories = [category_name for _, category_name in globs]
+        self._globs = None
+        if globs:
+            self._globs = re.compile("|".join(f"(?P<g{i}>{fnmatch.translate(body)})" for i, (body, _) in enumerate(globs)))
+        self.rule_count = len(self._prefixes) + len(self._bases) + len(globs) + len(self._regexes)
+
+    def classify(self, cmd: str) -> str | None:
+        """Returns the category of the most specific rule matching cmd, or None."""
+        if not self.rule_count:
+            return None
+        words = _split_command_words(cmd)
+        for length in range(min(len(words), self._max_prefix_words), 0, -1):
+            category_name = self._prefixes.get(tuple(words[:length]))
+            if category_name is not None:
+                return category_name
+        if self._globs is not None:
+            found = self._globs.match(cmd.strip())
+            if found:
+                return self._glob_categories[int(found.lastgroup[1:])]
+        for pattern, category_name in self._regexes:
+            if pattern.search(cmd):
+                return category_name
+        if words:
+            return self._bases.get(os.path.basename(words[0]))
+        return None
+
+
+def _build_command_index(categories: dict) -> dict:
+    """Maps each command to its category; a command listed twice keeps its first category. Rules are left out."""
+    index = {}
+    for category_name, commands in categories.items():
+        for cmd in commands:
+            if parse_category_rule(cmd) is None:
+                index.setdefault(cmd, category_name)
+    return index
+
+
+def _get_command_index() -> dict:
+    """Returns the index for _CURRENTLY_LOADED_CATEGORIES, rebuilding it (and the rules) if that dict was replaced."""
+    global _COMMAND_INDEX, _INDEXED_CATEGORIES, _RULE_MATCHER
+    if _INDEXED_CATEGORIES is not _CURRENTLY_LOADED_CATEGORIES:
+        _COMMAND_INDEX = _build_command_index(_CURRENTLY_LOADED_CATEGORIES)
+        _INDEXED_CATEGORIES = _CURRENTLY_LOADED_CATEGORIES
+        _RULE_MATCHER = None
+    return _COMMAND_INDEX
+
+
+def _get_rule_matcher() -> CategoryRuleMatcher:
+    """Returns the compiled rules of _CURRENTLY_LOADED_CATEGORIES, compiling them on first use."""
+    global _RULE_MATCHER
+    _get_command_index()
+    if _RULE_MATCHER is None:
+        _RULE_MATCHER = CategoryRuleMatcher(_CURRENTLY_LOADED_CATEGORIES)
+        logger.debug(f"Compiled {_RULE_MATCHER.rule_count} category rules.")
+    return _RULE_MATCHER
+
+
+def _set_loaded_command_category(cmd: str, category_name: str | None):
+    """Moves a command or rule to a category (or out of all of them, for None) in the merged view and its index."""
+    global _RULE_MATCHER
+    index = _get_command_index()
+    is_rule = parse_category_rule(cmd) is not None
+    if is_rule:
+        # Rules are not indexed (and are few), so look for the list holding one.
+        old_category_name = next((name for name, entries in _CURRENTLY_LOADED_CATEGORIES.items() if cmd in entries), None)
+        _RULE_MATCHER = None # Recompiled on next use
+    else:
+        old_category_name = index.pop(cmd, None)
+    if old_category_name is not None:
+        commands = _CURRENTLY_LOADED_CATEGORIES.get(old_category_name, [])
+        if cmd in commands:
+            commands.remove(cmd)
+    if category_name is not None:
+        _CURRENTLY_LOADED_CATEGORIES.setdefault(category_name, []).append(cmd)
+        if not is_rule:
+            index[cmd] = category_name
+
+
+def _read_user_category_journal() -> list[dict]:
+    """Returns the valid entries of the user category journal, oldest first.
+
+    Each line is {"op": "set", "command": ..., "category": ...} or
+    {"op": "remove", "command": ...}. A damaged line (e.g. the last one after a
+    crash mid-append) is skipped.
+    """
+    entries = []
+    if not USER_CATEGORY_JOURNAL_FILE_PATH:
+        return entries
+    try:
+        with open(USER_CATEGORY_JOURNAL_FILE_PATH, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    valid = (isinstance(entry, dict) and isinstance(entry.get("command"), str) and
+                             (entry.get("op") == "remove" or
+                              (entry.get("op") == "set" and entry.get("category") in CATEGORY_DESCRIPTIONS)))
+                except ValueError:
+                    valid = False
+                if valid:
+                    entries.append(entry)
+                elif line.strip():
+                    logger.warning(f"Skipping invalid line {line_number} in {USER_CATEGORY_JOURNAL_FILE_PATH}")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Could not read user category journal {USER_CATEGORY_JOURNAL_FILE_PATH}: {e}")
+    return entries
+
+
+def _load_user_category_assignments() -> tuple[dict, int]:
+    """Reads the user category file and replays the journal on top.
+
+    Returns:
+        (command -> category, number of journal entries). Each command is assigned
+        to the last category it was given; insertion order is the order in which
+        the commands end up in their categories.
+    """
+    assignments = {}
+    for category_name, user_cmds_in_category in _load_single_category_file(USER_CATEGORY_FILE_PATH).items():
+        for user_cmd in user_cmds_in_category:
+            assignments.pop(user_cmd, None)
+            assignments[user_cmd] = category_name
+    journal = _read_user_category_journal()
+    for entry in journal:
+        assignments.pop(entry["command"], None)
+        if entry["op"] == "set":
+            assignments[entry["command"]] = entry["category"]
+    return assignments, len(journal)
+
+
+def _user_categories_from_assignments(assignments: dict) -> dict:
+    user_categories = {cat_name: [] for cat_name in sorted(set(CATEGORY_MAP.values()))}
+    for cmd, category_name in assignments.items():
+        user_categories[category_name].append(cmd)
+    return user_categories
+
+
+@contextlib.contextmanager
+def _user_category_journal_lock(exclusive: bool):
+    """Holds an flock on '<journal>.lock': shared while appending, exclusive while compacting.
+
+    The lock lives in a separate file because compaction removes the journal itself.
+    """
+    os.makedirs(os.path.dirname(USER_CATEGORY_JOURNAL_FILE_PATH), exist_ok=True)
+    with open(f"{USER_CATEGORY_JOURNAL_FILE_PATH}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _compact_user_category_journal() -> bool:
+    """Folds the journal into the user category file (written atomically), then empties the journal.
+
+    The state is re-read from disk right before writing, so changes journaled by
+    another micro_X process are kept, and the journal lock is held exclusively from
+    that read until the journal is removed, so no append can slip in between and be
+    lost. A crash before the journal is removed is harmless: replaying it over the
+    compacted file yields the same categories.
+    """
+    global _JOURNAL_ENTRY_COUNT
+    try:
+        with _user_category_journal_lock(exclusive=True):
+            assignments, _ = _load_user_category_assignments()
+            if not _save_user_command_categories(_user_categories_from_assignments(assignments)):
+                return False
+            try:
+                os.remove(USER_CATEGORY_JOURNAL_FILE_PATH)
+            except FileNotFoundError:
+                pass
+    except OSError as e:
+        logger.error(f"Could not compact user category journal {USER_CATEGORY_JOURNAL_FILE_PATH}: {e}")
+        return False
+    _JOURNAL_ENTRY_COUNT = 0
+    logger.info(f"Compacted user category journal into {USER_CATEGORY_FILE_PATH}")
+    return True
+
+
+def _append_user_category_journal(entry: dict) -> bool:
+    """Appends one change to the journal (flushed to disk); compacts it once it gets long. Returns True on success."""
+    global _JOURNAL_ENTRY_COUNT
+    if USER_CATEGORY_JOURNAL_FILE_PATH is None:
+        logger.error("User category path not initialized. Cannot save.")
+        if _append_output_func_ref:
+            _append_output_func_ref("❌ Error: User category path not configured.", style_class='error')
+        return False
+    try:
+        with _user_category_journal_lock(exclusive=False), open(USER_CATEGORY_JOURNAL_FILE_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    except OSError as e:
+        logger.error(f"Failed to append to user category journal {USER_CATEGORY_JOURNAL_FILE_PATH}: {e}")
+        if _append_output_func_ref:
+            _append_output_func_ref("❌ Error saving user categories.", style_class='error')
+        return False
+    _JOURNAL_ENTRY_COUNT += 1
+    if _JOURNAL_ENTRY_COUNT >= JOURNAL_COMPACTION_THRESHOLD:
+        _compact_user_category_journal()
+    return True
+
+
 def load_and_merge_command_categories():
-    """Loads default and user categories, merges them, and updates the internal cache."""
-    global _CURRENTLY_LOADED_CATEGORIES
+    """Loads default and user categories (including journaled changes), merges them, and updates the internal cache."""
+    global _CURRENTLY_LOADED_CATEGORIES, _COMMAND_INDEX, _INDEXED_CATEGORIES, _DEFAULT_COMMAND_INDEX, _RULE_MATCHER
+    global _USER_ASSIGNMENTS, _JOURNAL_ENTRY_COUNT
     if DEFAULT_CATEGORY_FILE_PATH is None or USER_CATEGORY_FILE_PATH is None:
         logger.error("Category paths not initialized. Call init_category_manager first.")
         return
@@ -110,35 +394,32 @@ def load_and_merge_command_categories():
         else:
             logger.error(f"Could not create empty {DEFAULT_CATEGORY_FILENAME} at {DEFAULT_CATEGORY_FILE_PATH}")
 
-    user_categories = _load_single_category_file(USER_CATEGORY_FILE_PATH)
-    
-    # Start with a deep copy of default categories
-    merged_categories = {k: list(v) for k, v in default_categories.items()} 
-    
-    # Merge user categories, ensuring user's choice overrides default and removes duplicates
-    for category_name, user_cmds_in_category in user_categories.items():
-        if category_name not in merged_categories:
-            merged_categories[category_name] = [] 
-        
-        for user_cmd in user_cmds_in_category:
-            # Remove command from any other category in merged_categories
-            for cat_list_to_check in merged_categories.values(): 
-                if user_cmd in cat_list_to_check:
-                    cat_list_to_check.remove(user_cmd)
-            
-            # Add to the target category
-            if user_cmd not in merged_categories[category_name]: 
-                merged_categories[category_name].append(user_cmd)
-                
+    user_assignments, _JOURNAL_ENTRY_COUNT = _load_user_category_assignments()
+    _USER_ASSIGNMENTS = user_assignments
+    if _JOURNAL_ENTRY_COUNT >= JOURNAL_COMPACTION_THRESHOLD:
+        _compact_user_category_journal()
+
+    # The user's choice overrides the defaults: drop user commands from the default lists, then append them.
+    merged_categories = {k: [cmd for cmd in v if cmd not in user_assignments] for k, v in default_categories.items()}
+    for category_name in set(CATEGORY_MAP.values()):
+        merged_categories.setdefault(category_name, [])
+    for user_cmd, category_name in user_assignments.items():
+        merged_categories[category_name].append(user_cmd)
+
     _CURRENTLY_LOADED_CATEGORIES = merged_categories
+    _COMMAND_INDEX = _build_command_index(merged_categories)
+    _INDEXED_CATEGORIES = merged_categories
+    _RULE_MATCHER = None
+    _DEFAULT_COMMAND_INDEX = _build_command_index(default_categories)
     logger.info("Default and user command categories have been loaded and merged.")
 
 
 def classify_command(cmd: str) -> str:
     """Classifies a given command string based on the loaded categories.
 
-    Returns the category name (e.g., "simple") if found, otherwise returns
-    the UNKNOWN_CATEGORY_SENTINEL.
+    Exact command entries are looked up first; otherwise the most specific
+    matching category rule (prefix, glob, regex, then base) decides. Returns the
+    category name (e.g., "simple") if found, otherwise the UNKNOWN_CATEGORY_SENTINEL.
 
     Args:
         cmd: The full command string to classify.
@@ -155,35 +436,58 @@ def classify_command(cmd: str) -> str:
             
     if not cmd:
         return UNKNOWN_CATEGORY_SENTINEL
-        
-    for category_name, full_commands_in_category in _CURRENTLY_LOADED_CATEGORIES.items():
-        if cmd in full_commands_in_category:
-            return category_name
-            
-    return UNKNOWN_CATEGORY_SENTINEL
 
+    category_name = _get_command_index().get(cmd)
+    if category_name is None:
+        category_name = _get_rule_matcher().classify(cmd)
+    return category_name or UNKNOWN_CATEGORY_SENTINEL
 
-def _save_user_command_categories(user_data: dict):
-    """Saves data to the user command categories JSON file using config_handler."""
+
+def _save_user_command_categories(user_data: dict) -> bool:
+    """Saves data to the user command categories JSON file using config_handler. Returns True on success."""
     if USER_CATEGORY_FILE_PATH is None:
         logger.error("User category path not initialized. Cannot save.")
         if _append_output_func_ref:
             _append_output_func_ref("❌ Error: User category path not configured.", style_class='error')
-        return
+        return False
 
-    if not config_handler.save_json_file(USER_CATEGORY_FILE_PATH, user_data):
+    if not config_handler.save_json_file_atomic(USER_CATEGORY_FILE_PATH, user_data):
         logger.error(f"Failed to save user categories to {USER_CATEGORY_FILE_PATH} via config_handler.")
         if _append_output_func_ref:
             _append_output_func_ref("❌ Error saving user categories.", style_class='error')
-    else:
-        logger.info(f"User command categories saved to {USER_CATEGORY_FILE_PATH}")
+        return False
+    logger.info(f"User command categories saved to {USER_CATEGORY_FILE_PATH}")
+    return True
+
+
+def _get_user_assignments() -> dict:
+    """Returns the user's categorizations (command -> category), loading them if needed."""
+    if _USER_ASSIGNMENTS is None:
+        load_and_merge_command_categories()
+    return _USER_ASSIGNMENTS if _USER_ASSIGNMENTS is not None else {}
+
+
+def _apply_user_category_change(cmd: str, category_name: str | None):
+    """Reflects a journaled user change in the loaded categories without re-reading any files.
+
+    category_name None means the user entry was removed, so the command falls back to
+    its default category (if any).
+    """
+    if not _CURRENTLY_LOADED_CATEGORIES:
+        load_and_merge_command_categories()
+        return
+    if category_name is None:
+        category_name = _DEFAULT_COMMAND_INDEX.get(cmd)
+    _set_loaded_command_category(cmd, category_name)
 
 
 def add_command_to_category(full_cmd_to_add: str, category_input: str):
     """Adds a command to a specified category in the user's configuration file.
 
-    This function handles saving the change to user_command_categories.json and
-    then re-merging all categories to reflect the change immediately.
+    The change is appended to the user category journal (folded into
+    user_command_categories.json from time to time), and the merged categories
+    and their index are updated in place, so the cost does not grow with the
+    number of saved commands.
 
     Args:
         full_cmd_to_add: The command string to add or update.
@@ -203,25 +507,19 @@ def add_command_to_category(full_cmd_to_add: str, category_input: str):
         logger.warning(f"Invalid category specified for adding command: {category_input}")
         return 
 
-    user_categories = _load_single_category_file(USER_CATEGORY_FILE_PATH)
-    cmd_found_in_user_file_old_cat = None
-
-    for cat_name, cmds_list in user_categories.items(): 
-        if full_cmd_to_add in cmds_list:
-            if cat_name != target_category_name:
-                cmds_list.remove(full_cmd_to_add)
-                cmd_found_in_user_file_old_cat = cat_name
-            else:
-                if _append_output_func_ref: _append_output_func_ref(f"ℹ️ Command '{full_cmd_to_add}' is already set as '{target_category_name}'.", style_class='info')
-                logger.info(f"Command '{full_cmd_to_add}' already in user category '{target_category_name}'. No change needed.")
-                return 
-                
-    if full_cmd_to_add not in user_categories[target_category_name]:
-        user_categories[target_category_name].append(full_cmd_to_add)
-    
-    _save_user_command_categories(user_categories)
-    load_and_merge_command_categories()
-    
+    user_assignments = _get_user_assignments()
+    cmd_found_in_user_file_old_cat = user_assignments.get(full_cmd_to_add)
+    if cmd_found_in_user_file_old_cat == target_category_name:
+        if _append_output_func_ref: _append_output_func_ref(f"ℹ️ Command '{full_cmd_to_add}' is already set as '{target_category_name}'.", style_class='info')
+        logger.info(f"Command '{full_cmd_to_add}' already in user category '{target_category_name}'. No change needed.")
+        return
+
+    if not _append_user_category_journal({"op": "set", "command": full_cmd_to_add, "category": target_category_name}):
+        return
+    user_assignments.pop(full_cmd_to_add, None)
+    user_assignments[full_cmd_to_add] = target_category_name
+    _apply_user_category_change(full_cmd_to_add, target_category_name)
+
     if _append_output_func_ref:
         if cmd_found_in_user_file_old_cat:
             _append_output_func_ref(f"✅ Command '{full_cmd_to_add}' moved from '{cmd_found_in_user_file_old_cat}' to '{target_category_name}'.", style_class='success') 
@@ -231,7 +529,7 @@ def add_command_to_category(full_cmd_to_add: str, category_input: str):
 
 
 def remove_command_from_category(full_cmd_to_remove: str):
-    """Removes a command from the user's explicit categorizations and reloads."""
+    """Removes a command from the user's explicit categorizations; it reverts to its default category, if any."""
     if not _append_output_func_ref:
         logger.warning("append_output function not available for remove_command_from_category status messages.")
 
@@ -240,17 +538,12 @@ def remove_command_from_category(full_cmd_to_remove: str):
         logger.warning("Attempted to remove an empty command from categories.")
         return 
 
-    user_categories = _load_single_category_file(USER_CATEGORY_FILE_PATH)
-    found_and_removed_from_user = False
-    
-    for commands_in_category in user_categories.values():
-        if full_cmd_to_remove in commands_in_category:
-            commands_in_category.remove(full_cmd_to_remove)
-            found_and_removed_from_user = True
-            
-    if found_and_removed_from_user:
-        _save_user_command_categories(user_categories)
-        load_and_merge_command_categories()
+    user_assignments = _get_user_assignments()
+    if full_cmd_to_remove in user_assignments:
+        if not _append_user_category_journal({"op": "remove", "command": full_cmd_to_remove}):
+            return
+        del user_assignments[full_cmd_to_remove]
+        _apply_user_category_change(full_cmd_to_remove, None)
         if _append_output_func_ref: _append_output_func_ref(f"🗑️ Command '{full_cmd_to_remove}' removed from your user settings.", style_class='info') 
         logger.info(f"Command '{full_cmd_to_remove}' removed from user categories.")
     else:
@@ -326,7 +619,8 @@ def handle_command_subsystem_input(input_str: str) -> dict | None:
                 f"  move \"<cmd>\" <new_cat>     - Move command to a new category.\n" 
                 f"  run <cat_num|cat_name> \"<cmd>\" - Force run command with category.\n" 
                 f"  help                       - Show this help message.\n" 
-                f"Categories: 1/simple, 2/semi_interactive, 3/interactive_tui")
+                f"Categories: 1/simple, 2/semi_interactive, 3/interactive_tui\n"
+                f"Rules (instead of a full command): \"prefix:git log\", \"glob:docker * ps\", \"re:^make( |$)\", \"base:vim\"")
 
     if len(parts) < 2 or parts[0] != "/command":
         _append_output_func_ref(f"❌ Invalid /command structure.\n{cmd_help}", style_class='error')
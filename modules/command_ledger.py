@@ -0,0 +1,206 @@
+# modules/command_ledger.py
+
+import json
+import logging
+import os
+import time
+from collections import deque
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Configuration Keys (under the 'command_ledger' section) ---
+COMMAND_LEDGER_CONFIG_SECTION = "command_ledger"
+ENABLED_KEY = "enabled"
+PATH_KEY = "path" # Relative paths are resolved against the project root
+MAX_STATS_ENTRIES_KEY = "max_stats_entries"
+
+DEFAULT_LEDGER_PATH = os.path.join("logs", "command_ledger.jsonl")
+DEFAULT_MAX_STATS_ENTRIES = 10000
+DEFAULT_STATS_TOP_N = 5
+
+# --- Command kinds ---
+KIND_SIMPLE = "simple"
+KIND_SEMI_INTERACTIVE = "semi_interactive"
+KIND_SCRIPT = "script"
+KIND_BACKGROUND = "background"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _format_seconds(seconds) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    return f"{seconds:.2f}s"
+
+
+def _format_kb(kb) -> str:
+    if kb is None:
+        return "-"
+    if kb < 1024:
+        return f"{kb} KB"
+    return f"{kb / 1024:.1f} MB"
+
+
+def _format_bytes(count) -> str:
+    if not count:
+        return "0 B"
+    if count < 1024:
+        return f"{count} B"
+    if count < 1024 * 1024:
+        return f"{count / 1024:.1f} KB"
+    return f"{count / (1024 * 1024):.1f} MB"
+
+
+class CommandLedger:
+    """An append-only JSON Lines record of every command micro_X ran.
+
+    Each line holds one run: when it finished, the command, how it was run
+    (simple, semi_interactive, script or background) and on which backend, its exit code, wall
+    time, CPU time, peak RSS and the number of output bytes. Fields that could not
+    be measured for a backend are null. Lines are written with a single append, so
+    concurrent micro_X sessions can share one ledger.
+    """
+
+    def __init__(self, path: str, max_stats_entries: int = DEFAULT_MAX_STATS_ENTRIES):
+        self.path = path
+        self.max_stats_entries = max(1, int(max_stats_entries))
+
+    def record(self, command: str, kind: str, exit_code=None, wall_seconds=None, cpu_user_seconds=None,
+               cpu_system_seconds=None, max_rss_kb=None, output_bytes=None, backend=None, cwd=None) -> dict | None:
+        """Appends one run to the ledger.
+
+        Returns:
+            The entry that was written, or None if the ledger could not be written.
+        """
+        entry = {
+            "ts": round(time.time(), 3),
+            "command": command,
+            "kind": kind,
+            "backend": backend,
+            "exit_code": exit_code,
+            "wall_seconds": None if wall_seconds is None else round(wall_seconds, 4),
+            "cpu_user_seconds": None if cpu_user_seconds is None else round(cpu_user_seconds, 4),
+            "cpu_system_seconds": None if cpu_system_seconds is None else round(cpu_system_seconds, 4),
+            "max_rss_kb": max_rss_kb,
+            "output_bytes": output_bytes,
+            "cwd": cwd,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not append to command ledger {self.path}: {e}")
+            return None
+        return entry
+
+    def read_entries(self) -> list[dict]:
+        """Returns the most recent entries (at most max_stats_entries), oldest first.
+
+        Lines that are not valid JSON objects (e.g. a line cut short by a crash) are skipped.
+        """
+        entries = deque(maxlen=self.max_stats_entries)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and entry.get("command"):
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not read command ledger {self.path}: {e}")
+        return list(entries)
+
+
+def summarize_entries(entries: list[dict]) -> list[dict]:
+    """Aggregates ledger entries per command.
+
+    Returns:
+        One dict per distinct command with `command`, `runs`, `failures`,
+        `total_wall_seconds`, `max_wall_seconds`, `total_cpu_seconds` (None if never
+        measured), `max_rss_kb` (None if never measured) and `total_output_bytes`.
+    """
+    summaries = {}
+    for entry in entries:
+        command = entry["command"]
+        summary = summaries.get(command)
+        if summary is None:
+            summary = summaries[command] = {
+                "command": command, "runs": 0, "failures": 0,
+                "total_wall_seconds": 0.0, "max_wall_seconds": 0.0,
+                "total_cpu_seconds": None, "max_rss_kb": None, "total_output_bytes": 0,
+            }
+        summary["runs"] += 1
+        if entry.get("exit_code") not in (0, None):
+            summary["failures"] += 1
+        wall = entry.get("wall_seconds") or 0.0
+        summary["total_wall_seconds"] += wall
+        summary["max_wall_seconds"] = max(summary["max_wall_seconds"], wall)
+        cpu_user, cpu_system = entry.get("cpu_user_seconds"), entry.get("cpu_system_seconds")
+        if cpu_user is not None or cpu_system is not None:
+            summary["total_cpu_seconds"] = (summary["total_cpu_seconds"] or 0.0) + (cpu_user or 0.0) + (cpu_system or 0.0)
+        rss = entry.get("max_rss_kb")
+        if rss is not None:
+            summary["max_rss_kb"] = max(summary["max_rss_kb"] or 0, rss)
+        summary["total_output_bytes"] += entry.get("output_bytes") or 0
+    return list(summaries.values())
+
+
+def format_stats_report(entries: list[dict], top_n: int = DEFAULT_STATS_TOP_N) -> str:
+    """Renders the /stats view: the slowest, most CPU-hungry and largest commands."""
+    if not entries:
+        return "No commands recorded yet."
+    summaries = summarize_entries(entries)
+    total_wall = sum(s["total_wall_seconds"] for s in summaries)
+    total_failures = sum(s["failures"] for s in summaries)
+    lines = [f"📊 {len(entries)} runs of {len(summaries)} distinct commands, "
+             f"{_format_seconds(total_wall)} wall time in total, {total_failures} failed."]
+
+    def section(title, key, value_format, describe):
+        ranked = [s for s in summaries if s[key]]
+        ranked.sort(key=lambda s: s[key], reverse=True)
+        if not ranked:
+            return
+        lines.append(f"\n{title}:")
+        for s in ranked[:top_n]:
+            lines.append(f"  {value_format(s[key]):>9}  {s['command']}  ({describe(s)})")
+
+    runs = lambda s: f"{s['runs']} run{'s' if s['runs'] != 1 else ''}"
+    section("Slowest (longest single run)", "max_wall_seconds", _format_seconds,
+            lambda s: f"{runs(s)}, {_format_seconds(s['total_wall_seconds'] / s['runs'])} average")
+    section("Most CPU time (all runs)", "total_cpu_seconds", _format_seconds, runs)
+    section("Highest peak memory", "max_rss_kb", _format_kb, runs)
+    section("Most output (all runs)", "total_output_bytes", _format_bytes, runs)
+    return "\n".join(lines)
+
+
+# --- Shared instance ---
+_ledger_instance = None
+
+
+def get_command_ledger(main_config: dict) -> CommandLedger | None:
+    """Returns the process-wide command ledger, or None if it is disabled.
+
+    Args:
+        main_config: The main application configuration object.
+    """
+    global _ledger_instance
+    ledger_config = main_config.get(COMMAND_LEDGER_CONFIG_SECTION, {})
+    if not ledger_config.get(ENABLED_KEY, True):
+        return None
+    path = ledger_config.get(PATH_KEY) or DEFAULT_LEDGER_PATH
+    if not os.path.isabs(path):
+        path = os.path.join(PROJECT_ROOT, path)
+    max_stats_entries = ledger_config.get(MAX_STATS_ENTRIES_KEY, DEFAULT_MAX_STATS_ENTRIES)
+    if _ledger_instance is None or _ledger_instance.path != path:
+        _ledger_instance = CommandLedger(path, max_stats_entries)
+    else:
+        _ledger_instance.max_stats_entries = max(1, int(max_stats_entries))
+    return _ledger_instance
@@ -5,6 +5,7 @@ import sys
 import json
 import re
 import logging
+import tempfile
 from typing import Any, Dict, Optional
 
 # --- Module-specific logger ---
@@ -49,6 +50,44 @@ def load_jsonc_file(filepath: str) -> Optional[Dict[str, Any]]:
         logger.error(f"An unexpected error occurred while loading {filepath}: {e}", exc_info=True)
         return None
 
+def _save_json(filepath: str, data: Dict[str, Any], atomic: bool) -> bool:
+    """Serializes data (2-space indent, sorted keys) and writes it to filepath; see the public savers."""
+    directory = os.path.dirname(filepath) or "."
+    tmp_path = None
+    try:
+        text = json.dumps(data, indent=2, sort_keys=True)
+        # Ensure the directory exists before writing
+        os.makedirs(directory, exist_ok=True)
+        if not atomic:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(filepath)}-", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.chmod(tmp_path, os.stat(filepath).st_mode & 0o7777)
+            except FileNotFoundError:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, filepath)
+            tmp_path = None
+        logger.info(f"Successfully saved configuration to {filepath}")
+        return True
+    except OSError as e:
+        logger.error(f"Error saving data to {filepath}: {e}", exc_info=True)
+        print(f"❌ Error: Could not write to the file at {filepath}.", file=sys.stderr)
+        return False
+    except TypeError as e:
+        logger.error(f"Data for {filepath} is not serializable: {e}", exc_info=True)
+        print("❌ Error: The data provided could not be converted to JSON.", file=sys.stderr)
+        return False
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
 def save_json_file(filepath: str, data: Dict[str, Any]) -> bool:
     """
     Saves a dictionary to a file in standard JSON format.
@@ -60,18 +99,22 @@ def save_json_file(filepath: str, data: Dict[str, Any]) -> bool:
     Returns:
         bool: True if saving was successful, False otherwise.
     """
-    try:
-        # Ensure the directory exists before writing
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, sort_keys=True)
-        logger.info(f"Successfully saved configuration to {filepath}")
-        return True
-    except IOError as e:
-        logger.error(f"Error saving data to {filepath}: {e}", exc_info=True)
-        print(f"❌ Error: Could not write to the file at {filepath}.", file=sys.stderr)
-        return False
-    except TypeError as e:
-        logger.error(f"Data for {filepath} is not serializable: {e}", exc_info=True)
-        print(f"❌ Error: The data provided could not be converted to JSON.", file=sys.stderr)
-        return False
+    return _save_json(filepath, data, atomic=False)
+
+
+def save_json_file_atomic(filepath: str, data: Dict[str, Any]) -> bool:
+    """
+    Saves a dictionary like save_json_file(), but so that the file is always either the old or the new version.
+
+    The data is written to a temporary file in the same directory, flushed to disk
+    and then renamed over the target, so a crash mid-write never leaves a
+    half-written file. An existing file's permissions are kept.
+
+    Args:
+        filepath (str): The full path where the file will be saved.
+        data (Dict[str, Any]): The dictionary data to save.
+
+    Returns:
+        bool: True if saving was successful, False otherwise.
+    """
+    return _save_json(filepath, data, atomic=True)
@@ -8,6 +8,7 @@ import sys
 from typing import Optional, List, Tuple, Callable
 from prompt_toolkit.history import FileHistory
 from modules.ai_handler import explain_linux_command_with_ai
+from modules import ollama_scheduler
 from modules.category_manager import (
     CATEGORY_MAP as CM_CATEGORY_MAP,
     CATEGORY_DESCRIPTIONS as CM_CATEGORY_DESCRIPTIONS,
@@ -387,6 +388,7 @@ class CursesUIManager:
             return result
         finally:
             self.confirmation_flow_active = False
+            ollama_scheduler.get_scheduler().cancel_group(ollama_scheduler.GROUP_EXPLAIN)
 
     def _ask_confirmation_main_choice(self):
         cmd = self.confirmation_flow_state['command_to_confirm']
@@ -440,6 +442,8 @@ class CursesUIManager:
         self.append_output(f"\n🧠 Asking AI to explain: {command_to_explain}", 'ai-thinking')
         self.invalidate()
         explanation = await explain_linux_command_with_ai(command_to_explain, self.config, self.append_output)
+        if not self.confirmation_flow_active:
+            return
         if explanation:
             self.append_output("\n💡 AI Explanation:", 'info-header')
             self.append_output(explanation, 'info')
@@ -1,9 +1,13 @@
 # modules/embedding_manager.py
+import asyncio
 import logging
 import json
 import os
 import numpy as np
-import ollama
+
+from modules import ollama_manager
+from modules import ollama_client
+from modules import ollama_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +18,10 @@ class EmbeddingManager:
         self.intents = {}
         self.intent_embeddings = {}
         self.embedding_model = None
+        self.tool_names = []
+        self.tool_matrix = None # Row-normalized tool description embeddings, one row per tool name
+        self._last_input_embedding = None # (text, vector) so one input is only embedded once
+        self._tool_index_task = None
 
     def _load_intents_from_file(self):
         """Loads intents from the JSON file specified in the config."""
@@ -54,8 +62,8 @@ class EmbeddingManager:
             return
 
         try:
-            self.client = ollama.Client()
-            logger.info("Ollama client initialized successfully.")
+            self.client = ollama_client.get_sync_client(self.config)
+            logger.info("Using the shared Ollama client.")
             self._generate_intent_embeddings()
         except Exception as e:
             logger.error(f"Failed to initialize Ollama client: {e}", exc_info=True)
@@ -84,7 +92,111 @@ class EmbeddingManager:
         
         logger.info("Finished generating all intent embeddings.")
 
-    def classify_intent(self, user_input: str) -> tuple[str | None, float]:
+    def _embed_input(self, user_input: str) -> np.ndarray:
+        """Embeds the user input, reusing the last result when the same input is scored again."""
+        if self._last_input_embedding and self._last_input_embedding[0] == user_input:
+            return self._last_input_embedding[1]
+        embedding = np.array(self.client.embeddings(model=self.embedding_model, prompt=user_input)['embedding'], dtype=float)
+        self._last_input_embedding = (user_input, embedding)
+        return embedding
+
+    async def _embed_input_scheduled(self, user_input: str) -> np.ndarray:
+        """Embeds the user input via the Ollama scheduler, in the interactive priority class and group.
+
+        The embedding shares the Ollama instance with the chat models, so it queues
+        behind (and can be cancelled with) the rest of the work for the current input.
+        """
+        if self._last_input_embedding and self._last_input_embedding[0] == user_input:
+            return self._last_input_embedding[1]
+        return await ollama_scheduler.get_scheduler().run(
+            self.embedding_model, lambda: asyncio.to_thread(self._embed_input, user_input),
+            priority=ollama_scheduler.PRIORITY_INTERACTIVE, group=ollama_scheduler.GROUP_INTERACTIVE
+        )
+
+    async def initialize_tool_index(self, tools: list):
+        """
+        Embeds the name and docstring of each router tool into a normalized matrix.
+
+        Each embedding runs in a worker thread via the Ollama scheduler at background
+        priority, so interactive requests are served first.
+
+        Args:
+            tools: LangChain tools, e.g. from router_tools.get_all_tools().
+        """
+        if not self.client:
+            logger.warning("Cannot build tool index: Ollama client not available.")
+            return
+
+        scheduler = ollama_scheduler.get_scheduler()
+        names, vectors = [], []
+        for tool in tools:
+            description = " ".join((tool.description or "").split())
+            prompt = f"{tool.name.replace('_', ' ')}: {description}"
+            try:
+                response = await scheduler.run(
+                    self.embedding_model,
+                    lambda: asyncio.to_thread(self.client.embeddings, model=self.embedding_model, prompt=prompt),
+                    priority=ollama_scheduler.PRIORITY_BACKGROUND
+                )
+                vectors.append(response['embedding'])
+                names.append(tool.name)
+            except Exception as e:
+                ollama_manager.mark_ollama_request_failed(e)
+                logger.error(f"Failed to generate embedding for tool '{tool.name}': {e}", exc_info=True)
+
+        if not vectors:
+            return
+        matrix = np.array(vectors, dtype=float)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.tool_matrix = matrix / norms
+        self.tool_names = names
+        logger.info(f"Built router tool index with {len(names)} tools.")
+
+    def start_tool_index_build(self, tools: list) -> asyncio.Task:
+        """Builds the tool index in the background; until it is ready, has_tool_index() is False."""
+        if self._tool_index_task is None or self._tool_index_task.done():
+            self._tool_index_task = asyncio.create_task(self.initialize_tool_index(tools))
+        return self._tool_index_task
+
+    def has_tool_index(self) -> bool:
+        """Returns True if match_tool() can score inputs."""
+        return self.client is not None and self.tool_matrix is not None
+
+    async def match_tool(self, user_input: str) -> tuple[str | None, float]:
+        """
+        Scores the user input against the router tool index.
+
+        Args:
+            user_input: The raw input from the user.
+
+        Returns:
+            A tuple of (tool_name, similarity_score) for the closest tool.
+            Returns (None, 0.0) if the index is not available.
+
+        Raises:
+            OllamaRequestCancelled: If the embedding request was cancelled because new input arrived.
+        """
+        if not self.has_tool_index():
+            return None, 0.0
+
+        try:
+            input_embedding = await self._embed_input_scheduled(user_input)
+            norm = np.linalg.norm(input_embedding)
+            if norm == 0:
+                return None, 0.0
+            similarities = self.tool_matrix @ (input_embedding / norm)
+            best = int(np.argmax(similarities))
+            logger.debug(f"Closest router tool for '{user_input}' is '{self.tool_names[best]}' ({similarities[best]:.4f})")
+            return self.tool_names[best], float(similarities[best])
+        except ollama_scheduler.OllamaRequestCancelled:
+            raise
+        except Exception as e:
+            ollama_manager.mark_ollama_request_failed(e)
+            logger.error(f"Failed to match tools for input '{user_input}': {e}", exc_info=True)
+            return None, 0.0
+
+    async def classify_intent(self, user_input: str) -> tuple[str | None, float]:
         """
         Classifies the user input against known intents.
 
@@ -94,6 +206,9 @@ class EmbeddingManager:
         Returns:
             A tuple of (intent_name, similarity_score).
             Returns (None, 0.0) if classification is not possible.
+
+        Raises:
+            OllamaRequestCancelled: If the embedding request was cancelled because new input arrived.
         """
         if not self.client or not self.intent_embeddings:
             logger.warning("Cannot classify intent: EmbeddingManager not ready.")
@@ -101,7 +216,7 @@ class EmbeddingManager:
 
         try:
             # Embed the user input
-            input_embedding = np.array(self.client.embeddings(model=self.embedding_model, prompt=user_input)['embedding'])
+            input_embedding = await self._embed_input_scheduled(user_input)
 
             # Calculate cosine similarity against all intent embeddings
             best_match_intent = None
@@ -118,7 +233,10 @@ class EmbeddingManager:
             logger.info(f"Classified input '{user_input}' as intent '{best_match_intent}' with similarity {highest_similarity:.4f}")
             return best_match_intent, highest_similarity
 
+        except ollama_scheduler.OllamaRequestCancelled:
+            raise
         except Exception as e:
+            ollama_manager.mark_ollama_request_failed(e)
             logger.error(f"Failed to classify intent for input '{user_input}': {e}", exc_info=True)
             return None, 0.0
 
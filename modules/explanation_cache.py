@@ -0,0 +1,216 @@
+# modules/explanation_cache.py
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Configuration Keys (under the 'explanation_cache' section) ---
+EXPLANATION_CACHE_CONFIG_SECTION = "explanation_cache"
+ENABLED_KEY = "enabled"
+PATH_KEY = "path" # Relative paths are resolved against the project root
+MAX_ENTRIES_KEY = "max_entries"
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "explanations.json")
+DEFAULT_MAX_ENTRIES = 500
+CACHE_FORMAT_VERSION = 1
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def normalize_command(command: str) -> str:
+    """Normalizes a command so trivially different spellings share a cache entry.
+
+    Leading/trailing whitespace is stripped and runs of whitespace between arguments
+    are collapsed to one space, so `ls   -la` and `ls -la` share a key. Quoting is
+    kept as typed: `rm *` and `rm '*'` (or `echo $HOME` and `echo '$HOME'`) mean
+    different things to the shell, and whitespace inside quotes is significant.
+    """
+    result = []
+    quote = None # The open quote character, if any
+    escaped = False
+    pending_space = False
+    for char in command.strip():
+        if escaped:
+            escaped = False
+        elif char == "\\" and quote != "'":
+            escaped = True
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char.isspace():
+            pending_space = True
+            continue
+        if pending_space:
+            result.append(" ")
+            pending_space = False
+        result.append(char)
+    return "".join(result)
+
+
+def make_cache_key(command: str, model_name: str, model_options: dict | None, system_prompt: str, user_template: str) -> str:
+    """Builds the cache key for an explanation request.
+
+    Args:
+        command: The command being explained (normalized here).
+        model_name: The explainer model.
+        model_options: The explainer model options, if any.
+        system_prompt: The explainer system prompt.
+        user_template: The explainer user prompt template.
+
+    Returns:
+        A hex digest identifying the request.
+    """
+    prompt_hash = hashlib.sha256(f"{system_prompt}\0{user_template}".encode("utf-8")).hexdigest()
+    material = json.dumps([normalize_command(command), model_name, model_options or {}, prompt_hash], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """A size-bounded, least-recently-used explanation store persisted as JSON.
+
+    The file is loaded lazily on first use. Every insert merges the entries on disk
+    (which other micro_X sessions may have added) with the ones in memory and
+    rewrites the file atomically (temp file + os.replace), holding an exclusive
+    lock on a sidecar '.lock' file for the read-merge-write so concurrent sessions
+    neither lose each other's entries nor see a half-written cache. The methods
+    are thread-safe, so put() can run in a worker thread.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._entries = None # OrderedDict key -> {"command", "model", "explanation", "created_at"}; oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _read_file(self) -> OrderedDict:
+        """Returns the entries stored on disk (oldest first); empty if missing or unreadable."""
+        entries = OrderedDict()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_FORMAT_VERSION:
+                for key, entry in data.get("entries", []):
+                    entries[key] = entry
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable explanation cache at {self.path}: {e}")
+        return entries
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = self._read_file()
+        self._evict()
+        logger.debug(f"Loaded {len(self._entries)} cached explanations from {self.path}")
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self, merge: bool = True):
+        """Writes the entries to disk, first merging in entries other sessions stored.
+
+        Args:
+            merge: If False, the file is overwritten with the in-memory entries only.
+        """
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if merge:
+                    merged = self._read_file()
+                    for key, entry in self._entries.items():
+                        merged[key] = entry
+                        merged.move_to_end(key)
+                    self._entries = merged
+                    self._evict()
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".explanations-", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump({"version": CACHE_FORMAT_VERSION, "entries": list(self._entries.items())}, f)
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+        except OSError as e:
+            logger.warning(f"Could not write explanation cache to {self.path}: {e}")
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached explanation for the key, marking it most recently used."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.get("explanation")
+
+    def put(self, key: str, explanation: str, command: str = "", model_name: str = ""):
+        """Stores an explanation, evicting the least recently used entries beyond max_entries.
+
+        This writes the cache file, so async callers should run it in a worker thread.
+        """
+        with self._lock:
+            self._load()
+            self._entries[key] = {
+                "command": command,
+                "model": model_name,
+                "explanation": explanation,
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def clear(self):
+        """Removes every entry, in memory and on disk."""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._save(merge=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+
+# --- Shared instance ---
+_cache_instance = None
+
+
+def get_explanation_cache(main_config: dict) -> ExplanationCache | None:
+    """Returns the process-wide explanation cache, or None if caching is disabled.
+
+    Args:
+        main_config: The main application configuration object.
+    """
+    global _cache_instance
+    cache_config = main_config.get(EXPLANATION_CACHE_CONFIG_SECTION, {})
+    if not cache_config.get(ENABLED_KEY, True):
+        return None
+    path = cache_config.get(PATH_KEY) or DEFAULT_CACHE_PATH
+    if not os.path.isabs(path):
+        path = os.path.join(PROJECT_ROOT, path)
+    max_entries = cache_config.get(MAX_ENTRIES_KEY, DEFAULT_MAX_ENTRIES)
+    if _cache_instance is None or _cache_instance.path != path:
+        _cache_instance = ExplanationCache(path, max_entries)
+    else:
+        _cache_instance.max_entries = max(1, int(max_entries))
+    return _cache_instance
@@ -3,39 +3,49 @@
 import logging
 import re
 from typing import TypedDict, Annotated, Sequence, Literal
-import asyncio # New import
 import operator
-import ollama # New import
+
+from modules import ollama_manager
+from modules import ollama_scheduler
+from modules import ollama_client
 
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_ollama import ChatOllama
 from langgraph.graph import StateGraph, END
 
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
 
-async def _invoke_llm_with_retries(chain, input_data: dict, config: dict, max_retries_key: str, delay_key: str) -> str:
+async def _invoke_llm_with_retries(chain, input_data: dict, config: dict, max_retries_key: str, delay_key: str, model_name: str | None = None) -> str:
     """
     Invokes an LLM chain with retry logic for network-related errors.
+    Each attempt goes through the shared Ollama scheduler at interactive priority;
+    backoff between attempts is handled by ollama_client.call_with_retries.
     """
-    max_retries = config.get('behavior', {}).get(max_retries_key, 0) # Default to 0 retries
-    retry_delay = config.get('behavior', {}).get(delay_key, 1) # Default to 1 second delay
+    scheduler = ollama_scheduler.get_scheduler(config)
 
-    for attempt in range(max_retries + 1): # +1 because initial attempt is not a retry
+    async def _attempt():
         try:
-            return await chain.ainvoke(input_data)
-        except ollama.RequestError as e:
-            logger.warning(f"Ollama API call failed (attempt {attempt+1}/{max_retries+1}): {e}")
-            if attempt < max_retries:
-                await asyncio.sleep(retry_delay)
-            else:
-                logger.error(f"Ollama API call exhausted all retries. Final error: {e}")
-                raise # Re-raise if all retries fail
-        except Exception as e: # Catch other unexpected errors
-            logger.error(f"Unexpected error during LLM invocation (attempt {attempt+1}/{max_retries+1}): {e}", exc_info=True)
-            raise # Re-raise for unhandled exceptions
+            return await scheduler.run(
+                model_name, lambda: chain.ainvoke(input_data),
+                priority=ollama_scheduler.PRIORITY_INTERACTIVE, group=ollama_scheduler.GROUP_INTERACTIVE
+            )
+        except Exception as e:
+            ollama_manager.mark_ollama_request_failed(e)
+            raise
+
+    try:
+        return await ollama_client.call_with_retries(
+            _attempt, config, description=f"Ollama API call ({model_name})",
+            max_retries_key=max_retries_key, delay_key=delay_key
+        )
+    except ollama_scheduler.OllamaRequestCancelled:
+        logger.info(f"Ollama API call ({model_name}) cancelled: new input arrived.")
+        raise
+    except Exception as e:
+        logger.error(f"Ollama API call failed after retries: {e}")
+        raise
 
 # --- Helper Functions (migrated from ai_handler.py) ---
 
@@ -108,7 +118,7 @@ async def primary_translator_node(state: AgentState) -> AgentState:
         ("system", system_prompt),
         ("user", user_template)
     ])
-    model = ChatOllama(model=model_name)
+    model = ollama_client.get_chat_model(model_name, config)
     chain = prompt | model | StrOutputParser()
 
     # 3. Invoke the chain with retry logic
@@ -118,8 +128,11 @@ async def primary_translator_node(state: AgentState) -> AgentState:
             {"human_input": state["human_query"]},
             config,
             max_retries_key='ollama_api_call_retries',
-            delay_key='ai_retry_delay_seconds'
+            delay_key='ai_retry_delay_seconds',
+            model_name=model_name
         )
+    except ollama_scheduler.OllamaRequestCancelled:
+        raise
     except Exception as e:
         logger.error(f"Failed to get primary translation after retries: {e}")
         return {"primary_command": None, "raw_response": f"Error: {e}"}
@@ -165,7 +178,7 @@ async def validator_node(state: AgentState) -> AgentState:
         ("system", system_prompt),
         ("user", user_template)
     ])
-    model = ChatOllama(model=model_name)
+    model = ollama_client.get_chat_model(model_name, config)
     chain = prompt | model | StrOutputParser()
 
     # 3. Invoke the chain with retry logic
@@ -175,8 +188,11 @@ async def validator_node(state: AgentState) -> AgentState:
             {"command_text": command_to_validate},
             config,
             max_retries_key='ollama_api_call_retries', # Validator can also benefit from retries
-            delay_key='ai_retry_delay_seconds'
+            delay_key='ai_retry_delay_seconds',
+            model_name=model_name
         )
+    except ollama_scheduler.OllamaRequestCancelled:
+        raise
     except Exception as e:
         logger.error(f"Failed to validate command after retries: {e}")
         return {"decision": "fail", "messages": [HumanMessage(content=f"Validator error: {e}")]}
@@ -229,7 +245,7 @@ async def secondary_translator_node(state: AgentState) -> AgentState:
         ("system", system_prompt),
         ("user", user_template)
     ])
-    model = ChatOllama(model=model_name)
+    model = ollama_client.get_chat_model(model_name, config)
     chain = prompt | model | StrOutputParser()
 
     # 3. Invoke the chain with retry logic
@@ -239,8 +255,11 @@ async def secondary_translator_node(state: AgentState) -> AgentState:
             {"human_input": state["human_query"]},
             config,
             max_retries_key='ollama_api_call_retries',
-            delay_key='ai_retry_delay_seconds'
+            delay_key='ai_retry_delay_seconds',
+            model_name=model_name
         )
+    except ollama_scheduler.OllamaRequestCancelled:
+        raise
     except Exception as e:
         logger.error(f"Failed to get secondary translation after retries: {e}")
         return {"secondary_command": None, "raw_response": f"Error: {e}"}
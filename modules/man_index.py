@@ -0,0 +1,417 @@
+# modules/man_index.py
+
+import json
+import logging
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Configuration Keys (under the 'man_index' section) ---
+MAN_INDEX_CONFIG_SECTION = "man_index"
+ENABLED_KEY = "enabled"
+CACHE_DIR_KEY = "cache_dir" # Relative paths are resolved against the project root
+USE_HELP_OUTPUT_KEY = "use_help_output" # Opt-in: fall back to '<command> --help' when there is no man page
+HELP_OUTPUT_ALLOWLIST_KEY = "help_output_allowlist" # The only commands that fallback may run
+TIMEOUT_KEY = "timeout_seconds"
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "man_index")
+INDEX_FORMAT_VERSION = 1
+MAX_DESCRIPTION_CHARS = 160
+
+# Commands whose --help is known to only print usage. Running an arbitrary executable
+# with --help is not safe (some ignore unknown arguments and just run), so nothing
+# outside the allowlist is ever executed.
+DEFAULT_HELP_OUTPUT_ALLOWLIST = {"cargo", "docker", "gh", "go", "helm", "kubectl", "npm", "pip", "pip3", "poetry", "rustup", "terraform", "uv", "yarn"}
+
+# Never executed with --help, even if allowlisted: some implementations ignore unknown arguments.
+HELP_OUTPUT_DENYLIST = {"shutdown", "reboot", "halt", "poweroff", "init", "telinit", "mkfs", "dd", "kill", "killall", "pkill"}
+
+# Tools whose first operand is a subcommand with options of its own. Their subcommands are
+# explained from '<command>-<subcommand>' documentation (e.g. git-log(1)), never from the
+# top-level page, whose flags mean something else.
+SUBCOMMAND_COMMANDS = {"apt", "apt-get", "brew", "cargo", "dnf", "docker", "flatpak", "gh", "git", "go", "helm", "ip",
+                       "kubectl", "npm", "pip", "pip3", "podman", "poetry", "snap", "systemctl", "terraform", "uv", "yarn"}
+
+# Shell words that make a command line too complex to explain flag by flag.
+_CONTROL_OPERATORS = {";", "&&", "||", "&", "(", ")", ">", ">>", "<", "<<", "<<<", ">&", "<&", "|&", ";;"}
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_OVERSTRIKE = re.compile(r".\x08")
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_OPTION_HEADER = re.compile(r"^(?P<indent>[ \t]*)(?P<flags>-{1,2}[A-Za-z0-9?#].*?)(?:\s{2,}(?P<desc>\S.*))?$")
+_FLAG_NAME = re.compile(r"(?<![\w-])(--?[A-Za-z0-9?#][\w-]*)")
+_SUBCOMMAND_NAME = re.compile(r"^[A-Za-z0-9][\w.-]*$")
+
+
+def _clean_text(text: str) -> str:
+    """Removes man-page overstrike bold/underline and ANSI escapes."""
+    return _ANSI_ESCAPE.sub("", _OVERSTRIKE.sub("", text))
+
+
+def _shorten(text: str) -> str:
+    """Collapses whitespace and trims the text to its first sentence or MAX_DESCRIPTION_CHARS."""
+    text = " ".join(text.split())
+    sentence_end = re.search(r"(?<=[A-Za-z0-9)\]])\.(\s|$)", text)
+    if sentence_end and sentence_end.end() < len(text):
+        text = text[:sentence_end.end()].strip()
+    if len(text) > MAX_DESCRIPTION_CHARS:
+        text = text[:MAX_DESCRIPTION_CHARS - 1].rstrip() + "…"
+    return text
+
+
+def parse_options(text: str) -> dict[str, str]:
+    """Extracts {flag: description} pairs from man-page or --help text.
+
+    Understands both the man layout (flags on their own line, description indented
+    below) and the --help layout (description after two or more spaces).
+
+    Args:
+        text: Plain text of a man page or --help output.
+
+    Returns:
+        A dict mapping every spelling of a flag (e.g. '-a' and '--all') to its description.
+    """
+    options = {}
+    lines = text.splitlines()
+    pending_flags = [] # Aliases listed on their own line above the one that carries the description
+    i = 0
+    while i < len(lines):
+        match = _OPTION_HEADER.match(lines[i])
+        if not match:
+            pending_flags = []
+            i += 1
+            continue
+        indent = len(match.group("indent").expandtabs())
+        flags = pending_flags + _FLAG_NAME.findall(match.group("flags"))
+        description_parts = [match.group("desc")] if match.group("desc") else []
+        i += 1
+        # Continuation lines are indented deeper than the header and end at a blank line or the next header.
+        while i < len(lines) and lines[i].strip() and not _OPTION_HEADER.match(lines[i]):
+            next_indent = len(lines[i].expandtabs()) - len(lines[i].expandtabs().lstrip())
+            if next_indent <= indent:
+                break
+            description_parts.append(lines[i].strip())
+            i += 1
+        description = _shorten(" ".join(description_parts))
+        if not description:
+            pending_flags = flags if i < len(lines) and _OPTION_HEADER.match(lines[i]) else []
+            continue
+        pending_flags = []
+        for flag in flags:
+            options.setdefault(flag, description)
+    return options
+
+
+def parse_summary(text: str, source: str) -> str | None:
+    """Returns a one-line summary: the NAME line of a man page, or the first prose line of --help."""
+    lines = [line.strip() for line in text.splitlines()]
+    if source == "man":
+        for index, line in enumerate(lines):
+            if line == "NAME":
+                for candidate in lines[index + 1:]:
+                    if candidate:
+                        return _shorten(candidate.split(" - ", 1)[-1])
+        return None
+    paragraph = []
+    for line in lines:
+        if not line:
+            if paragraph:
+                break
+        elif line.lower().startswith(("usage", "or:", "-")):
+            if paragraph:
+                break
+        else:
+            paragraph.append(line)
+    return _shorten(" ".join(paragraph)) if paragraph else None
+
+
+class ManIndex:
+    """A lazily built, disk-cached index of man pages and --help output.
+
+    Each command is indexed the first time it is explained: its man page is read
+    with `man -P cat` and the parsed summary and options are stored as JSON under
+    the cache directory. Entries are rebuilt when the executable on PATH changes.
+    Subcommands of SUBCOMMAND_COMMANDS are indexed from their own pages, e.g. git-log.
+    Only if use_help_output is enabled, commands without a man page that are on the
+    help allowlist (and not on the denylist) are indexed from their --help output.
+    """
+
+    def __init__(self, cache_dir: str, use_help_output: bool = False, timeout_seconds: float = 3.0,
+                 help_denylist: set[str] | None = None, help_allowlist: set[str] | None = None):
+        self.cache_dir = cache_dir
+        self.use_help_output = use_help_output
+        self.timeout_seconds = timeout_seconds
+        self.help_denylist = set(HELP_OUTPUT_DENYLIST) | set(help_denylist or ())
+        self.help_allowlist = set(DEFAULT_HELP_OUTPUT_ALLOWLIST if help_allowlist is None else help_allowlist)
+        self._entries = {} # command -> entry dict (or None when the command cannot be indexed)
+
+    def _cache_path(self, command: str) -> str:
+        return os.path.join(self.cache_dir, f"{command}.json")
+
+    @staticmethod
+    def _executable_signature(executable: str) -> list:
+        try:
+            stat = os.stat(executable)
+            return [executable, stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            return [executable, None, None]
+
+    def _run(self, args: list[str]) -> str | None:
+        env = dict(os.environ, MANWIDTH="120", MAN_KEEP_FORMATTING="", LC_ALL="C")
+        try:
+            result = subprocess.run(args, capture_output=True, text=True, errors="replace", stdin=subprocess.DEVNULL,
+                                    timeout=self.timeout_seconds, env=env)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.debug(f"Could not run {args}: {e}")
+            return None
+        output = result.stdout if result.stdout.strip() else result.stderr
+        return _clean_text(output) if output.strip() else None
+
+    def _may_run_help(self, command: str) -> bool:
+        """Returns True if the opt-in --help fallback may execute this command."""
+        return self.use_help_output and command in self.help_allowlist and command not in self.help_denylist
+
+    def _build_entry(self, command: str, signature: list, subcommand: str | None = None) -> dict | None:
+        page = f"{command}-{subcommand}" if subcommand else command
+        text, source = None, None
+        if shutil.which("man"):
+            text = self._run(["man", "-P", "cat", page])
+            if text and ("OPTIONS" in text or "DESCRIPTION" in text):
+                source = "man"
+            else:
+                text = None # e.g. "No manual entry for ..."
+        if text is None and self._may_run_help(command):
+            help_args = [signature[0], subcommand, "--help"] if subcommand else [signature[0], "--help"]
+            text, source = self._run(help_args), "help"
+        if not text:
+            return None
+        options = parse_options(text)
+        if not options and source == "man":
+            return None
+        return {
+            "version": INDEX_FORMAT_VERSION,
+            "command": page,
+            "source": source,
+            "signature": signature,
+            "summary": parse_summary(text, source),
+            "options": options,
+        }
+
+    def _save_entry(self, command: str, entry: dict):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{command}-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._cache_path(command))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write man index entry for '{command}': {e}")
+
+    def get_entry(self, command: str, subcommand: str | None = None) -> dict | None:
+        """Returns the index entry for a command on PATH, building and caching it on first use.
+
+        Args:
+            command: The command name.
+            subcommand: A subcommand (e.g. 'log' for git) to index from its own page.
+
+        Returns:
+            A dict with 'summary', 'source' and 'options', or None if the command is
+            not an executable on PATH or has no usable documentation.
+        """
+        if not command or "/" in command or command.startswith("."):
+            return None
+        if subcommand is not None and not _SUBCOMMAND_NAME.match(subcommand):
+            return None
+        page = f"{command}-{subcommand}" if subcommand else command
+        if page in self._entries:
+            return self._entries[page]
+        executable = shutil.which(command)
+        if not executable:
+            self._entries[page] = None
+            return None
+        signature = self._executable_signature(executable)
+
+        entry = None
+        try:
+            with open(self._cache_path(page), "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == INDEX_FORMAT_VERSION and cached.get("signature") == signature:
+                entry = cached
+        except (OSError, ValueError):
+            pass
+
+        if entry is None:
+            entry = self._build_entry(command, signature, subcommand)
+            if entry is not None:
+                self._save_entry(page, entry)
+                logger.info(f"Indexed {len(entry['options'])} options for '{page}' from {entry['source']} output.")
+        self._entries[page] = entry
+        return entry
+
+    def _describe_flag(self, word: str, options: dict) -> list[tuple[str, str]] | None:
+        """Returns [(flag, description)] for a flag word, or None if any part is undocumented."""
+        name = word.split("=", 1)[0] if word.startswith("--") else word
+        if name in options:
+            return [(word, options[name])]
+        if not word.startswith("--") and len(word) > 2:
+            # A cluster of short flags, e.g. -la -> -l, -a.
+            described = []
+            for letter in word[1:]:
+                if f"-{letter}" not in options:
+                    return None
+                described.append((f"-{letter}", options[f"-{letter}"]))
+            return described
+        return None
+
+    def explain(self, command_line: str) -> str | None:
+        """Builds a flag-by-flag explanation of a command line from the index.
+
+        Pipelines are explained stage by stage. Anything the index cannot fully cover
+        (unknown commands or flags, redirections, command lists, substitutions) returns
+        None so the caller can fall back to the LLM explainer.
+
+        Args:
+            command_line: The command to explain.
+
+        Returns:
+            The explanation text, or None.
+        """
+        if any(token in command_line for token in ("$(", "`", "<(", ">(")):
+            return None
+        try:
+            lexer = shlex.shlex(command_line, posix=True, punctuation_chars=True)
+            lexer.whitespace_split = True
+            words = list(lexer)
+        except ValueError:
+            return None
+        if not words or any(word in _CONTROL_OPERATORS for word in words):
+            return None
+
+        stages, current = [], []
+        for word in words:
+            if word == "|":
+                stages.append(current)
+                current = []
+            else:
+                current.append(word)
+        stages.append(current)
+
+        sections, entries = [], []
+        for stage in stages:
+            section = self._explain_stage(stage, entries)
+            if section is None:
+                return None
+            sections.append(section)
+
+        if len(sections) > 1:
+            sections.insert(0, f"A pipeline of {len(sections)} commands; each command's output is passed to the next.")
+        sources = sorted({"man page" if entry["source"] == "man" else "--help output" for entry in entries})
+        sections.append(f"(Explained from the local {' and '.join(sources)}.)")
+        return "\n\n".join(sections)
+
+    def _explain_stage(self, stage: list[str], entries: list[dict]) -> str | None:
+        """Explains one pipeline stage, appending the index entry it used to entries."""
+        lines = []
+        assignments = []
+        while stage and re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", stage[0]):
+            assignments.append(stage.pop(0))
+        if stage and stage[0] == "sudo":
+            if len(stage) > 1 and stage[1].startswith("-"):
+                return None # sudo options are not worth guessing at
+            lines.append("Runs with root privileges via sudo.")
+            stage = stage[1:]
+        if not stage:
+            return None
+
+        command, args = stage[0], stage[1:]
+        if command in SUBCOMMAND_COMMANDS and any(not arg.startswith("-") for arg in args):
+            if args[0].startswith("-"):
+                return None # Global options before the subcommand may take values; not worth guessing at
+            subcommand, args = args[0], args[1:]
+            entry = self.get_entry(command, subcommand)
+            title = f"{command} {subcommand}"
+        else:
+            entry = self.get_entry(command)
+            title = command
+        if entry is None:
+            return None
+        entries.append(entry)
+
+        summary = entry.get("summary")
+        lines.insert(0, f"{title}: {summary}" if summary else title)
+        if assignments:
+            lines.append(f"Environment: {', '.join(assignments)}")
+
+        flags, operands = [], []
+        end_of_options = False
+        for arg in args:
+            if not end_of_options and arg == "--":
+                end_of_options = True
+            elif not end_of_options and arg.startswith("-") and arg != "-":
+                described = self._describe_flag(arg, entry["options"])
+                if described is None:
+                    return None
+                flags.extend(described)
+            else:
+                operands.append(arg)
+
+        width = max((len(flag) for flag, _ in flags), default=0)
+        lines.extend(f"  {flag.ljust(width)}  {description}" for flag, description in flags)
+        if operands:
+            lines.append(f"Arguments: {' '.join(shlex.quote(o) for o in operands)}")
+        return "\n".join(lines)
+
+
+# --- Shared instance ---
+_index_instance = None
+
+
+def get_man_index(main_config: dict) -> ManIndex | None:
+    """Returns the process-wide man index, or None if it is disabled in the config.
+
+    Args:
+        main_config: The main application configuration object.
+    """
+    global _index_instance
+    index_config = main_config.get(MAN_INDEX_CONFIG_SECTION, {})
+    if not index_config.get(ENABLED_KEY, True):
+        return None
+    cache_dir = index_config.get(CACHE_DIR_KEY) or DEFAULT_CACHE_DIR
+    if not os.path.isabs(cache_dir):
+        cache_dir = os.path.join(PROJECT_ROOT, cache_dir)
+    if _index_instance is None or _index_instance.cache_dir != cache_dir:
+        _index_instance = ManIndex(
+            cache_dir,
+            use_help_output=index_config.get(USE_HELP_OUTPUT_KEY, False),
+            timeout_seconds=index_config.get(TIMEOUT_KEY, 3),
+            help_denylist=set(main_config.get("security", {}).get("warn_on_commands", [])),
+            help_allowlist=index_config.get(HELP_OUTPUT_ALLOWLIST_KEY),
+        )
+    return _index_instance
+
+
+def explain_command(command_line: str, main_config: dict) -> str | None:
+    """Explains a command from local documentation, or returns None if it cannot.
+
+    This may run `man` (or an allowlisted `<command> --help`) on first use of a command, so call it
+    from a worker thread when on the event loop.
+    """
+    index = get_man_index(main_config)
+    if index is None:
+        return None
+    try:
+        return index.explain(command_line)
+    except Exception as e:
+        logger.error(f"Man index explanation failed for '{command_line}': {e}", exc_info=True)
+        return None
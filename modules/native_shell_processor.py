@@ -123,6 +123,8 @@ class NativeShellProcessor:
             os.execve(self.shell, argv, env)
         else:
             logger.info(f"Parent process managing child PID: {pid} with PTY master fd: {master_fd}")
+            # Every intercepted line checks Ollama health; keep the cached state fresh in the background.
+            self.ollama_manager.start_health_heartbeat(self.config)
             
             original_termios = termios.tcgetattr(sys.stdin.fileno())
             
@@ -0,0 +1,261 @@
+# modules/ollama_client.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import httpx
+import ollama
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Configuration Keys (under the 'ollama_service' section) ---
+OLLAMA_SERVICE_CONFIG_SECTION = "ollama_service"
+REQUEST_TIMEOUT_KEY = "request_timeout_seconds" # Read/write timeout for a model call
+CONNECT_TIMEOUT_KEY = "connect_timeout_seconds"
+MAX_CONNECTIONS_KEY = "max_connections"
+MAX_KEEPALIVE_CONNECTIONS_KEY = "max_keepalive_connections"
+KEEPALIVE_EXPIRY_KEY = "keepalive_expiry_seconds" # Idle pooled connections are closed after this
+CONNECT_RETRIES_KEY = "connect_retries" # Transport-level retries for failed TCP connects
+RETRY_BACKOFF_MAX_KEY = "retry_backoff_max_seconds" # Upper bound for the exponential retry delay
+
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
+
+# --- Module-level state (shared by every caller in the process) ---
+_config_cached = None
+_settings_cached = None # Settings the current clients were built with
+_sync_client = None
+_async_client = None
+_async_client_loop = None # httpx async connections belong to the loop that opened them
+_langchain_models = {} # (class name, model, kwargs) -> LangChain model built with the pooled client settings
+_lock = threading.Lock() # Guards the state above; models are also built in worker threads
+
+
+def configure(main_config: dict):
+    """Sets the configuration used to build the shared clients.
+
+    Clients are rebuilt lazily on next use if host, timeout or pool settings changed.
+
+    Args:
+        main_config: The main application configuration object.
+    """
+    global _config_cached
+    _config_cached = main_config
+
+
+def get_ollama_host(main_config: dict | None = None) -> str:
+    """Returns the Ollama base URL from the config, falling back to OLLAMA_HOST.
+
+    Args:
+        main_config: The main application configuration object (optional).
+
+    Returns:
+        A URL such as "http://localhost:11434".
+    """
+    main_config = main_config or _config_cached
+    service_config = (main_config or {}).get(OLLAMA_SERVICE_CONFIG_SECTION, {})
+    if 'ollama_host' in service_config or 'ollama_port' in service_config:
+        ollama_host = service_config.get('ollama_host', 'http://localhost')
+        ollama_port = service_config.get('ollama_port', 11434)
+        if not isinstance(ollama_host, str) or not ollama_host.startswith(('http://', 'https://')):
+            ollama_host = f'http://{ollama_host}'
+        return f"{ollama_host}:{ollama_port}"
+    env_host = os.environ.get('OLLAMA_HOST')
+    if env_host:
+        return env_host if env_host.startswith(('http://', 'https://')) else f"http://{env_host}"
+    return DEFAULT_OLLAMA_HOST
+
+
+def _current_settings() -> tuple:
+    service_config = (_config_cached or {}).get(OLLAMA_SERVICE_CONFIG_SECTION, {})
+    return (
+        get_ollama_host(),
+        service_config.get(REQUEST_TIMEOUT_KEY, 120),
+        service_config.get(CONNECT_TIMEOUT_KEY, 5),
+        service_config.get(MAX_CONNECTIONS_KEY, 10),
+        service_config.get(MAX_KEEPALIVE_CONNECTIONS_KEY, 5),
+        service_config.get(KEEPALIVE_EXPIRY_KEY, 60),
+        service_config.get(CONNECT_RETRIES_KEY, 2),
+    )
+
+
+def _refresh_if_settings_changed():
+    """Drops the shared clients when the settings they were built with have changed."""
+    global _settings_cached, _sync_client, _async_client, _async_client_loop
+    settings = _current_settings()
+    if settings == _settings_cached:
+        return
+    if _settings_cached is not None:
+        logger.info("Ollama client settings changed; rebuilding the shared connection pool.")
+    _settings_cached = settings
+    _sync_client = None
+    _async_client = None
+    _async_client_loop = None
+    _langchain_models.clear()
+
+
+def _client_kwargs(is_async: bool) -> dict:
+    """Builds the httpx keyword arguments shared by the sync and async clients."""
+    host, request_timeout, connect_timeout, max_connections, max_keepalive, keepalive_expiry, connect_retries = _settings_cached
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=keepalive_expiry,
+    )
+    transport_cls = httpx.AsyncHTTPTransport if is_async else httpx.HTTPTransport
+    return {
+        "timeout": httpx.Timeout(request_timeout, connect=connect_timeout),
+        "transport": transport_cls(limits=limits, retries=connect_retries),
+    }
+
+
+def get_sync_client(main_config: dict | None = None) -> ollama.Client:
+    """Returns the process-wide synchronous Ollama client (keep-alive connection pool).
+
+    Args:
+        main_config: If given, updates the configuration used to build the client.
+    """
+    global _sync_client
+    if main_config is not None:
+        configure(main_config)
+    with _lock:
+        _refresh_if_settings_changed()
+        if _sync_client is None:
+            _sync_client = ollama.Client(host=_settings_cached[0], **_client_kwargs(is_async=False))
+            logger.debug(f"Created shared sync Ollama client for {_settings_cached[0]}.")
+        return _sync_client
+
+
+def get_async_client(main_config: dict | None = None) -> ollama.AsyncClient:
+    """Returns the process-wide async Ollama client for the running event loop.
+
+    Args:
+        main_config: If given, updates the configuration used to build the client.
+    """
+    global _async_client, _async_client_loop
+    if main_config is not None:
+        configure(main_config)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _lock:
+        _refresh_if_settings_changed()
+        if _async_client is None or _async_client_loop is not loop:
+            _async_client = ollama.AsyncClient(host=_settings_cached[0], **_client_kwargs(is_async=True))
+            _async_client_loop = loop
+            logger.debug(f"Created shared async Ollama client for {_settings_cached[0]}.")
+        return _async_client
+
+
+def _get_langchain_model(model_cls, model_name: str, main_config: dict | None, **kwargs):
+    """Returns a cached LangChain Ollama model whose clients use the pooled timeout, limits and retries.
+
+    The settings are passed through the model's supported sync/async_client_kwargs,
+    so each cached model keeps its own keep-alive pool for as long as it is cached.
+    """
+    if main_config is not None:
+        configure(main_config)
+    with _lock:
+        _refresh_if_settings_changed()
+        cache_key = (model_cls.__name__, model_name, repr(sorted(kwargs.items())))
+        model = _langchain_models.get(cache_key)
+        if model is None:
+            keep_alive = (_config_cached or {}).get(OLLAMA_SERVICE_CONFIG_SECTION, {}).get("keep_alive")
+            if keep_alive is not None and "keep_alive" in model_cls.model_fields:
+                kwargs.setdefault("keep_alive", keep_alive)
+            model = model_cls(model=model_name, base_url=_settings_cached[0],
+                              sync_client_kwargs=_client_kwargs(is_async=False),
+                              async_client_kwargs=_client_kwargs(is_async=True), **kwargs)
+            _langchain_models[cache_key] = model
+        return model
+
+
+def get_chat_model(model_name: str, main_config: dict | None = None, **kwargs):
+    """Returns a ChatOllama for the model that uses the pooled connection settings.
+
+    Args:
+        model_name: The Ollama model name.
+        main_config: The main application configuration object (optional).
+        **kwargs: Extra ChatOllama arguments (e.g. temperature=0).
+    """
+    from langchain_ollama import ChatOllama
+    return _get_langchain_model(ChatOllama, model_name, main_config, **kwargs)
+
+
+def get_llm(model_name: str, main_config: dict | None = None, **kwargs):
+    """Returns an OllamaLLM (completion model) that uses the pooled connection settings."""
+    from langchain_ollama.llms import OllamaLLM
+    return _get_langchain_model(OllamaLLM, model_name, main_config, **kwargs)
+
+
+def get_embeddings_model(model_name: str, main_config: dict | None = None, **kwargs):
+    """Returns an OllamaEmbeddings that uses the pooled connection settings."""
+    from langchain_ollama.embeddings import OllamaEmbeddings
+    return _get_langchain_model(OllamaEmbeddings, model_name, main_config, **kwargs)
+
+
+# --- Retries ---
+
+def is_retryable_error(error: Exception) -> bool:
+    """Returns True for errors worth retrying: connection problems and 5xx server responses."""
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, ollama.RequestError, httpx.TransportError))
+
+
+def _retry_policy(main_config: dict | None, max_retries_key: str, delay_key: str) -> tuple[int, float, float]:
+    main_config = main_config or _config_cached or {}
+    behavior_config = main_config.get('behavior', {})
+    max_retries = behavior_config.get(max_retries_key, 0)
+    base_delay = behavior_config.get(delay_key, 1)
+    max_delay = main_config.get(OLLAMA_SERVICE_CONFIG_SECTION, {}).get(RETRY_BACKOFF_MAX_KEY, 8)
+    return max_retries, base_delay, max_delay
+
+
+async def call_with_retries(coro_factory, main_config: dict | None = None, description: str = "Ollama API call",
+                            max_retries_key: str = 'ollama_api_call_retries', delay_key: str = 'ai_retry_delay_seconds'):
+    """Awaits coro_factory(), retrying retryable errors with exponential backoff.
+
+    The retry count and base delay are read from the 'behavior' section
+    (max_retries_key / delay_key); the delay doubles per attempt up to
+    'ollama_service.retry_backoff_max_seconds'.
+
+    Args:
+        coro_factory: Zero-argument callable returning a fresh awaitable per attempt.
+        main_config: The main application configuration object (optional).
+        description: Used in log messages.
+        max_retries_key: 'behavior' key holding the number of retries.
+        delay_key: 'behavior' key holding the base delay in seconds.
+
+    Returns:
+        The awaitable's result.
+    """
+    max_retries, base_delay, max_delay = _retry_policy(main_config, max_retries_key, delay_key)
+    for attempt in range(max_retries + 1): # +1 because initial attempt is not a retry
+        try:
+            return await coro_factory()
+        except Exception as e:
+            if not is_retryable_error(e) or attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            logger.warning(f"{description} failed (attempt {attempt+1}/{max_retries+1}): {e}. Retrying in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+
+def call_with_retries_sync(func, main_config: dict | None = None, description: str = "Ollama API call",
+                           max_retries_key: str = 'ollama_api_call_retries', delay_key: str = 'ai_retry_delay_seconds'):
+    """Synchronous counterpart of call_with_retries() for blocking client calls."""
+    max_retries, base_delay, max_delay = _retry_policy(main_config, max_retries_key, delay_key)
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if not is_retryable_error(e) or attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            logger.warning(f"{description} failed (attempt {attempt+1}/{max_retries+1}): {e}. Retrying in {delay:.1f}s.")
+            time.sleep(delay)
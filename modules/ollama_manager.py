@@ -5,9 +5,14 @@ import shutil
 import subprocess
 import logging
 import ollama # Main Ollama library
+import httpx
 import time
+import datetime
 import os
 
+from modules import ollama_scheduler
+from modules import ollama_client
+
 # --- Module-specific logger ---
 logger = logging.getLogger(__name__)
 
@@ -18,6 +23,18 @@ AUTO_START_OLLAMA_KEY = "auto_start_serve"
 OLLAMA_STARTUP_WAIT_KEY = "startup_wait_seconds" # Total time to wait for server after launch
 OLLAMA_SERVER_CHECK_RETRIES_KEY = "server_check_retries" # Number of checks within the wait period
 OLLAMA_SERVER_CHECK_INTERVAL_KEY = "server_check_interval_seconds" # Interval between checks
+MODEL_WARMUP_ENABLED_KEY = "warmup_models" # Preload ai_models once the server is ready
+MODEL_KEEP_ALIVE_KEY = "keep_alive" # How long Ollama keeps a warmed model resident (e.g. "30m", -1 for forever)
+MODEL_REWARM_INTERVAL_KEY = "rewarm_interval_seconds" # How often to check residency and re-warm evicted models
+OLLAMA_HEARTBEAT_INTERVAL_KEY = "health_heartbeat_interval_seconds" # Background health probe interval
+OLLAMA_HEALTH_TTL_KEY = "health_cache_ttl_seconds" # Max age of the cached health state before a caller re-probes
+OLLAMA_HEALTH_DEGRADED_LATENCY_KEY = "health_degraded_latency_ms" # Probe latency above which the server counts as degraded
+OLLAMA_HEALTH_PROBE_TIMEOUT_KEY = "health_probe_timeout_seconds" # A probe taking longer than this counts as down
+
+HEALTH_UNKNOWN = "unknown"
+HEALTH_UP = "up"
+HEALTH_DEGRADED = "degraded"
+HEALTH_DOWN = "down"
 
 TMUX_OLLAMA_SESSION_NAME = "micro_x_ollama_daemon" # Standardized session name
 
@@ -26,6 +43,10 @@ _ollama_exe_path_cached = None
 _append_output_func_cached = None
 _config_cached = None
 _is_initialized = False # Flag to ensure config and callback are set
+_model_warmup_task = None # Background task keeping the configured models resident
+_model_warmup_status = {} # model name -> {"state": str, "last_warmed": float | None, "error": str | None}
+_health_state = {"status": HEALTH_UNKNOWN, "latency_ms": None, "error": None, "checked_at": 0.0}
+_health_heartbeat_task = None
 
 def set_ollama_host_from_config(config_obj: dict):
     """
@@ -104,30 +125,130 @@ async def _find_ollama_executable() -> str | None:
         _append_output_func_cached("   Please ensure Ollama is installed and accessible, or configure its path.", style_class='error')
     return None
 
-async def is_ollama_server_running() -> bool:
-    """Checks if the Ollama server is running and responsive via an API call.
+def _health_setting(key: str, default):
+    """Reads a health-check setting from the cached config, falling back to a default."""
+    if not _config_cached:
+        return default
+    return _config_cached.get(OLLAMA_SERVICE_CONFIG_SECTION, {}).get(key, default)
+
+
+def _set_health_state(status: str, latency_ms: float | None = None, error: str | None = None):
+    """Updates the cached health state, logging transitions."""
+    previous_status = _health_state["status"]
+    _health_state.update(status=status, latency_ms=latency_ms, error=error, checked_at=time.monotonic())
+    if status != previous_status:
+        logger.info(f"Ollama health changed: {previous_status} -> {status}" + (f" ({error})" if error else ""))
+
+
+def get_ollama_health() -> dict:
+    """Returns a snapshot of the cached Ollama health state without any I/O.
 
     Returns:
-        True if the server is responsive, False otherwise.
+        A dict with 'status' (one of HEALTH_UP, HEALTH_DEGRADED, HEALTH_DOWN, HEALTH_UNKNOWN),
+        'latency_ms' of the last successful probe, 'error' and 'age_seconds' since the last update.
     """
-    if not _is_initialized: # Required for logging/feedback via _append_output_func_cached
-        logger.warning("Cannot check Ollama server status: Manager not initialized.")
-        # Allow check to proceed if possible, but feedback might be missing.
-    
-    # No need to check _ollama_exe_path_cached here, as ollama.list() doesn't depend on it directly.
-    # However, a responsive server implies ollama is installed and working.
+    snapshot = dict(_health_state)
+    snapshot["age_seconds"] = time.monotonic() - snapshot.pop("checked_at") if snapshot["checked_at"] else None
+    return snapshot
+
+
+def mark_ollama_request_failed(error: Exception | str | None = None):
+    """Marks the server down immediately after a real request failed to connect.
+
+    Errors returned *by* the server (e.g. an unknown model) prove it is up and are ignored.
+
+    Args:
+        error: The exception (or message) raised by the failed request.
+    """
+    if isinstance(error, ollama.ResponseError):
+        return
+    if isinstance(error, Exception) and not isinstance(error, (ConnectionError, ollama.RequestError, httpx.TransportError, TimeoutError)):
+        return
+    _set_health_state(HEALTH_DOWN, error=str(error) if error else "request failed")
+
+
+async def check_ollama_health() -> dict:
+    """Probes the server with ollama.list() and refreshes the cached health state.
+
+    Returns:
+        The updated health snapshot (see get_ollama_health).
+    """
+    degraded_latency_ms = _health_setting(OLLAMA_HEALTH_DEGRADED_LATENCY_KEY, 1500)
+    probe_timeout = _health_setting(OLLAMA_HEALTH_PROBE_TIMEOUT_KEY, 3)
+    started = time.monotonic()
     try:
-        await asyncio.to_thread(ollama.list)
-        logger.info("Ollama server is running and responsive (ollama.list() successful).")
-        return True
-    except ollama.RequestError as e: # Typically connection errors
-        logger.info(f"Ollama server appears to be down or unreachable: {e}")
-        return False
+        await asyncio.wait_for(ollama_client.get_async_client(_config_cached).list(), timeout=probe_timeout)
+        latency_ms = (time.monotonic() - started) * 1000
+        _set_health_state(HEALTH_DEGRADED if latency_ms > degraded_latency_ms else HEALTH_UP, latency_ms=latency_ms)
+        logger.debug(f"Ollama health probe OK in {latency_ms:.0f} ms.")
+    except (ollama.RequestError, ConnectionError, TimeoutError, httpx.TransportError) as e: # Typically connection errors
+        if _health_state["status"] != HEALTH_DOWN:
+            logger.info(f"Ollama server appears to be down or unreachable: {e}")
+        _set_health_state(HEALTH_DOWN, error=str(e))
     except Exception as e: # Other unexpected errors
         logger.error(f"Unexpected error while checking Ollama server status: {e}", exc_info=True)
-        if _append_output_func_cached:
+        if _append_output_func_cached and _health_state["status"] != HEALTH_DOWN:
             _append_output_func_cached(f"⚠️ Error checking Ollama status: {e}", style_class='warning')
+        _set_health_state(HEALTH_DOWN, error=str(e))
+    return get_ollama_health()
+
+
+async def is_ollama_server_running(force_check: bool = False) -> bool:
+    """Reports whether the Ollama server is responsive.
+
+    Normally answered from the cached health state kept fresh by the heartbeat,
+    so the common path does no I/O. A real probe is made only when the cache is
+    older than the configured TTL (or has never been filled) or force_check is set.
+
+    Args:
+        force_check: Always probe the server instead of trusting the cache.
+
+    Returns:
+        True if the server is up (possibly degraded), False otherwise.
+    """
+    ttl = _health_setting(OLLAMA_HEALTH_TTL_KEY, 10)
+    if not force_check and _health_state["status"] != HEALTH_UNKNOWN and time.monotonic() - _health_state["checked_at"] < ttl:
+        return _health_state["status"] != HEALTH_DOWN
+    state = await check_ollama_health()
+    return state["status"] != HEALTH_DOWN
+
+
+async def _health_heartbeat_loop(interval: float):
+    """Background loop re-probing the server so readers always find a fresh state."""
+    while True:
+        await check_ollama_health()
+        await asyncio.sleep(interval)
+
+
+def start_health_heartbeat(main_config: dict) -> bool:
+    """Starts the background heartbeat that keeps the cached health state fresh.
+
+    Args:
+        main_config: The main application configuration object.
+
+    Returns:
+        True if the heartbeat is running, False if it is disabled (interval <= 0).
+    """
+    global _health_heartbeat_task, _config_cached
+    if not _config_cached:
+        _config_cached = main_config
+    interval = main_config.get(OLLAMA_SERVICE_CONFIG_SECTION, {}).get(OLLAMA_HEARTBEAT_INTERVAL_KEY, 5)
+    if not interval or interval <= 0:
+        logger.info("Ollama health heartbeat is disabled in configuration.")
         return False
+    if _health_heartbeat_task and not _health_heartbeat_task.done():
+        return True
+    _health_heartbeat_task = asyncio.create_task(_health_heartbeat_loop(interval))
+    logger.info(f"Ollama health heartbeat started (every {interval}s).")
+    return True
+
+
+def stop_health_heartbeat():
+    """Cancels the background heartbeat, if running."""
+    global _health_heartbeat_task
+    if _health_heartbeat_task and not _health_heartbeat_task.done():
+        _health_heartbeat_task.cancel()
+    _health_heartbeat_task = None
 
 async def _is_tmux_session_running(session_name: str) -> bool:
     """Checks if a tmux session with the given name is running."""
@@ -202,7 +323,7 @@ async def _wait_for_server_readiness() -> bool:
         await asyncio.sleep(check_interval)
         if _append_output_func_cached:
             _append_output_func_cached(f"   Checking server status (attempt {i+1}/{check_retries})...", style_class='ai-thinking-detail')
-        if await is_ollama_server_running():
+        if await is_ollama_server_running(force_check=True):
             if _append_output_func_cached:
                 _append_output_func_cached("✅ Ollama server is now responsive.", style_class='success')
             return True
@@ -237,7 +358,7 @@ async def ensure_ollama_service(main_config: dict, append_output_callback: calla
     if not await _find_ollama_executable():
         return False
 
-    if await is_ollama_server_running():
+    if await is_ollama_server_running(force_check=True):
         if _append_output_func_cached:
             _append_output_func_cached("✅ Ollama server is already running and responsive.", style_class='success')
         return True
@@ -271,7 +392,7 @@ async def explicit_start_ollama_service(main_config: dict, append_output_callbac
     if not await _find_ollama_executable():
         return False
 
-    if await is_ollama_server_running():
+    if await is_ollama_server_running(force_check=True):
         if _append_output_func_cached:
             _append_output_func_cached("✅ Ollama server is already running and responsive.", style_class='success')
         return True
@@ -302,7 +423,7 @@ async def explicit_stop_ollama_service(main_config: dict, append_output_callback
         if _append_output_func_cached:
             _append_output_func_cached(f"ℹ️ No managed Ollama tmux session ('{TMUX_OLLAMA_SESSION_NAME}') found to stop.", style_class='info')
         # If no managed session, check if an external server is running
-        if await is_ollama_server_running():
+        if await is_ollama_server_running(force_check=True):
             if _append_output_func_cached:
                 _append_output_func_cached("   However, an Ollama server is currently responsive (possibly started externally).", style_class='warning')
             return True # No managed session to stop, but server is up (externally)
@@ -331,7 +452,7 @@ async def explicit_stop_ollama_service(main_config: dict, append_output_callback
         return False # Failed to stop the session
 
     # After attempting to stop, check overall server responsiveness
-    if await is_ollama_server_running():
+    if await is_ollama_server_running(force_check=True):
         if _append_output_func_cached:
             _append_output_func_cached(f"⚠️ Managed Ollama session '{TMUX_OLLAMA_SESSION_NAME}' was targeted for stopping, but an Ollama server is still responsive.", style_class='warning')
             _append_output_func_cached(f"   This might be an externally managed Ollama instance.", style_class='warning')
@@ -365,6 +486,152 @@ async def explicit_restart_ollama_service(main_config: dict, append_output_callb
 
     return await explicit_start_ollama_service(main_config, append_output_callback)
 
+def _normalize_model_name(model_name: str) -> str:
+    """Returns the model name with an explicit tag, matching how Ollama reports loaded models."""
+    return model_name if ':' in model_name else f"{model_name}:latest"
+
+
+def get_configured_model_names(main_config: dict) -> list[str]:
+    """Returns the unique model names configured in the 'ai_models' section, in config order.
+
+    Args:
+        main_config: The main application configuration object.
+
+    Returns:
+        A list of model names (duplicates shared by several roles are listed once).
+    """
+    model_names = []
+    for role_config in main_config.get('ai_models', {}).values():
+        model_name = role_config.get('model') if isinstance(role_config, dict) else role_config
+        if isinstance(model_name, str) and model_name and model_name not in model_names:
+            model_names.append(model_name)
+    return model_names
+
+
+async def _get_resident_models() -> dict | None:
+    """Queries Ollama for currently loaded models.
+
+    Returns:
+        A dict mapping normalized model names to their expiry datetime (or None),
+        or None if the server could not be queried.
+    """
+    try:
+        response = await ollama_client.get_async_client(_config_cached).ps()
+    except Exception as e:
+        logger.info(f"Could not query loaded Ollama models: {e}")
+        return None
+    resident = {}
+    for model_info in response.models:
+        name = model_info.model or model_info.name
+        if name:
+            resident[_normalize_model_name(name)] = model_info.expires_at
+    return resident
+
+
+async def _warm_up_model(model_name: str, keep_alive) -> bool:
+    """Loads a single model into memory by sending it an empty generate request."""
+    status = _model_warmup_status.setdefault(model_name, {"state": "pending", "last_warmed": None, "error": None})
+    status["state"] = "warming"
+    try:
+        # An empty prompt makes Ollama load the model without generating anything.
+        await ollama_scheduler.get_scheduler().run(
+            model_name, lambda: ollama_client.get_async_client(_config_cached).generate(model=model_name, prompt='', keep_alive=keep_alive),
+            priority=ollama_scheduler.PRIORITY_BACKGROUND, group=ollama_scheduler.GROUP_WARMUP
+        )
+    except Exception as e:
+        logger.warning(f"Warm-up of model '{model_name}' failed: {e}")
+        status.update(state="failed", error=str(e))
+        return False
+    status.update(state="warm", last_warmed=time.time(), error=None)
+    logger.info(f"Model '{model_name}' warmed up (keep_alive={keep_alive}).")
+    return True
+
+
+async def warm_up_configured_models(main_config: dict) -> dict:
+    """Preloads every model from 'ai_models' that is not already resident (or about to expire).
+
+    Args:
+        main_config: The main application configuration object.
+
+    Returns:
+        A dict mapping model names to True (resident/warmed) or False (warm-up failed).
+    """
+    service_config = main_config.get(OLLAMA_SERVICE_CONFIG_SECTION, {})
+    keep_alive = service_config.get(MODEL_KEEP_ALIVE_KEY, "30m")
+    rewarm_interval = service_config.get(MODEL_REWARM_INTERVAL_KEY, 120)
+
+    resident = await _get_resident_models() or {}
+    # Anything expiring before the next check is re-warmed now; normal model calls
+    # reset the expiry to Ollama's default, which may be shorter than our keep_alive.
+    refresh_before = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=rewarm_interval * 2)
+
+    results = {}
+    for model_name in get_configured_model_names(main_config):
+        expires_at = resident.get(_normalize_model_name(model_name), False)
+        if expires_at is not False and (expires_at is None or expires_at.tzinfo is None or expires_at > refresh_before):
+            status = _model_warmup_status.setdefault(model_name, {"state": "warm", "last_warmed": None, "error": None})
+            status["state"] = "warm"
+            results[model_name] = True
+            continue
+        results[model_name] = await _warm_up_model(model_name, keep_alive)
+    return results
+
+
+async def _model_warmup_loop(main_config: dict):
+    """Background loop: warm all configured models, then periodically re-warm evicted ones."""
+    rewarm_interval = main_config.get(OLLAMA_SERVICE_CONFIG_SECTION, {}).get(MODEL_REWARM_INTERVAL_KEY, 120)
+    while True:
+        try:
+            results = await warm_up_configured_models(main_config)
+            logger.debug(f"Model warm-up pass complete: {results}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during model warm-up: {e}", exc_info=True)
+        if not rewarm_interval or rewarm_interval <= 0:
+            return
+        await asyncio.sleep(rewarm_interval)
+
+
+def start_model_warmup(main_config: dict) -> bool:
+    """Starts the background warm-up scheduler for the configured AI models.
+
+    Intended to be called once ensure_ollama_service() (or a quiet-mode server check)
+    has succeeded. Calling it again while the scheduler is running is a no-op.
+
+    Args:
+        main_config: The main application configuration object.
+
+    Returns:
+        True if the scheduler is running, False if warm-up is disabled.
+    """
+    global _model_warmup_task
+    if not main_config.get(OLLAMA_SERVICE_CONFIG_SECTION, {}).get(MODEL_WARMUP_ENABLED_KEY, True):
+        logger.info("Model warm-up is disabled in configuration.")
+        return False
+    if _model_warmup_task and not _model_warmup_task.done():
+        return True
+    for model_name in get_configured_model_names(main_config):
+        _model_warmup_status.setdefault(model_name, {"state": "pending", "last_warmed": None, "error": None})
+    _model_warmup_task = asyncio.create_task(_model_warmup_loop(main_config))
+    logger.info("Model warm-up scheduler started.")
+    return True
+
+
+def stop_model_warmup():
+    """Cancels the background warm-up scheduler, if running."""
+    global _model_warmup_task
+    if _model_warmup_task and not _model_warmup_task.done():
+        _model_warmup_task.cancel()
+        ollama_scheduler.get_scheduler().cancel_group(ollama_scheduler.GROUP_WARMUP)
+    _model_warmup_task = None
+
+
+def get_model_warmup_failures() -> dict:
+    """Returns {model name: error} for models whose last warm-up in this process failed."""
+    return {name: status["error"] for name, status in _model_warmup_status.items() if status.get("state") == "failed"}
+
+
 async def get_ollama_status_info(main_config: dict, append_output_callback: callable):
     """Handles the '/ollama status' command, printing status info to the UI."""
     _initialize_manager_if_needed(main_config, append_output_callback)
@@ -380,8 +647,11 @@ async def get_ollama_status_info(main_config: dict, append_output_callback: call
         # No point checking further if executable isn't found for managed session
         return
 
-    if await is_ollama_server_running():
-        _append_output_func_cached("  Ollama Server API: Responsive ✅", style_class='success')
+    health = await check_ollama_health()
+    if health["status"] == HEALTH_UP:
+        _append_output_func_cached(f"  Ollama Server API: Responsive ✅ ({health['latency_ms']:.0f} ms)", style_class='success')
+    elif health["status"] == HEALTH_DEGRADED:
+        _append_output_func_cached(f"  Ollama Server API: Degraded ⚠️ (slow response: {health['latency_ms']:.0f} ms)", style_class='warning')
     else:
         _append_output_func_cached("  Ollama Server API: Not responsive ❌", style_class='error')
 
@@ -392,4 +662,31 @@ async def get_ollama_status_info(main_config: dict, append_output_callback: call
 
     service_config = _config_cached.get(OLLAMA_SERVICE_CONFIG_SECTION, {})
     auto_start = service_config.get(AUTO_START_OLLAMA_KEY, True)
-    _append_output_func_cached(f"  Automatic Startup on micro_X launch: {'Enabled' if auto_start else 'Disabled'}", style_class='info')
\ No newline at end of file
+    _append_output_func_cached(f"  Automatic Startup on micro_X launch: {'Enabled' if auto_start else 'Disabled'}", style_class='info')
+
+    warmup_enabled = service_config.get(MODEL_WARMUP_ENABLED_KEY, True)
+    keep_alive = service_config.get(MODEL_KEEP_ALIVE_KEY, "30m")
+    if warmup_enabled:
+        rewarm_interval = service_config.get(MODEL_REWARM_INTERVAL_KEY, 120)
+        _append_output_func_cached(f"  Model Warm-up: Enabled (keep_alive={keep_alive}, re-warm check every {rewarm_interval}s)", style_class='info')
+    else:
+        _append_output_func_cached("  Model Warm-up: Disabled", style_class='info')
+
+    # '/ollama status' usually runs in a separate process, so residency is read from the server itself.
+    resident = await _get_resident_models()
+    if resident is None:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for model_name in get_configured_model_names(_config_cached):
+        expires_at = resident.get(_normalize_model_name(model_name), False)
+        if expires_at is False:
+            _append_output_func_cached(f"    {model_name}: Not loaded", style_class='warning')
+        elif expires_at is None or expires_at.tzinfo is None:
+            _append_output_func_cached(f"    {model_name}: Loaded ✅", style_class='success')
+        else:
+            remaining = expires_at - now
+            if remaining.days > 365:
+                _append_output_func_cached(f"    {model_name}: Loaded ✅ (kept resident indefinitely)", style_class='success')
+            else:
+                minutes = max(0, int(remaining.total_seconds() // 60))
+                _append_output_func_cached(f"    {model_name}: Loaded ✅ (expires in ~{minutes} min)", style_class='success')
\ No newline at end of file
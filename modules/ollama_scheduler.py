@@ -0,0 +1,224 @@
+# modules/ollama_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Priority classes (lower value is served first) ---
+PRIORITY_INTERACTIVE = 0 # Translation, validation, routing: the user is waiting at the prompt
+PRIORITY_EXPLAIN = 1     # Explanations requested from the confirmation flow
+PRIORITY_BACKGROUND = 2  # Warm-up, ingestion and anything else nobody is waiting on
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_EXPLAIN: "explain",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# --- Well-known cancellation groups ---
+GROUP_INTERACTIVE = "interactive"
+GROUP_EXPLAIN = "explain"
+GROUP_WARMUP = "warmup"
+
+# --- Configuration Keys (under the 'ollama_service' section) ---
+MAX_CONCURRENT_PER_MODEL_KEY = "max_concurrent_requests_per_model"
+MODEL_CONCURRENCY_LIMITS_KEY = "model_concurrency_limits" # Optional {model_name: limit} overrides
+
+# Requests that waited longer than this are logged with the queue depth at the time.
+SLOW_WAIT_LOG_THRESHOLD_SECONDS = 0.25
+
+
+class OllamaRequestCancelled(Exception):
+    """Raised to the caller when its queued or running request was cancelled via cancel_group()."""
+
+
+class OllamaRequestScheduler:
+    """Coordinates model calls to the local Ollama instance.
+
+    Each request names the model it uses and a priority class. At most N requests
+    per model run at once; the rest wait in a priority queue (FIFO within a class),
+    so interactive work overtakes explanations and background jobs. Requests can be
+    tagged with a group and cancelled together when the user moves on.
+    """
+
+    def __init__(self, default_concurrency: int = 1, model_limits: dict | None = None):
+        self.default_concurrency = max(1, int(default_concurrency))
+        self.model_limits = dict(model_limits or {})
+        self._active = {} # model -> number of running requests
+        self._waiters = {} # model -> heap of (priority, seq, future)
+        self._sequence = itertools.count()
+        self._groups = {} # group -> set of handles (waiting futures or running tasks)
+        self._wait_stats = {
+            priority: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0, "cancelled": 0}
+            for priority in PRIORITY_NAMES
+        }
+
+    def configure(self, main_config: dict):
+        """Applies concurrency limits from the 'ollama_service' config section."""
+        service_config = main_config.get('ollama_service', {})
+        self.default_concurrency = max(1, int(service_config.get(MAX_CONCURRENT_PER_MODEL_KEY, self.default_concurrency)))
+        self.model_limits = dict(service_config.get(MODEL_CONCURRENCY_LIMITS_KEY, self.model_limits) or {})
+
+    def _limit_for(self, model: str) -> int:
+        return max(1, int(self.model_limits.get(model, self.default_concurrency)))
+
+    def _queue_depth(self, model: str | None = None) -> int:
+        heaps = [self._waiters.get(model, [])] if model else self._waiters.values()
+        return sum(1 for heap in heaps for _, _, future in heap if not future.done())
+
+    async def _acquire(self, model: str, priority: int, group: str | None):
+        """Waits for a free slot for the model, honouring priority order."""
+        waiters = self._waiters.setdefault(model, [])
+        if self._active.get(model, 0) < self._limit_for(model) and not self._queue_depth(model):
+            self._active[model] = self._active.get(model, 0) + 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(waiters, (priority, next(self._sequence), future))
+        self._add_to_group(group, future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on.
+                self._release(model)
+            raise
+        finally:
+            self._discard_from_group(group, future)
+
+    def _release(self, model: str):
+        """Hands the model slot to the highest-priority waiter, or frees it."""
+        waiters = self._waiters.get(model, [])
+        while waiters:
+            _, _, future = heapq.heappop(waiters)
+            if not future.done():
+                future.set_result(None) # Slot is transferred; the active count stays the same.
+                return
+        self._active[model] = max(0, self._active.get(model, 0) - 1)
+
+    def _add_to_group(self, group: str | None, handle):
+        if group:
+            self._groups.setdefault(group, set()).add(handle)
+
+    def _discard_from_group(self, group: str | None, handle):
+        if group and group in self._groups:
+            self._groups[group].discard(handle)
+            if not self._groups[group]:
+                del self._groups[group]
+
+    def _record_wait(self, model: str, priority: int, waited: float):
+        stats = self._wait_stats.setdefault(priority, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0, "cancelled": 0})
+        stats["count"] += 1
+        stats["total_seconds"] += waited
+        stats["last_seconds"] = waited
+        stats["max_seconds"] = max(stats["max_seconds"], waited)
+        if waited >= SLOW_WAIT_LOG_THRESHOLD_SECONDS:
+            logger.info(f"Ollama request for '{model}' ({PRIORITY_NAMES.get(priority, priority)}) waited {waited * 1000:.0f} ms; "
+                        f"{self._queue_depth(model)} still queued for this model.")
+
+    async def run(self, model: str, coro_factory, priority: int = PRIORITY_INTERACTIVE, group: str | None = None):
+        """Runs a model call once a slot for the model is available.
+
+        Args:
+            model: The Ollama model the call will use (the concurrency key).
+            coro_factory: Zero-argument callable returning the awaitable to run, e.g.
+                ``lambda: chain.ainvoke(inputs)``. It is only called once the slot is granted.
+            priority: One of PRIORITY_INTERACTIVE, PRIORITY_EXPLAIN or PRIORITY_BACKGROUND.
+            group: Optional tag used by cancel_group() to abandon related requests.
+
+        Returns:
+            Whatever the awaitable returns.
+
+        Raises:
+            OllamaRequestCancelled: If the request was cancelled via cancel_group().
+        """
+        model = model or "default"
+        enqueued_at = time.monotonic()
+        try:
+            await self._acquire(model, priority, group)
+        except asyncio.CancelledError:
+            if asyncio.current_task() and asyncio.current_task().cancelling():
+                raise # The caller itself is being cancelled.
+            self._wait_stats[priority]["cancelled"] += 1
+            raise OllamaRequestCancelled(f"Request for '{model}' was cancelled while queued.") from None
+        self._record_wait(model, priority, time.monotonic() - enqueued_at)
+
+        task = asyncio.ensure_future(coro_factory())
+        self._add_to_group(group, task)
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                task.cancel() # The caller was cancelled; stop the model call too.
+                raise
+            self._wait_stats[priority]["cancelled"] += 1
+            raise OllamaRequestCancelled(f"Request for '{model}' was cancelled while running.") from None
+        finally:
+            self._discard_from_group(group, task)
+            self._release(model)
+
+    def cancel_group(self, group: str) -> int:
+        """Cancels every queued or running request tagged with the group.
+
+        Returns:
+            The number of requests cancelled.
+        """
+        handles = self._groups.pop(group, set())
+        cancelled = 0
+        for handle in handles:
+            if not handle.done():
+                handle.cancel()
+                cancelled += 1
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} Ollama request(s) in group '{group}'.")
+        return cancelled
+
+    def get_stats(self) -> dict:
+        """Returns queue depth, running counts and wait-time statistics.
+
+        Returns:
+            A dict with 'queued' (per priority name), 'active' (per model) and
+            'wait' (per priority name: count, avg_ms, max_ms, last_ms, cancelled).
+        """
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for heap in self._waiters.values():
+            for priority, _, future in heap:
+                if not future.done():
+                    queued[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        wait = {}
+        for priority, stats in self._wait_stats.items():
+            count = stats["count"]
+            wait[PRIORITY_NAMES.get(priority, str(priority))] = {
+                "count": count,
+                "avg_ms": (stats["total_seconds"] / count * 1000) if count else 0.0,
+                "max_ms": stats["max_seconds"] * 1000,
+                "last_ms": stats["last_seconds"] * 1000,
+                "cancelled": stats["cancelled"],
+            }
+        return {
+            "queued": queued,
+            "active": {model: n for model, n in self._active.items() if n},
+            "wait": wait,
+        }
+
+
+# --- Shared instance ---
+_scheduler_instance = None
+
+def get_scheduler(main_config: dict | None = None) -> OllamaRequestScheduler:
+    """Returns the process-wide scheduler, creating it on first use.
+
+    Args:
+        main_config: If given, (re)applies the concurrency limits from its 'ollama_service' section.
+    """
+    global _scheduler_instance
+    if _scheduler_instance is None:
+        _scheduler_instance = OllamaRequestScheduler()
+    if main_config:
+        _scheduler_instance.configure(main_config)
+    return _scheduler_instance
@@ -3,6 +3,7 @@
 # **Purpose:** Analyzes command output to detect TUI-like content by measuring the
 # density of ANSI escape codes. This helps prevent garbled text from being
 # printed to the main output area for commands that should be fully interactive.
+# Alternate-screen switches and absolute cursor positioning decide on their own.
 #
 # **Public Functions:**
 #
@@ -24,15 +25,31 @@
 #         bool: True if the output is determined to be TUI-like, False otherwise.
 #     """
 #
+# class TUIOutputDetector(line_threshold_pct, char_threshold_pct):
+#     """
+#     The same analysis, done incrementally over output that arrives in chunks.
+#     feed(chunk) -> bool reports whether the output seen so far is TUI-like
+#     (by percentage only after a minimum sample); finish() -> bool gives the
+#     final verdict once the output has ended.
+#     """
+#
+# def iter_escape_sequences(text: str) -> Iterator[tuple[str, str]]:
+#     """
+#     Yields (kind, sequence) for every terminal escape sequence in text, with
+#     kind one of the SEQ_* constants (e.g. SEQ_SGR, SEQ_ALT_SCREEN, SEQ_OSC).
+#     """
+#
 # **Key Global Constants/Variables:**
-#   (None intended for direct external use)
+#   SEQ_* kinds, ESCAPE_SEQUENCE_PATTERN and DECISIVE_SEQUENCE_KINDS.
 #
 # --- END API DOCUMENTATION ---
 
 #!/usr/bin/env python
 
 import re
+import codecs
 import logging
+from typing import Iterator
 
 # Module-specific logger
 # To see these logs when running the main micro_X application,
@@ -45,11 +62,180 @@ logger = logging.getLogger(__name__)
 # This pattern is a good starting point for detecting screen manipulation codes.
 ANSI_ESCAPE_PATTERN = re.compile(r'\x1B\[[0-9;]*[a-zA-Z]')
 
+# --- Escape-sequence kinds ---
+SEQ_ALT_SCREEN = "alt_screen" # DEC private modes 1049/1047/47: switch to/from the alternate screen
+SEQ_CURSOR_POSITION = "cursor_position" # Absolute cursor addressing (CUP, HVP, VPA)
+SEQ_PRIVATE_MODE = "private_mode" # Other DEC private modes, e.g. hiding the cursor (?25l)
+SEQ_SGR = "sgr" # Colours and text attributes
+SEQ_CSI = "csi" # Any other control sequence (erase, relative cursor moves, scrolling, ...)
+SEQ_OSC = "osc" # Operating system commands (window title, hyperlinks, ...)
+SEQ_ESC = "esc" # Other escapes (ESC 7/8, ESC M, character set selection, ...)
+
+# Characters that end a line for str.splitlines(), as a regex character-class body.
+_LINE_BREAK_CLASS = r"\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029"
+
+# Checked in order; the first entry that matches at a position classifies the sequence.
+# No pattern matches across a line break, so sequences can be counted line by line.
+_ESCAPE_SEQUENCE_TABLE = (
+    (SEQ_ALT_SCREEN, r'\x1B\[\?(?:1049|1047|47)[hl]'),
+    (SEQ_PRIVATE_MODE, r'\x1B\[\?[0-9;]*[hl]'),
+    (SEQ_CURSOR_POSITION, r'\x1B\[[0-9;]*[Hfd]'),
+    (SEQ_SGR, r'\x1B\[[0-9;:]*m'),
+    (SEQ_CSI, r'\x1B\[[0-?]*[ -/]*[@-~]'),
+    (SEQ_OSC, rf'\x1B\][^\x07\x1B{_LINE_BREAK_CLASS}]*(?:\x07|\x1B\\)'),
+    (SEQ_ESC, r'\x1B[ -/]*[0-Z\\^-~]'),
+)
+ESCAPE_SEQUENCE_PATTERN = re.compile("|".join(f"(?P<{kind}>{pattern})" for kind, pattern in _ESCAPE_SEQUENCE_TABLE))
+
+# Sequences only full-screen programs emit; one of them settles the detection.
+DECISIVE_SEQUENCE_KINDS = frozenset({SEQ_ALT_SCREEN, SEQ_CURSOR_POSITION})
+
 # Default thresholds for detection. These might require tuning based on testing.
 # If these percentages are met or exceeded, the output is considered TUI-like.
 DEFAULT_LINE_THRESHOLD_PERCENT = 30.0  # Percentage of lines containing ANSI codes.
 DEFAULT_CHAR_THRESHOLD_PERCENT = 3.0   # Percentage of total characters that are part of ANSI codes.
 
+# While output is still streaming, the percentages only decide once this much has
+# been seen; a few coloured lines at the start of normal output must not settle it.
+MIN_SAMPLE_LINES = 20
+MIN_SAMPLE_CHARS = 1000
+
+# Characters str.splitlines() treats as line boundaries.
+_LINE_BREAK_CHARS = frozenset("\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029")
+# An escape sequence cut off at the end of a chunk (it may still become a match).
+# OSC strings are only held back up to a bounded length.
+_MAX_PARTIAL_ESCAPE = 512
+_PARTIAL_ESCAPE_PATTERN = re.compile(
+    rf'\x1B(?:\[[0-?]*[ -/]*|\][^\x07\x1B{_LINE_BREAK_CLASS}]*\x1B?|[ -/]+)?\Z'
+)
+
+
+def iter_escape_sequences(text: str) -> Iterator[tuple[str, str]]:
+    """Yields (kind, sequence) for every terminal escape sequence in text."""
+    for match in ESCAPE_SEQUENCE_PATTERN.finditer(text):
+        yield match.lastgroup, match.group()
+
+
+class TUIOutputDetector:
+    """Decides whether output is TUI-like while it streams in, without keeping it in memory.
+
+    Running counters replace the full-text scan of is_tui_like_output: lines seen,
+    lines containing escape sequences, escape-sequence characters and total
+    characters, plus a count per sequence kind in `sequence_counts` (lines
+    are counted exactly like str.splitlines, including a CRLF split across
+    chunks). An escape sequence cut off at the end of a chunk is held back until
+    the next one. A sequence of a DECISIVE_SEQUENCE_KINDS kind (alternate screen,
+    cursor addressing) decides at once, whenever it appears; `decided_by` then
+    names its kind. After each chunk the thresholds are checked against everything
+    seen so far, but only once at least min_sample_lines lines and
+    min_sample_chars characters have been seen; finish() applies them to whatever
+    there is. Once reached, the verdict is final and later chunks are not
+    scanned. Chunks may be str or bytes (decoded as UTF-8).
+    """
+
+    def __init__(self, line_threshold_pct: float = DEFAULT_LINE_THRESHOLD_PERCENT,
+                 char_threshold_pct: float = DEFAULT_CHAR_THRESHOLD_PERCENT,
+                 min_sample_lines: int = MIN_SAMPLE_LINES, min_sample_chars: int = MIN_SAMPLE_CHARS):
+        self.line_threshold_pct = line_threshold_pct
+        self.char_threshold_pct = char_threshold_pct
+        self.min_sample_lines = min_sample_lines
+        self.min_sample_chars = min_sample_chars
+        self.is_tui = False
+        self.decided_by = None # The decisive sequence kind, if one settled the detection
+        self.sequence_counts: dict[str, int] = {}
+        self.lines = 0 # Completed lines
+        self.ansi_lines = 0 # Completed lines containing an escape sequence
+        self.ansi_chars = 0
+        self.total_chars = 0
+        self._line_open = False # The current (unterminated) line has characters
+        self._line_has_ansi = False
+        self._after_cr = False # The last character counted was a CR (a following LF belongs to it)
+        self._pending = ""
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, chunk) -> bool:
+        """Adds a chunk of output. Returns True once the output is considered TUI-like."""
+        if self.is_tui:
+            return True
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        text = self._pending + chunk
+        partial = _PARTIAL_ESCAPE_PATTERN.search(text, max(0, len(text) - _MAX_PARTIAL_ESCAPE))
+        if partial:
+            self._pending = text[partial.start():]
+            text = text[:partial.start()]
+        else:
+            self._pending = ""
+        if self._count(text):
+            return True
+        if self.lines < self.min_sample_lines or self.total_chars < self.min_sample_chars:
+            return False # Too little output for the percentages to mean anything yet
+        return self._evaluate(final=False)
+
+    def finish(self) -> bool:
+        """Counts any held-back text and returns the final verdict."""
+        if self.is_tui:
+            return True
+        decided = self._count(self._pending + self._decoder.decode(b"", final=True))
+        self._pending = ""
+        return decided or self._evaluate(final=True)
+
+    def _count(self, text: str) -> bool:
+        """Counts text; returns True if it contained a decisive sequence."""
+        if not text:
+            return False
+        self.total_chars += len(text)
+        if self._after_cr and text[0] == "\n":
+            text = text[1:] # Second half of a CRLF that straddled two chunks
+        self._after_cr = text.endswith("\r")
+        for piece in text.splitlines(keepends=True):
+            for match in ESCAPE_SEQUENCE_PATTERN.finditer(piece):
+                kind = match.lastgroup
+                self.sequence_counts[kind] = self.sequence_counts.get(kind, 0) + 1
+                if kind in DECISIVE_SEQUENCE_KINDS:
+                    logger.info(f"TUI-like output DETECTED from a '{kind}' escape sequence: {match.group()!r}")
+                    self.is_tui = True
+                    self.decided_by = kind
+                    return True
+                self._line_has_ansi = True
+                self.ansi_chars += match.end() - match.start()
+            if piece[-1] in _LINE_BREAK_CHARS:
+                # The piece ends with a line break: the line is complete.
+                self.lines += 1
+                self.ansi_lines += self._line_has_ansi
+                self._line_open = self._line_has_ansi = False
+            else:
+                self._line_open = True
+        return False
+
+    def _evaluate(self, final: bool) -> bool:
+        """Applies the thresholds to the counts so far (completed lines plus the open line)."""
+        num_lines = self.lines + (1 if self._line_open else 0)
+        if not num_lines or not self.total_chars:
+            return False
+        ansi_lines = self.ansi_lines + (1 if self._line_has_ansi else 0)
+        percentage_of_ansi_lines = (ansi_lines / num_lines) * 100
+        percentage_of_ansi_chars = (self.ansi_chars / self.total_chars) * 100
+        if percentage_of_ansi_lines >= self.line_threshold_pct:
+            logger.info(
+                f"TUI-like output DETECTED based on line threshold: "
+                f"{percentage_of_ansi_lines:.2f}% >= {self.line_threshold_pct:.2f}%"
+            )
+            self.is_tui = True
+        elif percentage_of_ansi_chars >= self.char_threshold_pct:
+            logger.info(
+                f"TUI-like output DETECTED based on character threshold: "
+                f"{percentage_of_ansi_chars:.2f}% >= {self.char_threshold_pct:.2f}%"
+            )
+            self.is_tui = True
+        elif final:
+            logger.debug(
+                f"Output NOT considered TUI-like. Line %%: {percentage_of_ansi_lines:.2f}, "
+                f"Char %%: {percentage_of_ansi_chars:.2f}"
+            )
+        return self.is_tui
+
+
 def is_tui_like_output(
     text_content: str,
     line_threshold_pct: float = DEFAULT_LINE_THRESHOLD_PERCENT,
@@ -59,6 +245,7 @@ def is_tui_like_output(
 
     It checks if the percentage of lines containing ANSI codes or the percentage
     of total characters that are part of ANSI codes exceeds given thresholds.
+    For output that arrives in pieces, use TUIOutputDetector directly.
 
     Args:
         text_content: The string content captured from a command's output.
@@ -74,65 +261,9 @@ def is_tui_like_output(
         logger.debug("is_tui_like_output: Received empty content. Returning False.")
         return False
 
-    lines = text_content.splitlines()
-    if not lines:
-        logger.debug("is_tui_like_output: Content split into zero lines. Returning False.")
-        return False
-
-    num_lines = len(lines)
-    ansi_lines_count = 0  # Number of lines that contain at least one ANSI sequence
-    total_ansi_chars_count = 0  # Total number of characters that are part of ANSI sequences
-    total_chars_in_content = len(text_content) # Total characters in the original string
-
-    logger.debug(f"is_tui_like_output: Analyzing {num_lines} lines, {total_chars_in_content} total characters.")
-
-    for line_num, line in enumerate(lines):
-        # Find all ANSI sequences in the current line
-        found_sequences = ANSI_ESCAPE_PATTERN.findall(line)
-        if found_sequences:
-            ansi_lines_count += 1
-            for seq in found_sequences:
-                total_ansi_chars_count += len(seq)
-            # Uncomment for very detailed logging of sequences found per line:
-            # logger.debug(f"Line {line_num+1}/{num_lines} contains ANSI sequences: {found_sequences}")
-
-    # Heuristic 1: Based on the percentage of lines containing ANSI codes
-    if num_lines > 0: # Ensure no division by zero
-        percentage_of_ansi_lines = (ansi_lines_count / num_lines) * 100
-        logger.debug(
-            f"is_tui_like_output: ANSI lines: {ansi_lines_count}/{num_lines} "
-            f"({percentage_of_ansi_lines:.2f}%)"
-        )
-        if percentage_of_ansi_lines >= line_threshold_pct:
-            logger.info(
-                f"TUI-like output DETECTED based on line threshold: "
-                f"{percentage_of_ansi_lines:.2f}% >= {line_threshold_pct:.2f}%"
-            )
-            return True
-    else:
-        percentage_of_ansi_lines = 0.0
-
-    # Heuristic 2: Based on the percentage of total characters that are part of ANSI codes
-    if total_chars_in_content > 0: # Ensure no division by zero
-        percentage_of_ansi_chars = (total_ansi_chars_count / total_chars_in_content) * 100
-        logger.debug(
-            f"is_tui_like_output: ANSI characters: {total_ansi_chars_count}/{total_chars_in_content} "
-            f"({percentage_of_ansi_chars:.2f}%)"
-        )
-        if percentage_of_ansi_chars >= char_threshold_pct:
-            logger.info(
-                f"TUI-like output DETECTED based on character threshold: "
-                f"{percentage_of_ansi_chars:.2f}% >= {char_threshold_pct:.2f}%"
-            )
-            return True
-    else:
-        percentage_of_ansi_chars = 0.0
-
-    logger.debug(
-        f"Output NOT considered TUI-like. Line %%: {percentage_of_ansi_lines:.2f}, "
-        f"Char %%: {percentage_of_ansi_chars:.2f}"
-    )
-    return False
+    detector = TUIOutputDetector(line_threshold_pct, char_threshold_pct)
+    detector.feed(text_content)
+    return detector.finish()
 
 # This block allows for direct testing of the module if run as a script.
 if __name__ == '__main__':
@@ -0,0 +1,197 @@
+# modules/output_control.py
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from prompt_toolkit.data_structures import Point
+from prompt_toolkit.layout import Window
+from prompt_toolkit.layout.controls import UIContent, UIControl
+from prompt_toolkit.layout.margins import ScrollbarMargin
+from prompt_toolkit.utils import Event
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_FRAME_RATE = 30 # 'ui.max_frame_rate': output-driven redraws per second
+
+
+class OutputTextStore:
+    """The text of the output pane, kept as a list of lines that only grows at the end.
+
+    Appending costs O(appended text): the new text is split into lines and added
+    after the last (unterminated) line. Lines are dropped from the front by moving
+    a start offset, and the list is compacted once more than half of it is dead, so
+    trimming is amortized O(1) per line. Lines follow Document semantics: text
+    ending in a newline has an empty last line.
+    """
+
+    def __init__(self, text: str = ""):
+        self._lines = [""]
+        self._start = 0 # Index of the first live line in _lines
+        self._text_cache = None
+        if text:
+            self.append(text)
+
+    @property
+    def line_count(self) -> int:
+        return len(self._lines) - self._start
+
+    def get_line(self, index: int) -> str:
+        """Returns line index (0-based, without its newline); '' if out of range."""
+        if 0 <= index < self.line_count:
+            return self._lines[self._start + index]
+        return ""
+
+    @property
+    def text(self) -> str:
+        """The whole text, joined on demand (only needed outside the render path)."""
+        if self._text_cache is None:
+            self._text_cache = "\n".join(self._lines[self._start:])
+        return self._text_cache
+
+    def append(self, text: str):
+        parts = text.split("\n")
+        self._lines[-1] += parts[0]
+        self._lines.extend(parts[1:])
+        self._text_cache = None
+
+    def drop_lines(self, count: int):
+        """Removes up to count lines from the front (the last line always stays)."""
+        count = min(count, self.line_count - 1)
+        if count <= 0:
+            return
+        self._start += count
+        if self._start > len(self._lines) // 2:
+            del self._lines[:self._start]
+            self._start = 0
+        self._text_cache = None
+
+
+class OutputControl(UIControl):
+    """A read-only UIControl that renders an OutputTextStore line by line.
+
+    Only the lines the Window actually draws are fetched, so rendering does not
+    depend on the amount of output. The control keeps a cursor row (never shown)
+    that the Window keeps visible, which gives the same scrolling behaviour as a
+    read-only TextArea: the view follows the end while the cursor is there, and
+    stays put when the user scrolled up. `on_cursor_position_changed` fires
+    whenever the row changes, like Buffer's event of the same name.
+    """
+
+    def __init__(self, store: OutputTextStore):
+        self.store = store
+        self.cursor_row = max(0, store.line_count - 1)
+        self.on_cursor_position_changed = Event(self)
+
+    def is_focusable(self) -> bool:
+        return False
+
+    def create_content(self, width: int, height: int) -> UIContent:
+        store = self.store
+        line_count = store.line_count
+        self.cursor_row = min(self.cursor_row, line_count - 1)
+        # Like BufferControl, end every line with a space: the Window can only locate
+        # (and keep visible) a cursor that sits on a character.
+        return UIContent(
+            get_line=lambda i: [("", store.get_line(i)), ("", " ")],
+            line_count=line_count,
+            cursor_position=Point(x=0, y=self.cursor_row),
+            show_cursor=False,
+        )
+
+    def set_cursor_row(self, row: int):
+        row = max(0, min(row, self.store.line_count - 1))
+        if row != self.cursor_row:
+            self.cursor_row = row
+            self.on_cursor_position_changed.fire()
+
+    def move_cursor_to_end(self):
+        self.set_cursor_row(self.store.line_count - 1)
+
+    def move_cursor_down(self):
+        self.set_cursor_row(self.cursor_row + 1)
+
+    def move_cursor_up(self):
+        self.set_cursor_row(self.cursor_row - 1)
+
+
+class OutputArea:
+    """The output pane: an OutputControl in a wrapping Window with a scrollbar.
+
+    It exposes `store`, `control` and `window`, and can be placed in a layout like
+    any prompt_toolkit widget.
+    """
+
+    def __init__(self, text: str = "", style: str = ""):
+        self.store = OutputTextStore(text)
+        self.control = OutputControl(self.store)
+        self.window = Window(
+            content=self.control,
+            style=style,
+            wrap_lines=True,
+            right_margins=[ScrollbarMargin(display_arrows=True)],
+        )
+
+    @property
+    def text(self) -> str:
+        return self.store.text
+
+    def __pt_container__(self):
+        return self.window
+
+
+class RenderScheduler:
+    """Coalesces output-driven redraw requests to at most max_frame_rate per second.
+
+    request() redraws at once if the last redraw is at least one frame old, and
+    otherwise schedules a single redraw for the end of the current frame; further
+    requests in between are absorbed by it. flush() redraws immediately and drops
+    the scheduled one, for moments that must not wait (an input prompt appearing).
+    A max_frame_rate of 0 or less disables the limit.
+
+    Application(min_redraw_interval=...) is not used instead: it throttles every
+    invalidate, including keystroke echo, and offers no way to skip the wait.
+    """
+
+    def __init__(self, invalidate: Callable[[], None], max_frame_rate: float = DEFAULT_MAX_FRAME_RATE):
+        self._invalidate = invalidate
+        self.min_interval = 1.0 / max_frame_rate if max_frame_rate and max_frame_rate > 0 else 0.0
+        self._last_redraw = float("-inf")
+        self._scheduled: asyncio.TimerHandle | None = None
+
+    @property
+    def pending(self) -> bool:
+        return self._scheduled is not None
+
+    def request(self):
+        """Asks for a redraw, at the latest one frame from now."""
+        if self._scheduled is not None:
+            return
+        delay = self._last_redraw + self.min_interval - time.monotonic()
+        if delay <= 0:
+            self.flush()
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush() # No event loop to schedule on (startup, tests)
+            return
+        self._scheduled = loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """Redraws now, replacing any scheduled redraw.
+
+        Used when an input prompt appears, so the prompt (and any pending output)
+        is shown without waiting for the next frame.
+        """
+        self.cancel()
+        self._last_redraw = time.monotonic()
+        self._invalidate()
+
+    def cancel(self):
+        """Drops a scheduled redraw, if any."""
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
@@ -0,0 +1,298 @@
+# modules/persistent_shell.py
+
+import asyncio
+import logging
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import uuid
+from typing import Optional
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Configuration Keys (under the 'behavior' section) ---
+EXECUTION_BACKEND_KEY = "execution_backend"
+BACKEND_SUBPROCESS = "subprocess" # A fresh /bin/sh per command (default)
+BACKEND_PERSISTENT_SHELL = "persistent_shell" # One long-lived bash per session
+
+READ_CHUNK_SIZE = 65536
+# Descriptors holding the shell's original stdout/stderr, which the end-of-command markers are written to.
+MARKER_STDOUT_FD = 98
+MARKER_STDERR_FD = 99
+
+
+class PersistentShellError(Exception):
+    """Raised when the persistent shell cannot be started or has died."""
+
+
+def _descendant_pids(pid: int, exclude: frozenset = frozenset()) -> list[int]:
+    """Returns the PIDs of all descendants of pid, children first.
+
+    Processes in exclude are skipped together with their own descendants.
+    """
+    descendants = []
+    pending = [pid]
+    while pending:
+        parent = pending.pop()
+        try:
+            with open(f"/proc/{parent}/task/{parent}/children", "r") as f:
+                children = [int(c) for c in f.read().split()]
+        except OSError:
+            try:
+                output = subprocess.run(["pgrep", "-P", str(parent)], capture_output=True, text=True, timeout=2).stdout
+                children = [int(c) for c in output.split()]
+            except (OSError, subprocess.SubprocessError, ValueError):
+                children = []
+        children = [child for child in children if child not in exclude]
+        descendants.extend(children)
+        pending.extend(children)
+    return descendants
+
+
+class PersistentShellCommand:
+    """One command running in a PersistentShell.
+
+    It mirrors the parts of asyncio.subprocess.Process that ShellEngine uses:
+    `stdout`/`stderr` stream readers that reach EOF when the command finishes,
+    `wait()`, `returncode`, `pid`, `terminate()` and `kill()`. After completion,
+    `cwd` holds the shell's working directory, so a `cd` inside the command can be
+    reflected in micro_X.
+
+    The shell runs without job control, so a command's processes share the shell's
+    process group. terminate() and kill() therefore signal only the processes the
+    shell started after this command began (and their descendants); background
+    jobs left by earlier commands are not touched.
+    """
+
+    def __init__(self, shell: "PersistentShell", command: str, preexisting_pids: frozenset = frozenset()):
+        self.shell = shell
+        self.command = command
+        self.preexisting_pids = preexisting_pids # Shell descendants that predate this command
+        self.stdout = asyncio.StreamReader()
+        self.stderr = asyncio.StreamReader()
+        self.returncode: Optional[int] = None
+        self.cwd: Optional[str] = None
+        self._done = asyncio.get_running_loop().create_future()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.shell.pid
+
+    async def wait(self) -> int:
+        """Waits until both streams reached the end-of-command marker; returns the exit code."""
+        await asyncio.shield(self._done)
+        return self.returncode
+
+    def _finish(self, returncode: int, cwd: Optional[str]):
+        if self._done.done():
+            return
+        self.returncode = returncode
+        self.cwd = cwd
+        self._done.set_result(returncode)
+
+    def _signal(self, sig: int) -> bool:
+        """Signals every process started by the command. Returns False if there were none."""
+        if self.shell.pid is None:
+            return False
+        pids = _descendant_pids(self.shell.pid, exclude=self.preexisting_pids)
+        for child_pid in pids:
+            try:
+                os.kill(child_pid, sig)
+            except ProcessLookupError:
+                pass
+        return bool(pids)
+
+    def terminate(self):
+        """Asks the command's processes to exit (SIGTERM), leaving the shell itself alone."""
+        if not self._signal(signal.SIGTERM):
+            # Nothing to signal: the command is running inside the shell itself (e.g. a builtin loop).
+            self.shell.kill()
+
+    def kill(self):
+        """Kills the command's processes, and the shell as well if it is still busy afterwards."""
+        self._signal(signal.SIGKILL)
+        if not self._done.done():
+            self.shell.kill()
+
+
+class PersistentShell:
+    """A long-lived bash process that runs micro_X's simple commands one at a time.
+
+    Commands are written to bash's stdin, each followed by a marker line carrying a
+    random session token, the exit status and $PWD (written to stdout and, without
+    the status, to stderr). Everything before the markers is the command's output;
+    anything after a marker (e.g. from a background job) is kept for the next
+    command. Exported variables, functions, `set` options and the working directory
+    therefore persist between commands, and no shell has to be started per command.
+    Commands get `</dev/null` as stdin so they cannot consume the control stream.
+
+    The shell's original stdout and stderr are kept on spare descriptors and the
+    markers are written there. If a command redirected the shell's own output
+    (`exec >file`), the markers still arrive, and the shell's stdout and stderr
+    are reset to the pipes before the next command.
+    """
+
+    def __init__(self, shell_path: Optional[str] = None, cwd: Optional[str] = None):
+        self.shell_path = shell_path or shutil.which("bash") or "/bin/bash"
+        self.initial_cwd = cwd
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._token = f"__MICRO_X_{uuid.uuid4().hex}__"
+        self._lock = asyncio.Lock()
+        self._completion_task: Optional[asyncio.Task] = None
+        self._leftover = {"stdout": b"", "stderr": b""} # Bytes read past the last marker, per stream
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.is_running else None
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        """Starts bash if it is not running yet."""
+        if self.is_running:
+            return
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                self.shell_path, "--noprofile", "--norc",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self.initial_cwd,
+                start_new_session=True, # Keep terminal signals (Ctrl+C in micro_X) away from the shell
+            )
+        except OSError as e:
+            raise PersistentShellError(f"Could not start persistent shell '{self.shell_path}': {e}") from e
+        self._leftover = {"stdout": b"", "stderr": b""}
+        # Keep the original output pipes for the markers (see _frame).
+        self.process.stdin.write(f"exec {MARKER_STDOUT_FD}>&1 {MARKER_STDERR_FD}>&2\n".encode("ascii"))
+        logger.info(f"Started persistent shell {self.shell_path} (PID: {self.process.pid})")
+
+    def _frame(self, command: str, cwd: Optional[str]) -> bytes:
+        token = self._token
+        out_fd, err_fd = MARKER_STDOUT_FD, MARKER_STDERR_FD
+        # eval keeps syntax errors inside the command from desynchronizing the framing.
+        # The marker descriptors are closed for the command, so its processes do not inherit them.
+        run_line = f"eval {shlex.quote(command)} </dev/null {out_fd}>&- {err_fd}>&-"
+        if cwd:
+            quoted_cwd = shlex.quote(cwd)
+            run_line = f'{{ [ "$PWD" = {quoted_cwd} ] || cd -- {quoted_cwd}; }} && {run_line}'
+        lines = [
+            run_line,
+            "__micro_x_status=$? __micro_x_lost=0",
+            # `exec >file` (or 2>) in the command moved the shell's own output: put it back.
+            f"[ /dev/fd/1 -ef /dev/fd/{out_fd} ] && [ /dev/fd/2 -ef /dev/fd/{err_fd} ] || {{ __micro_x_lost=1; exec 1>&{out_fd} 2>&{err_fd}; }}",
+            f"printf '\\n%s %d %d %s\\n' {token} \"$__micro_x_status\" \"$__micro_x_lost\" \"$PWD\" >&{out_fd}",
+            f"printf '\\n%s\\n' {token} >&{err_fd}",
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    async def run(self, command: str, cwd: Optional[str] = None) -> PersistentShellCommand:
+        """Starts a command in the shell (after changing to cwd) and returns its handle.
+
+        The shell is (re)started if needed. Commands are serialized: a new command
+        waits until the previous one has finished.
+        """
+        await self._lock.acquire()
+        try:
+            await self.start()
+            handle = PersistentShellCommand(self, command, frozenset(_descendant_pids(self.process.pid)))
+            self.process.stdin.write(self._frame(command, cwd))
+            await self.process.stdin.drain()
+        except BaseException:
+            self._lock.release()
+            raise
+        self._completion_task = asyncio.create_task(self._complete(handle))
+        return handle
+
+    async def _complete(self, handle: PersistentShellCommand):
+        """Forwards a command's output until its markers arrive, then records its status."""
+        process = self.process
+        try:
+            (returncode, output_lost, cwd), _ = await asyncio.gather(
+                self._forward(process.stdout, handle.stdout, "stdout"),
+                self._forward(process.stderr, handle.stderr, "stderr"),
+            )
+            if output_lost:
+                logger.warning(f"'{handle.command}' redirected the persistent shell's own output; it was reset.")
+            if returncode is None:
+                # The shell itself went away (e.g. the command ran `exit`); the next run starts a fresh one.
+                returncode = await process.wait()
+                logger.warning(f"Persistent shell exited while running '{handle.command}' (code {returncode}).")
+            handle._finish(returncode, cwd)
+        except Exception as e:
+            logger.error(f"Error reading persistent shell output for '{handle.command}': {e}", exc_info=True)
+            self.kill()
+            handle._finish(-signal.SIGKILL, None)
+        finally:
+            self._lock.release()
+
+    async def _forward(self, source: asyncio.StreamReader, target: asyncio.StreamReader, stream_name: str):
+        """Copies output to target until this command's marker.
+
+        Bytes after the marker line are kept for the next command. Returns
+        (exit code, output lost, cwd) parsed from the stdout marker.
+        """
+        marker = b"\n" + self._token.encode("ascii")
+        buffer = self._leftover[stream_name]
+        self._leftover[stream_name] = b""
+        result = (None, False, None)
+        while True:
+            index = buffer.find(marker)
+            line_end = buffer.find(b"\n", index + len(marker)) if index >= 0 else -1
+            if line_end >= 0:
+                if index:
+                    target.feed_data(buffer[:index])
+                if stream_name == "stdout":
+                    fields = buffer[index + len(marker):line_end].decode("utf-8", errors="replace").strip().split(" ", 2)
+                    try:
+                        result = (int(fields[0]), fields[1] == "1", fields[2] if len(fields) > 2 else None)
+                    except (ValueError, IndexError):
+                        result = (None, False, None)
+                self._leftover[stream_name] = buffer[line_end + 1:]
+                break
+            if index >= 0:
+                # Wait for the rest of the marker line; keep it in the buffer.
+                if index:
+                    target.feed_data(buffer[:index])
+                    buffer = buffer[index:]
+            else:
+                # Hold back anything that could be the start of a marker split across reads.
+                keep = len(marker) - 1
+                if len(buffer) > keep:
+                    target.feed_data(buffer[:-keep])
+                    buffer = buffer[-keep:]
+            chunk = await source.read(READ_CHUNK_SIZE)
+            if not chunk:
+                if buffer:
+                    target.feed_data(buffer)
+                break
+            buffer += chunk
+        target.feed_eof()
+        return result
+
+    def kill(self):
+        """Kills the shell and everything it started; the next run() starts a new one."""
+        if not self.is_running:
+            return
+        logger.warning(f"Killing persistent shell (PID: {self.process.pid}); shell state will be reset.")
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+
+    async def close(self):
+        """Ends the shell (EOF on its stdin, then SIGKILL if it does not exit promptly)."""
+        if not self.is_running:
+            return
+        try:
+            self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=2.0)
+        except (asyncio.TimeoutError, OSError):
+            self.kill()
+            await self.process.wait()
+        logger.info("Persistent shell closed.")
@@ -0,0 +1,370 @@
+# modules/process_tracker.py
+
+import asyncio
+import codecs
+import collections
+import logging
+import os
+import resource
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Configuration Keys (under the 'behavior' section) ---
+JOB_OUTPUT_MAX_LINES_KEY = "job_output_max_lines"
+DEFAULT_JOB_OUTPUT_MAX_LINES = 1000
+MAX_FINISHED_JOBS = 20 # Finished jobs kept for /jobs and /fg before the oldest are dropped
+
+READ_CHUNK_SIZE = 65536
+MAX_PENDING_CHARS = 1 << 20 # Text queued between flushes before it is delivered regardless of the interval
+
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_KILLED = "killed"
+
+
+async def pump_text_stream(stream: asyncio.StreamReader, on_text: Callable[[str], None], flush_interval: float,
+                           chunk_size: int = READ_CHUNK_SIZE, max_pending_chars: int = MAX_PENDING_CHARS):
+    """Reads a byte stream until EOF, passing decoded batches of complete lines to on_text.
+
+    A partial line (or a split UTF-8 sequence) is held back until it completes or the
+    stream ends. The stream is read as fast as data arrives, and calls to on_text
+    are coalesced to one per flush_interval seconds: text read within an interval
+    is queued and delivered by a timer at the end of it. Once more than
+    max_pending_chars are queued they are delivered at once, so the queue stays
+    bounded; since the stream is not read while on_text runs, a producer faster
+    than on_text is then slowed down through the pipe.
+    """
+    loop = asyncio.get_running_loop()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    tail = ""
+    pending = []
+    pending_chars = 0
+    flush_handle = None
+    last_flush = float("-inf")
+
+    def flush():
+        nonlocal flush_handle, last_flush, pending_chars
+        if flush_handle is not None:
+            flush_handle.cancel()
+            flush_handle = None
+        if pending:
+            text = "".join(pending)
+            pending.clear()
+            pending_chars = 0
+            last_flush = time.monotonic()
+            on_text(text)
+
+    try:
+        while True:
+            chunk = await stream.read(chunk_size)
+            text = tail + decoder.decode(chunk, final=not chunk)
+            if chunk:
+                cut = text.rfind("\n") + 1
+                if not cut and len(text) < chunk_size:
+                    tail = text
+                    continue # Hold a partial line until its newline (or EOF) arrives.
+                complete, tail = (text[:cut], text[cut:]) if cut else (text, "")
+            else:
+                complete, tail = text, ""
+            if complete:
+                pending.append(complete)
+                pending_chars += len(complete)
+                delay = last_flush + flush_interval - time.monotonic()
+                if delay <= 0 or pending_chars >= max_pending_chars:
+                    flush()
+                elif flush_handle is None:
+                    flush_handle = loop.call_later(delay, flush)
+            if not chunk:
+                break
+        flush()
+    finally:
+        if flush_handle is not None:
+            flush_handle.cancel()
+
+
+def format_duration(seconds: float) -> str:
+    """Formats a duration for display (e.g. '850 ms', '12.3s', '4m 05s')."""
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, secs = divmod(int(seconds), 60)
+    if minutes < 60:
+        return f"{minutes}m {secs:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+class TrackedProcess:
+    """A shell command whose resource usage is collected when it exits.
+
+    It offers the parts of asyncio.subprocess.Process that micro_X uses (`stdout`,
+    `stderr`, `wait()`, `returncode`, `pid`, `terminate()`, `kill()`), but the child
+    is reaped with os.wait4() in a dedicated thread, so CPU time and peak memory are
+    available afterwards in `rusage`. `wall_time` is measured from spawn to exit.
+
+    On Linux a child's ru_maxrss also counts the memory it inherited from micro_X
+    before exec, so a peak at or below micro_X's own peak at spawn time cannot be
+    told apart from that baseline and is reported as unknown.
+    """
+
+    def __init__(self, popen: subprocess.Popen, new_session: bool):
+        self._popen = popen
+        self._new_session = new_session
+        self.started_at = time.monotonic()
+        self._spawn_baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.wall_time: Optional[float] = None
+        self.rusage = None
+        self.stdout: Optional[asyncio.StreamReader] = None
+        self.stderr: Optional[asyncio.StreamReader] = None
+        self._exited = asyncio.get_running_loop().create_future()
+
+    @classmethod
+    async def start(cls, args, shell: bool = False, cwd: Optional[str] = None, env: Optional[dict] = None,
+                    stdin=None, new_session: bool = False) -> "TrackedProcess":
+        """Starts a process with stdout and stderr readable as StreamReaders.
+
+        Args:
+            args: An argument list, or a command line when shell is True.
+            shell: Run args through /bin/sh.
+            cwd: Working directory for the process.
+            env: Environment for the process (None inherits micro_X's).
+            stdin: Passed to Popen (None inherits micro_X's stdin; use subprocess.DEVNULL for background jobs).
+            new_session: Start the process in its own session/process group, so that
+                terminate() and kill() reach everything it spawned.
+        """
+        popen = subprocess.Popen(args, shell=shell, cwd=cwd, env=env, stdin=stdin,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 start_new_session=new_session)
+        process = cls(popen, new_session)
+        loop = asyncio.get_running_loop()
+        for name, pipe in (("stdout", popen.stdout), ("stderr", popen.stderr)):
+            reader = asyncio.StreamReader()
+            await loop.connect_read_pipe(lambda reader=reader: asyncio.StreamReaderProtocol(reader), pipe)
+            setattr(process, name, reader)
+        threading.Thread(target=process._reap, args=(loop,), name=f"wait4-{popen.pid}", daemon=True).start()
+        return process
+
+    @classmethod
+    async def start_shell(cls, command: str, cwd: Optional[str] = None, stdin=None, new_session: bool = False) -> "TrackedProcess":
+        """Starts a command line with /bin/sh (see start())."""
+        return await cls.start(command, shell=True, cwd=cwd, stdin=stdin, new_session=new_session)
+
+    def _reap(self, loop: asyncio.AbstractEventLoop):
+        while True:
+            try:
+                _, status, rusage = os.wait4(self._popen.pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                # Someone else reaped it; the exit status and usage are lost.
+                status, rusage = None, None
+                break
+        wall_time = time.monotonic() - self.started_at
+        returncode = os.waitstatus_to_exitcode(status) if status is not None else -1
+        self._popen.returncode = returncode # Keeps Popen from trying to reap the pid again
+        try:
+            loop.call_soon_threadsafe(self._set_exited, returncode, rusage, wall_time)
+        except RuntimeError:
+            pass # The event loop has already been closed.
+
+    def _set_exited(self, returncode: int, rusage, wall_time: float):
+        self.rusage = rusage
+        self.wall_time = wall_time
+        if not self._exited.done():
+            self._exited.set_result(returncode)
+
+    @property
+    def pid(self) -> int:
+        return self._popen.pid
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self._exited.result() if self._exited.done() else None
+
+    async def wait(self) -> int:
+        """Waits for the process to exit and returns its exit code (negative for a signal)."""
+        return await asyncio.shield(self._exited)
+
+    def elapsed(self) -> float:
+        """Seconds since the process started, or its total wall time once it has exited."""
+        return self.wall_time if self.wall_time is not None else time.monotonic() - self.started_at
+
+    def resource_usage(self) -> dict:
+        """Returns wall time, CPU user/system seconds and peak RSS (KB) where known."""
+        usage = {"wall_seconds": round(self.elapsed(), 3)}
+        if self.rusage is not None:
+            max_rss = self.rusage.ru_maxrss if self.rusage.ru_maxrss > self._spawn_baseline_rss else None
+            if max_rss is not None and sys.platform == "darwin":
+                max_rss //= 1024 # macOS reports bytes, Linux kilobytes
+            usage.update({
+                "cpu_user_seconds": round(self.rusage.ru_utime, 3),
+                "cpu_system_seconds": round(self.rusage.ru_stime, 3),
+                "max_rss_kb": max_rss,
+            })
+        return usage
+
+    def send_signal(self, sig: int):
+        if self.returncode is not None:
+            return
+        try:
+            if self._new_session:
+                os.killpg(self._popen.pid, sig)
+            else:
+                os.kill(self._popen.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+def format_resource_usage(usage: dict) -> str:
+    """Formats a resource_usage() dict as e.g. '2.1s wall, 0.40s CPU, 12.5 MB peak'."""
+    parts = [f"{format_duration(usage['wall_seconds'])} wall"]
+    if "cpu_user_seconds" in usage:
+        parts.append(f"{usage['cpu_user_seconds'] + usage['cpu_system_seconds']:.2f}s CPU")
+        if usage.get("max_rss_kb") is not None:
+            parts.append(f"{usage['max_rss_kb'] / 1024:.1f} MB peak")
+    return ", ".join(parts)
+
+
+class Job:
+    """A background command and the most recent lines of its output."""
+
+    def __init__(self, job_id: int, command: str, display_command: str, process: TrackedProcess, max_output_lines: int):
+        self.job_id = job_id
+        self.command = command
+        self.display_command = display_command
+        self.process = process
+        self.output = collections.deque(maxlen=max_output_lines) # (line, is_stderr), oldest first
+        self.dropped_lines = 0
+        self.output_bytes = 0
+        self.killed = False
+        self.finished = False # Set once the process exited and all of its output was collected
+        self.listeners = [] # Callables(text, is_stderr) following live output (see /fg)
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def state(self) -> str:
+        if not self.finished:
+            return JOB_RUNNING
+        if self.killed:
+            return JOB_KILLED
+        return JOB_DONE if self.process.returncode == 0 else JOB_FAILED
+
+    def _record(self, text: str, is_stderr: bool):
+        self.output_bytes += len(text.encode('utf-8'))
+        for line in text.rstrip("\n").split("\n"):
+            if len(self.output) == self.output.maxlen:
+                self.dropped_lines += 1
+            self.output.append((line, is_stderr))
+        for listener in list(self.listeners):
+            listener(text, is_stderr)
+
+    async def wait(self) -> int:
+        """Waits until the job has exited and all of its output was collected."""
+        if self.task is not None:
+            await asyncio.shield(self.task)
+        return self.process.returncode
+
+
+class JobManager:
+    """The table of background jobs started with '&' or '/bg'.
+
+    Each job runs in its own process group with stdin from /dev/null. Its output is
+    kept in a bounded per-job buffer instead of being written to the output pane,
+    and on_job_finished(job) is called once it exits.
+    """
+
+    def __init__(self, on_job_finished: Optional[Callable[[Job], None]] = None, max_output_lines: int = DEFAULT_JOB_OUTPUT_MAX_LINES):
+        self.on_job_finished = on_job_finished
+        self.max_output_lines = max(1, int(max_output_lines))
+        self.jobs: "collections.OrderedDict[int, Job]" = collections.OrderedDict()
+        self._next_id = 1
+
+    async def start(self, command: str, cwd: Optional[str] = None, display_command: Optional[str] = None) -> Job:
+        """Starts a command as a background job and returns it."""
+        process = await TrackedProcess.start_shell(command, cwd=cwd, stdin=subprocess.DEVNULL, new_session=True)
+        job = Job(self._next_id, command, display_command or command, process, self.max_output_lines)
+        self._next_id += 1
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._supervise(job))
+        logger.info(f"Started background job [{job.job_id}] (PID {process.pid}): {command}")
+        self._prune()
+        return job
+
+    async def _supervise(self, job: Job):
+        try:
+            await asyncio.gather(
+                pump_text_stream(job.process.stdout, lambda text: job._record(text, False), 0),
+                pump_text_stream(job.process.stderr, lambda text: job._record(text, True), 0),
+            )
+            await job.process.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error collecting output of job [{job.job_id}]: {e}", exc_info=True)
+            await job.process.wait()
+        job.finished = True
+        logger.info(f"Background job [{job.job_id}] finished with code {job.process.returncode}: {job.process.resource_usage()}")
+        if self.on_job_finished:
+            try:
+                self.on_job_finished(job)
+            except Exception as e:
+                logger.error(f"on_job_finished callback failed for job [{job.job_id}]: {e}", exc_info=True)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state != JOB_RUNNING]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def latest(self) -> Optional[Job]:
+        """The most recently started job that is still running, else the most recent job."""
+        running = [job for job in self.jobs.values() if job.state == JOB_RUNNING]
+        if running:
+            return running[-1]
+        return next(reversed(self.jobs.values()), None)
+
+    def list_jobs(self) -> list:
+        return list(self.jobs.values())
+
+    async def kill(self, job_id: int, grace_seconds: float = 2.0) -> bool:
+        """Terminates a job's process group (SIGTERM, then SIGKILL after grace_seconds).
+
+        Returns:
+            True if the job was running and has now exited, False if there was no such running job.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.process.returncode is not None:
+            return False
+        job.killed = True
+        job.process.terminate()
+        try:
+            await asyncio.wait_for(job.process.wait(), timeout=grace_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"Job [{job_id}] did not exit after SIGTERM; sending SIGKILL.")
+            job.process.kill()
+            await job.process.wait()
+        await job.wait()
+        return True
+
+    async def kill_all(self):
+        """Kills every running job (used when micro_X exits)."""
+        running = [job_id for job_id, job in self.jobs.items() if job.process.returncode is None]
+        await asyncio.gather(*(self.kill(job_id, grace_seconds=1.0) for job_id in running))
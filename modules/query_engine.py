@@ -5,7 +5,8 @@ import sys
 import re
 from modules.rag_manager import RAGManager
 from modules import config_handler
-from langchain_ollama.llms import OllamaLLM
+from modules import ollama_scheduler
+from modules import ollama_client
 from langchain_core.prompts import ChatPromptTemplate
 
 logger = logging.getLogger(__name__)
@@ -105,11 +106,14 @@ async def query_knowledge_base_rag(kb_name: str, query: str) -> str:
     prompt = ChatPromptTemplate.from_template(template)
 
     llm_model_name = config.get('ai_models', {}).get('router', {}).get('model', 'herawen/lisa')
-    llm = OllamaLLM(model=llm_model_name)
+    llm = ollama_client.get_llm(llm_model_name, config)
 
     chain = prompt | llm
 
-    raw_response = await chain.ainvoke({"context": context, "question": query})
+    raw_response = await ollama_scheduler.get_scheduler(config).run(
+        llm_model_name, lambda: chain.ainvoke({"context": context, "question": query}),
+        priority=ollama_scheduler.PRIORITY_INTERACTIVE
+    )
     
     # Programmatically strip the <think> block as a fallback
     clean_response = re.sub(r"<think>.*?</think>", "", raw_response, flags=re.DOTALL).strip()
@@ -2,7 +2,6 @@
 import logging
 import os
 from langchain_chroma import Chroma
-from langchain_ollama.embeddings import OllamaEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
     TextLoader,
@@ -15,6 +14,8 @@ from bs4 import BeautifulSoup as Soup
 import requests
 from urllib.parse import urljoin, urlparse
 
+from modules import ollama_client
+
 logger = logging.getLogger(__name__)
 
 SUPPORTED_EXTENSIONS = {".pdf", ".html", ".htm", ".txt", ".md", ".py", ".json", ".rst"}
@@ -43,7 +44,7 @@ class RAGManager:
             if not self.embedding_model_name:
                 logger.error("Embedding model not specified in config. Cannot initialize RAGManager.")
                 return
-            self.embeddings = OllamaEmbeddings(model=self.embedding_model_name)
+            self.embeddings = ollama_client.get_embeddings_model(self.embedding_model_name, self.config)
 
             # 2. Initialize Chroma vector store with LangChain wrapper
             self.vector_store = Chroma(
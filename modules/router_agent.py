@@ -3,11 +3,12 @@
 import logging
 import contextlib
 import io
-from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
 
 from modules.router_tools import get_all_tools
+from modules import ollama_manager
+from modules import ollama_scheduler
+from modules import ollama_client
 
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
@@ -25,19 +26,31 @@ TOOL_CALLING_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 
+def get_router_model_name(config: dict) -> str | None:
+    """Returns the configured router model name, or None if no router model is set."""
+    router_config = config.get('ai_models', {}).get('router', {})
+    return router_config.get('model') if isinstance(router_config, dict) else router_config
+
+
 def create_router_agent(config: dict):
-    """Creates and returns a LangChain agent configured for native tool calling."""
+    """Creates and returns a LangChain agent configured for native tool calling.
+
+    This is blocking (it imports the LangChain agent machinery on first use), so
+    callers on the event loop should run it in a worker thread.
+    """
     logger.debug("Creating Tool-Calling Router Agent.")
-    
-    router_config = config.get('ai_models', {}).get('router', {})
-    model_name = router_config.get('model') if isinstance(router_config, dict) else router_config
+
+    model_name = get_router_model_name(config)
 
     if not model_name:
         logger.error("Model for Router Agent not configured. Agent will not work.")
         return None
 
+    # Imported here so sessions that never reach the router don't pay for it at startup.
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+
     # Llama 3 models are particularly good at tool calling.
-    llm = ChatOllama(model=model_name, temperature=0)
+    llm = ollama_client.get_chat_model(model_name, config, temperature=0)
     tools = get_all_tools()
     
     # This agent is designed to work with models that support native tool calling.
@@ -49,7 +62,8 @@ def create_router_agent(config: dict):
         tools=tools,
         verbose=False, # Keep verbose for now to confirm it works
         handle_parsing_errors=True,
-        return_intermediate_steps=True # This is the crucial change
+        return_intermediate_steps=True, # This is the crucial change
+        metadata={"model": model_name} # Used as the scheduler key in run_router_agent
     )
     
     return agent_executor
@@ -65,10 +79,19 @@ async def run_router_agent(agent_executor, human_query: str) -> str | None:
         
     logger.info(f"Running tool-calling router agent for query: '{human_query}'")
     try:
-        # Redirect the agent's verbose print output to the logger
+        # Redirect the agent's verbose print output to the logger. redirect_stdout is
+        # process-wide, so it is only entered once the scheduler lets the agent run.
         f = io.StringIO()
-        with contextlib.redirect_stdout(f):
-            result = await agent_executor.ainvoke({"input": human_query})
+        model_name = (getattr(agent_executor, 'metadata', None) or {}).get("model")
+
+        async def invoke_agent():
+            with contextlib.redirect_stdout(f):
+                return await agent_executor.ainvoke({"input": human_query})
+
+        result = await ollama_scheduler.get_scheduler().run(
+            model_name, invoke_agent,
+            priority=ollama_scheduler.PRIORITY_INTERACTIVE, group=ollama_scheduler.GROUP_INTERACTIVE
+        )
         agent_output_log = f.getvalue()
         if agent_output_log:
             logger.info(f"Router Agent Internal Steps:\n{agent_output_log}")
@@ -92,6 +115,9 @@ async def run_router_agent(agent_executor, human_query: str) -> str | None:
         logger.warning(f"Could not extract command from intermediate steps. Final agent output: '{result.get('output')}'")
         return None
             
+    except ollama_scheduler.OllamaRequestCancelled:
+        raise # Superseded by new input; the caller abandons this query
     except Exception as e:
+        ollama_manager.mark_ollama_request_failed(e)
         logger.error(f"Error running router agent: {e}", exc_info=True)
         return None
@@ -0,0 +1,85 @@
+# modules/security_patterns.py
+
+import logging
+import re
+from typing import Optional
+
+# --- Module-specific logger ---
+logger = logging.getLogger(__name__)
+
+# --- Configuration Keys (under the 'security' section) ---
+DANGEROUS_PATTERNS_KEY = "dangerous_patterns"
+
+_GROUP_PREFIX = "_dangerous_"
+# Backreferences by number or name change meaning when the pattern is embedded in a larger one.
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class DangerousPatternMatcher:
+    """Screens commands against all 'security.dangerous_patterns' in one regex search.
+
+    The valid patterns are joined into a single alternation of named groups, so a
+    command is scanned once and the matching group tells which rule fired.
+    Patterns that cannot be embedded safely (backreferences, or a combination
+    that does not compile, e.g. because of global inline flags or duplicate group names) are
+    matched on their own. Invalid patterns are recorded in `invalid_patterns`
+    and logged once, when the matcher is built.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = tuple(patterns)
+        self.invalid_patterns: list[tuple[str, str]] = [] # (pattern, error message)
+        self.invalid_patterns_reported = False # Set by the caller once the user has been told
+        valid = []
+        for pattern in self.patterns:
+            try:
+                valid.append((pattern, re.compile(pattern)))
+            except (re.error, TypeError) as e:
+                self.invalid_patterns.append((pattern, str(e)))
+                logger.error(f"Invalid regex pattern in security config: '{pattern}'. Error: {e}")
+
+        embeddable = [(p, c) for p, c in valid if not _BACKREFERENCE.search(p)]
+        self._standalone = [(p, c) for p, c in valid if _BACKREFERENCE.search(p)]
+        self._combined: Optional[re.Pattern] = None
+        self._group_patterns: dict[str, str] = {}
+        if embeddable:
+            groups = {f"{_GROUP_PREFIX}{i}": pattern for i, (pattern, _) in enumerate(embeddable)}
+            try:
+                self._combined = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in groups.items()))
+                self._group_patterns = groups
+            except re.error as e:
+                logger.info(f"Security patterns cannot be combined ({e}); matching them one by one.")
+                self._standalone = valid
+
+    def match(self, command: str) -> Optional[str]:
+        """Returns the pattern that matches somewhere in command, or None if none does."""
+        if self._combined is not None:
+            found = self._combined.search(command)
+            if found:
+                pattern = self._group_patterns.get(found.lastgroup)
+                if pattern is None:
+                    # lastgroup names a group inside the user's pattern; find the enclosing rule.
+                    pattern = next(self._group_patterns[name] for name, value in found.groupdict().items()
+                                   if name in self._group_patterns and value is not None)
+                return pattern
+        for pattern, compiled in self._standalone:
+            if compiled.search(command):
+                return pattern
+        return None
+
+
+# --- Shared instance ---
+_matcher_instance: Optional[DangerousPatternMatcher] = None
+
+
+def get_dangerous_pattern_matcher(main_config: dict) -> DangerousPatternMatcher:
+    """Returns the matcher for the configured dangerous patterns, rebuilding it only when they change.
+
+    Args:
+        main_config: The main application configuration object.
+    """
+    global _matcher_instance
+    patterns = tuple(main_config.get("security", {}).get(DANGEROUS_PATTERNS_KEY, []))
+    if _matcher_instance is None or _matcher_instance.patterns != patterns:
+        _matcher_instance = DangerousPatternMatcher(patterns)
+    return _matcher_instance
@@ -10,11 +10,20 @@ import shutil
 import sys
 import hashlib
 import json
+import time
 from typing import Optional
 
-from modules.output_analyzer import is_tui_like_output
+from modules.output_analyzer import TUIOutputDetector
 
-from modules.router_agent import create_router_agent, run_router_agent
+from modules.router_agent import create_router_agent, run_router_agent, get_router_model_name
+from modules import ollama_client
+from modules import ollama_scheduler
+from modules.persistent_shell import PersistentShell, EXECUTION_BACKEND_KEY, BACKEND_SUBPROCESS, BACKEND_PERSISTENT_SHELL
+from modules.process_tracker import (JobManager, TrackedProcess, pump_text_stream, format_duration, format_resource_usage,
+                                     JOB_OUTPUT_MAX_LINES_KEY, DEFAULT_JOB_OUTPUT_MAX_LINES, JOB_RUNNING, JOB_DONE)
+from modules.security_patterns import get_dangerous_pattern_matcher
+from modules.command_ledger import (get_command_ledger, format_stats_report, DEFAULT_STATS_TOP_N,
+                                     KIND_SIMPLE, KIND_SEMI_INTERACTIVE, KIND_SCRIPT, KIND_BACKGROUND)
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +50,163 @@ def _set_nested_config(config_dict, key_path, new_value):
     d[keys[-1]] = new_value
     return True, None # Success
 
+def _format_byte_count(count: int) -> str:
+    """Formats a byte count for user-facing messages (e.g. '512 bytes', '1.5 MB')."""
+    if count < 1024:
+        return f"{count} bytes"
+    if count < 1024 * 1024:
+        return f"{count / 1024:.1f} KB"
+    return f"{count / (1024 * 1024):.1f} MB"
+
+
+def _build_alias_trie(aliases: dict) -> dict:
+    """Builds a character trie of alias names; a node's None key holds the alias that ends there."""
+    trie = {}
+    for alias_name in aliases:
+        node = trie
+        for char in alias_name:
+            node = node.setdefault(char, {})
+        node[None] = alias_name
+    return trie
+
+
+def _find_longest_alias(alias_trie: dict, text: str) -> Optional[str]:
+    """Returns the longest alias that text equals or starts with followed by a space, in one pass over text."""
+    longest = None
+    node = alias_trie
+    for char in text:
+        if char == " " and None in node:
+            longest = node[None]
+        node = node.get(char)
+        if node is None:
+            return longest
+    return node.get(None, longest)
+
+
+class _OutputSink:
+    """Shows streamed command output in the UI up to a byte cap, spilling the rest to a temp file."""
+
+    def __init__(self, append_output_func, max_output_bytes: int):
+        self.append_output = append_output_func
+        self.max_output_bytes = max_output_bytes
+        self.shown_bytes = 0
+        self.spill_file = None
+        self.spilled_bytes = 0
+
+    def write(self, text: str, style_class: Optional[str] = None, first_line_prefix: str = ""):
+        """Appends a batch of complete lines, or writes it to the spill file once the cap is reached."""
+        if self.spill_file is None:
+            encoded = text.encode('utf-8')
+            remaining = self.max_output_bytes - self.shown_bytes
+            if len(encoded) > remaining:
+                # Show the complete lines that still fit and send everything else to the spill file.
+                fitting = encoded[:remaining].decode('utf-8', errors='ignore')
+                cut = fitting.rfind("\n") + 1
+                visible, text = text[:cut], text[cut:]
+                if visible:
+                    self.write(visible, style_class, first_line_prefix)
+                self.spill_file = tempfile.NamedTemporaryFile(
+                    mode='w', encoding='utf-8', prefix='micro_x_output_', suffix='.log', delete=False)
+                self.append_output(f"⚠️ Output exceeds {_format_byte_count(self.max_output_bytes)}; the rest is being written to {self.spill_file.name}", style_class='warning')
+            else:
+                self.shown_bytes += len(encoded)
+        if self.spill_file is not None:
+            self.spill_file.write(text)
+            self.spilled_bytes += len(text.encode('utf-8'))
+            return
+        text = first_line_prefix + text.rstrip("\n")
+        if style_class:
+            self.append_output(text, style_class=style_class)
+        else:
+            self.append_output(text)
+
+    def close(self):
+        """Closes the spill file (if any) and tells the user where the rest of the output is."""
+        if self.spill_file is None or self.spill_file.closed:
+            return
+        self.spill_file.close()
+        self.append_output(f"📄 {_format_byte_count(self.spilled_bytes)} of further output saved to {self.spill_file.name} (view it with: less {self.spill_file.name})", style_class='info')
+
+
+class _TmuxOutputCapture:
+    """A FIFO that a tmux window tees its output into, read live by micro_X.
+
+    The read end is opened (non-blocking) before the window starts, together with a
+    write end held by micro_X itself, so the reader never sees a premature EOF while
+    tee is still starting up. Once the command has finished, finish() releases that
+    write end and waits for the remaining output. The window also writes the
+    command's exit code and bash `times` output to status_path (see read_status()).
+    """
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="micro_x_tmux_")
+        self.path = os.path.join(self.directory, "output.fifo")
+        self.status_path = os.path.join(self.directory, "status")
+        self._keepalive_fd = None
+        self._transport = None
+        self._on_text = None
+        self.task = None
+
+    async def start(self, on_text, flush_interval: float):
+        """Creates the FIFO and starts passing its output to on_text in line batches."""
+        os.mkfifo(self.path, 0o600)
+        self._on_text = on_text
+        read_fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self._keepalive_fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        reader = asyncio.StreamReader()
+        self._transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, 'rb', buffering=0))
+        self.task = asyncio.create_task(pump_text_stream(reader, lambda text: self._on_text(text), flush_interval))
+
+    def _release_writer(self):
+        if self._keepalive_fd is not None:
+            os.close(self._keepalive_fd)
+            self._keepalive_fd = None
+
+    async def finish(self, drain_timeout: float):
+        """Waits (up to drain_timeout) for the output still in flight after the command exited."""
+        self._release_writer()
+        if self.task is not None:
+            await asyncio.wait({self.task}, timeout=drain_timeout)
+
+    def detach(self):
+        """Stops showing output but keeps draining the FIFO, so a still-running command never blocks on tee."""
+        self._on_text = lambda text: None
+        self._release_writer()
+        if self.task is not None and not self.task.done():
+            self.task.add_done_callback(lambda _task: self.close())
+        else:
+            self.close()
+
+    def read_status(self) -> tuple[Optional[int], Optional[float], Optional[float]]:
+        """Returns (exit code, CPU user seconds, CPU system seconds) written by the window, or Nones.
+
+        The CPU times are the second line of bash's `times` output (the window
+        shell's children, i.e. the command and tee), e.g. '0m1.250s 0m0.031s'.
+        """
+        try:
+            with open(self.status_path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None, None, None
+        exit_code = int(lines[0]) if lines and lines[0].strip().isdigit() else None
+        cpu_times = re.findall(r"(\d+)m([\d.]+)s", lines[2]) if len(lines) > 2 else []
+        if len(cpu_times) != 2:
+            return exit_code, None, None
+        cpu_user, cpu_system = (int(minutes) * 60 + float(seconds) for minutes, seconds in cpu_times)
+        return exit_code, cpu_user, cpu_system
+
+    def close(self):
+        """Stops reading and removes the FIFO."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self._release_writer()
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
 class ShellEngine:
     """The main class for shell logic.
     
@@ -98,7 +264,18 @@ class ShellEngine:
         self.is_developer_mode = is_developer_mode
         self.git_context_manager_instance = git_context_manager_instance
         self.embedding_manager_instance = None
-        self.router_agent_instance = create_router_agent(self.config)
+        # The router AgentExecutor is built lazily off the event loop (see get_router_agent).
+        self.router_agent_instance = None
+        self._router_agent_config_key = None # Router config the current instance was built from
+        self._router_agent_lock = None
+        self._router_warmup_task = None
+        # Long-lived bash used when behavior.execution_backend is 'persistent_shell' (see _get_persistent_shell).
+        self.persistent_shell = None
+        self.job_manager = JobManager(
+            on_job_finished=self._on_background_job_finished,
+            max_output_lines=self.config.get('behavior', {}).get(JOB_OUTPUT_MAX_LINES_KEY, DEFAULT_JOB_OUTPUT_MAX_LINES))
+        # Compile the security patterns now, so invalid ones are logged at startup rather than on first use.
+        get_dangerous_pattern_matcher(self.config)
 
         self.current_directory = os.getcwd()
         
@@ -178,6 +355,16 @@ class ShellEngine:
         logger.info(f"Loaded {len(default_aliases)} default and {len(user_aliases)} user aliases, resulting in {len(merged_aliases)} total active aliases.")
         return merged_aliases
 
+    @property
+    def aliases(self) -> dict:
+        """The active aliases (name -> expansion). Assigning a new dict rebuilds the lookup trie."""
+        return self._aliases
+
+    @aliases.setter
+    def aliases(self, aliases: dict):
+        self._aliases = aliases
+        self._alias_trie = _build_alias_trie(aliases)
+
     def _reload_aliases(self):
         """Reloads aliases from the file, typically after the alias utility is run."""
         self.aliases = self._load_and_merge_aliases()
@@ -198,17 +385,20 @@ class ShellEngine:
         """
         Performs basic sanitization and validation of commands.
         Returns the command if safe, None if blocked.
+
+        The 'security.dangerous_patterns' are compiled once into a combined matcher
+        (rebuilt when the patterns change); invalid patterns are reported only once.
         """
-        dangerous_patterns = self.config.get("security", {}).get("dangerous_patterns", [])
-        for pattern in dangerous_patterns:
-            try:
-                if re.search(pattern, command):
-                    logger.warning(f"DANGEROUS command blocked (matched pattern '{pattern}'): '{command}' (original input: '{original_input_for_log}')")
-                    self.ui_manager.append_output(f"🛡️ Command blocked by security pattern: {command}", style_class='security-critical')
-                    return None
-            except re.error as e:
-                logger.error(f"Invalid regex pattern in security config: '{pattern}'. Error: {e}")
+        matcher = get_dangerous_pattern_matcher(self.config)
+        if matcher.invalid_patterns and not matcher.invalid_patterns_reported:
+            matcher.invalid_patterns_reported = True
+            for pattern, _error in matcher.invalid_patterns:
                 self.ui_manager.append_output(f"⚠️ Invalid security regex pattern in config: '{pattern}'.", style_class='warning')
+        pattern = matcher.match(command)
+        if pattern is not None:
+            logger.warning(f"DANGEROUS command blocked (matched pattern '{pattern}'): '{command}' (original input: '{original_input_for_log}')")
+            self.ui_manager.append_output(f"🛡️ Command blocked by security pattern: {command}", style_class='security-critical')
+            return None
         return command
 
     async def handle_cd_command(self, full_cd_command: str):
@@ -243,8 +433,185 @@ class ShellEngine:
             if self.main_restore_normal_input_ref:
                 self.main_restore_normal_input_ref()
 
+    def _get_persistent_shell(self) -> Optional[PersistentShell]:
+        """Returns the session's persistent bash if 'behavior.execution_backend' selects it, else None."""
+        if self.config.get('behavior', {}).get(EXECUTION_BACKEND_KEY) != BACKEND_PERSISTENT_SHELL:
+            if self.persistent_shell is not None:
+                logger.info("Execution backend changed; closing the persistent shell.")
+                asyncio.create_task(self.persistent_shell.close())
+                self.persistent_shell = None
+            return None
+        if shutil.which("bash") is None:
+            logger.warning("Persistent shell backend selected but bash was not found; using the subprocess backend.")
+            return None
+        if self.persistent_shell is None:
+            self.persistent_shell = PersistentShell(cwd=self.current_directory)
+        return self.persistent_shell
+
+    def _sync_with_persistent_shell(self, command_handle):
+        """Carries a directory change made inside a command (e.g. 'cd src && make') over to micro_X."""
+        if not self.persistent_shell.is_running:
+            self.ui_manager.append_output("ℹ️ The persistent shell exited; a fresh one will start with the next command (variables and functions were reset).", style_class='info')
+            return
+        new_directory = command_handle.cwd
+        if new_directory and new_directory != self.current_directory and os.path.isdir(new_directory):
+            self.current_directory = new_directory
+            self.ui_manager.update_input_prompt(self.current_directory)
+            logger.info(f"Directory changed by command to: {self.current_directory}")
+
+    def _record_command_run(self, command: str, kind: str, exit_code: Optional[int], usage: dict,
+                            output_bytes: Optional[int], backend: Optional[str] = None):
+        """Adds a finished command to the command ledger (if enabled); see /stats."""
+        ledger = get_command_ledger(self.config)
+        if ledger is None:
+            return
+        ledger.record(command, kind, exit_code=exit_code, output_bytes=output_bytes, backend=backend,
+                      cwd=self.current_directory, **usage)
+
+    def _show_command_stats(self, argument: str):
+        """Shows the '/stats [N]' summary of the command ledger."""
+        ledger = get_command_ledger(self.config)
+        if ledger is None:
+            self.ui_manager.append_output("ℹ️ The command ledger is disabled ('command_ledger.enabled' in the config).", style_class='info')
+            return
+        argument = argument.strip()
+        if argument and not argument.isdigit():
+            self.ui_manager.append_output("ℹ️ Usage: /stats [N]  (show the top N commands per category)", style_class='info')
+            return
+        top_n = int(argument) if argument else DEFAULT_STATS_TOP_N
+        self.ui_manager.append_output(format_stats_report(ledger.read_entries(), max(1, top_n)), style_class='info')
+
+    async def shutdown(self):
+        """Releases long-lived resources (background jobs, the persistent shell) when micro_X exits."""
+        await self.job_manager.kill_all()
+        if self.persistent_shell is not None:
+            await self.persistent_shell.close()
+            self.persistent_shell = None
+
+    @staticmethod
+    def _split_background_request(user_input: str) -> tuple[bool, str]:
+        """Recognizes '/bg <command>' and '<command> &'. Returns (is_background, command)."""
+        if user_input.startswith("/bg ") or user_input == "/bg":
+            return True, user_input[len("/bg"):].strip()
+        if user_input.endswith("&") and not user_input.endswith("&&") and not user_input.endswith("\\&"):
+            return True, user_input[:-1].rstrip()
+        return False, user_input
+
+    async def start_background_job(self, command_to_execute: str, original_user_input_display: str):
+        """Starts a command as a background job; its output is kept in the job's buffer (see /fg)."""
+        try:
+            job = await self.job_manager.start(command_to_execute, cwd=self.current_directory, display_command=original_user_input_display)
+        except OSError as e:
+            self.ui_manager.append_output(f"❌ Could not start background job '{original_user_input_display}': {e}", style_class='error')
+            logger.error(f"Failed to start background job '{command_to_execute}': {e}", exc_info=True)
+            return
+        self.ui_manager.append_output(f"🚀 [{job.job_id}] Started in background (PID {job.process.pid}): {original_user_input_display}", style_class='info')
+
+    def _on_background_job_finished(self, job):
+        if not self.ui_manager:
+            return
+        resource_usage = job.process.resource_usage()
+        self._record_command_run(job.command, KIND_BACKGROUND, job.process.returncode, resource_usage,
+                                 job.output_bytes, backend=BACKEND_SUBPROCESS)
+        usage = format_resource_usage(resource_usage)
+        if job.state == JOB_DONE:
+            message, style = f"✅ [{job.job_id}] Done: {job.display_command} ({usage})", 'success'
+        else:
+            message, style = f"⚠️ [{job.job_id}] {job.state.capitalize()} (exit code {job.process.returncode}): {job.display_command} ({usage})", 'warning'
+        if job.output and not job.listeners:
+            message += f"\n   {len(job.output)} line(s) of output; use /fg {job.job_id} to view."
+        self.ui_manager.append_output(message, style_class=style)
+        app_instance = self.ui_manager.get_app_instance()
+        if app_instance: app_instance.invalidate()
+
+    def _resolve_job(self, argument: str):
+        """Finds the job named by a '/fg' or '/kill' argument ('', '3' or '%3'); reports errors."""
+        argument = argument.strip().lstrip('%')
+        if not argument:
+            job = self.job_manager.latest()
+            if job is None:
+                self.ui_manager.append_output("ℹ️ No background jobs.", style_class='info')
+            return job
+        if not argument.isdigit():
+            self.ui_manager.append_output(f"❌ Invalid job id: '{argument}'. Use /jobs to list jobs.", style_class='error')
+            return None
+        job = self.job_manager.get(int(argument))
+        if job is None:
+            self.ui_manager.append_output(f"❌ No such job: [{argument}]. Use /jobs to list jobs.", style_class='error')
+        return job
+
+    def _list_jobs(self):
+        jobs = self.job_manager.list_jobs()
+        if not jobs:
+            self.ui_manager.append_output("ℹ️ No background jobs.", style_class='info')
+            return
+        lines = ["Background jobs:"]
+        for job in jobs:
+            state = job.state if job.state == JOB_RUNNING else f"{job.state} ({job.process.returncode})"
+            lines.append(f"  [{job.job_id}] {state:<12} {format_duration(job.process.elapsed()):>8}  PID {job.process.pid:<7} {job.display_command}")
+            if job.state != JOB_RUNNING:
+                lines.append(f"        {format_resource_usage(job.process.resource_usage())}, {job.output_bytes} bytes of output")
+        self.ui_manager.append_output("\n".join(lines), style_class='info')
+
+    async def _foreground_job(self, job):
+        """Shows a job's buffered output, then follows it live until it finishes (Ctrl+C kills it)."""
+        header = f"Output from job [{job.job_id}] '{job.display_command}':"
+        if job.dropped_lines:
+            header += f" (first {job.dropped_lines} line(s) no longer buffered)"
+        buffered = [(line, is_stderr) for line, is_stderr in job.output]
+        self.ui_manager.append_output(header, style_class='info')
+        for line, is_stderr in buffered:
+            if is_stderr:
+                self.ui_manager.append_output(line, style_class='warning')
+            else:
+                self.ui_manager.append_output(line)
+        if job.state != JOB_RUNNING:
+            if not buffered:
+                self.ui_manager.append_output("(No output)", style_class='info')
+            return
+
+        def follow(text: str, is_stderr: bool):
+            if is_stderr:
+                self.ui_manager.append_output(text.rstrip("\n"), style_class='warning')
+            else:
+                self.ui_manager.append_output(text.rstrip("\n"))
+
+        job.listeners.append(follow)
+        self.current_process = job.process
+        self.current_process_command = job.command
+        try:
+            await job.wait()
+        finally:
+            job.listeners.remove(follow)
+            self.current_process = None
+            self.current_process_command = ""
+
+    async def _handle_job_command_async(self, user_input: str):
+        command, _, argument = user_input.partition(" ")
+        if command == "/jobs":
+            self._list_jobs()
+            return
+        job = self._resolve_job(argument)
+        if job is None:
+            return
+        if command == "/fg":
+            await self._foreground_job(job)
+        elif await self.job_manager.kill(job.job_id):
+            self.ui_manager.append_output(f"🛑 Killed job [{job.job_id}]: {job.display_command}", style_class='success')
+        else:
+            self.ui_manager.append_output(f"ℹ️ Job [{job.job_id}] is not running.", style_class='info')
+
     async def execute_shell_command(self, command_to_execute: str, original_user_input_display: str):
-        """Executes a simple shell command directly."""
+        """Executes a simple shell command directly, streaming its output into the UI.
+
+        stdout and stderr are read concurrently as the process produces them and
+        appended in batches, at most one per 'behavior.output_flush_interval_ms'
+        unless a batch grows past a size cap; a command producing output faster
+        than it can be shown is slowed down through the pipe. Once more
+        than 'behavior.max_command_output_bytes' has been shown, the rest is written
+        to a temporary file that the user can page through. Every run is added to
+        the command ledger with its resource usage.
+        """
         if not self.ui_manager: logger.error("ShellEngine.execute_shell_command: UIManager not available."); return
         append_output_func = self.ui_manager.append_output
         logger.info(f"Executing simple command: '{command_to_execute}' in '{self.current_directory}'")
@@ -254,41 +621,63 @@ class ShellEngine:
             logger.warning(f"Attempted to execute empty command: '{command_to_execute}' from input: '{original_user_input_display}'")
             return
 
-        try:
-            self.current_process = await asyncio.create_subprocess_shell(
-                command_to_execute,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=self.current_directory
-            )
-            self.current_process_command = command_to_execute
-            logger.info(f"Started process {self.current_process.pid} for command: {command_to_execute}")
+        behavior_config = self.config.get('behavior', {})
+        sink = _OutputSink(append_output_func, behavior_config.get('max_command_output_bytes', 1048576))
+        flush_interval = behavior_config.get('output_flush_interval_ms', 50) / 1000
+        show_verbose_prefix = command_to_execute.strip() != original_user_input_display.strip()
+        seen = {"stdout": False, "stderr": False}
 
-            stdout, stderr = await self.current_process.communicate()
+        def show_stdout(text: str):
+            if not text.strip() and not seen["stdout"]:
+                return
+            prefix = f"Output from '{original_user_input_display}':\n" if show_verbose_prefix and not seen["stdout"] else ""
+            seen["stdout"] = True
+            sink.write(text, first_line_prefix=prefix)
+
+        def show_stderr(text: str):
+            if not text.strip() and not seen["stderr"]:
+                return
+            prefix = f"Stderr from '{original_user_input_display}':\n" if not seen["stderr"] else ""
+            seen["stderr"] = True
+            sink.write(text, style_class='warning', first_line_prefix=prefix)
 
-            show_verbose_prefix = command_to_execute.strip() != original_user_input_display.strip()
+        try:
+            persistent_shell = self._get_persistent_shell()
+            started_at = time.monotonic()
+            if persistent_shell:
+                self.current_process = await persistent_shell.run(command_to_execute, cwd=self.current_directory)
+            else:
+                self.current_process = await TrackedProcess.start_shell(command_to_execute, cwd=self.current_directory)
+            self.current_process_command = command_to_execute
+            process = self.current_process
+            logger.info(f"Started process {process.pid} for command: {command_to_execute}")
 
             if not show_verbose_prefix:
                 append_output_func(f"$ {original_user_input_display}", style_class='executing')
 
-            if stdout:
-                decoded_stdout = stdout.decode(errors='replace').strip()
-                if show_verbose_prefix:
-                    append_output_func(f"Output from '{original_user_input_display}':\n{decoded_stdout}")
-                else:
-                    append_output_func(decoded_stdout)
-
-            if stderr:
-                append_output_func(f"Stderr from '{original_user_input_display}':\n{stderr.decode(errors='replace').strip()}", style_class='warning')
-            
-            if not stdout and not stderr and self.current_process and self.current_process.returncode == 0:
+            await asyncio.gather(pump_text_stream(process.stdout, show_stdout, flush_interval),
+                                 pump_text_stream(process.stderr, show_stderr, flush_interval))
+            returncode = await process.wait()
+            sink.close()
+            if persistent_shell:
+                # Commands run inside the shell process itself, so only wall time can be attributed to them.
+                usage = {"wall_seconds": time.monotonic() - started_at}
+            else:
+                usage = process.resource_usage()
+            self._record_command_run(command_to_execute, KIND_SIMPLE, returncode, usage,
+                                     sink.shown_bytes + sink.spilled_bytes,
+                                     backend=BACKEND_PERSISTENT_SHELL if persistent_shell else BACKEND_SUBPROCESS)
+            if persistent_shell:
+                self._sync_with_persistent_shell(process)
+
+            if not seen["stdout"] and not seen["stderr"] and returncode == 0:
                 if show_verbose_prefix:
                     append_output_func(f"Output from '{original_user_input_display}': (No output)", style_class='info')
             
-            if self.current_process and self.current_process.returncode != 0:
-                logger.warning(f"Command '{command_to_execute}' exited with code {self.current_process.returncode}")
-                if not stderr:
-                    append_output_func(f"⚠️ Command '{original_user_input_display}' exited with code {self.current_process.returncode}.", style_class='warning')
+            if returncode != 0:
+                logger.warning(f"Command '{command_to_execute}' exited with code {returncode}")
+                if not seen["stderr"]:
+                    append_output_func(f"⚠️ Command '{original_user_input_display}' exited with code {returncode}.", style_class='warning')
 
         except FileNotFoundError:
             append_output_func(f"❌ Shell (bash) or command not found for: {command_to_execute}", style_class='error')
@@ -297,6 +686,8 @@ class ShellEngine:
             append_output_func(f"❌ Error executing '{command_to_execute}': {e}", style_class='error')
             logger.exception(f"Error executing shell command: {e}")
         finally:
+            if sink.spill_file is not None:
+                sink.spill_file.close()
             self.ui_manager.update_status_bar("")
             logger.info(f"Process for command '{self.current_process_command}' finished.")
             self.current_process = None
@@ -331,18 +722,60 @@ class ShellEngine:
             self.current_process_command = ""
 
     async def _run_semi_interactive_tmux(self, command_to_execute, original_user_input_display, window_name):
+        """Runs a command in a tmux window while mirroring its output live into the output pane.
+
+        The window tees the command's output into a FIFO that is read as it arrives.
+        Every batch is fed to one TUIOutputDetector for the run, so a command that
+        turns out to draw a full-screen UI stops being mirrored as soon as its escape
+        sequences appear, even when they are split across batches. Mirrored output is capped like simple commands
+        ('behavior.max_command_output_bytes'). Finished runs are added to the command
+        ledger (wall time, CPU time from bash `times`, exit code and output size).
+        """
         append_output_func = self.ui_manager.append_output
         tmux_poll_timeout = self.config.get('timeouts', {}).get('tmux_poll_seconds', 300)
         tmux_sleep_after = self.config.get('timeouts', {}).get('tmux_semi_interactive_sleep_seconds', 1)
+        behavior_config = self.config.get('behavior', {})
+        tui_line_threshold = behavior_config.get('tui_detection_line_threshold_pct', 30.0)
+        tui_char_threshold = behavior_config.get('tui_detection_char_threshold_pct', 3.0)
+        flush_interval = behavior_config.get('output_flush_interval_ms', 50) / 1000
+        sink = _OutputSink(append_output_func, behavior_config.get('max_command_output_bytes', 1048576))
+        done_channel = f"{window_name}_done"
+        live = {"shown": False, "tui_detected": False, "bytes": 0}
+        tui_detector = TUIOutputDetector(tui_line_threshold, tui_char_threshold)
+
+        def show_live_output(text: str):
+            live["bytes"] += len(text.encode('utf-8'))
+            if live["tui_detected"]:
+                return
+            if tui_detector.feed(text):
+                live["tui_detected"] = True
+                return
+            if not text.strip() and not live["shown"]:
+                return
+            prefix = f"Output from '{original_user_input_display}':\n" if not live["shown"] else ""
+            live["shown"] = True
+            sink.write(text, first_line_prefix=prefix)
 
-        with tempfile.NamedTemporaryFile(mode='w+', delete=True, encoding='utf-8', errors='ignore') as temp_log_file:
-            log_path = temp_log_file.name
+        capture = _TmuxOutputCapture()
+        waiter_process = None
+        window_closed_or_cmd_done = False
+        try:
+            await capture.start(show_live_output, flush_interval)
             escaped_command_str = shlex.quote(command_to_execute)
-            wrapped_command = f"bash -c {escaped_command_str} |& tee {shlex.quote(log_path)}; sleep {tmux_sleep_after}"
+            # Completion is signalled as soon as the command exits, before the courtesy sleep.
+            # The trap covers the window being killed or interrupted before that point.
+            signal_done = f"tmux wait-for -S {shlex.quote(done_channel)}"
+            quoted_status_path = shlex.quote(capture.status_path)
+            wrapped_command = (f"trap {shlex.quote(signal_done)} EXIT HUP INT TERM; bash -c {escaped_command_str} |& tee {shlex.quote(capture.path)}; "
+                               f"echo \"${{PIPESTATUS[0]}}\" > {quoted_status_path}; times >> {quoted_status_path}; "
+                               f"trap - EXIT HUP INT TERM; {signal_done}; sleep {tmux_sleep_after}")
             tmux_cmd_list_launch = ["tmux", "new-window", "-n", window_name, wrapped_command]
-            
-            logger.info(f"Launching semi_interactive tmux: {' '.join(tmux_cmd_list_launch)} (log: {log_path})")
-            
+
+            # Start waiting before launching so a command that exits immediately cannot be missed.
+            waiter_process = await asyncio.create_subprocess_exec("tmux", "wait-for", done_channel)
+            logger.info(f"Launching semi_interactive tmux: {' '.join(tmux_cmd_list_launch)} (capture: {capture.path})")
+
+            started_at = time.monotonic()
             self.current_process = await asyncio.create_subprocess_exec(*tmux_cmd_list_launch, cwd=self.current_directory)
             self.current_process_command = command_to_execute
             await self.current_process.wait()
@@ -352,34 +785,81 @@ class ShellEngine:
                 return
 
             if self.config.get("behavior", {}).get("verbosity_level", "normal") != "quiet":
-                append_output_func(f"⚡ Launched semi-interactive command in tmux (window: {window_name}). Waiting for output...", style_class='info')
+                append_output_func(f"⚡ Launched semi-interactive command in tmux (window: {window_name}). Output follows live...", style_class='info')
             if self.ui_manager.get_app_instance(): self.ui_manager.get_app_instance().invalidate()
 
-            # Polling logic remains the same as it checks for window existence, not process completion
-            start_time = asyncio.get_event_loop().time()
-            window_closed_or_cmd_done = False
-            while asyncio.get_event_loop().time() - start_time < tmux_poll_timeout:
-                await asyncio.sleep(1)
+            window_closed_or_cmd_done = await self._wait_for_tmux_window(window_name, waiter_process, tmux_poll_timeout)
+            if window_closed_or_cmd_done:
+                wall_seconds = time.monotonic() - started_at
+                await capture.finish(drain_timeout=self.config.get('timeouts', {}).get('tmux_output_drain_seconds', 2))
+                exit_code, cpu_user, cpu_system = capture.read_status()
+                self._record_command_run(command_to_execute, KIND_SEMI_INTERACTIVE, exit_code,
+                                         {"wall_seconds": wall_seconds, "cpu_user_seconds": cpu_user, "cpu_system_seconds": cpu_system},
+                                         live["bytes"], backend="tmux")
+        except BaseException:
+            if sink.spill_file is not None:
+                sink.spill_file.close()
+            raise
+        finally:
+            if waiter_process is not None and waiter_process.returncode is None:
+                try:
+                    waiter_process.kill()
+                except ProcessLookupError:
+                    pass
+                await waiter_process.wait()
+            if window_closed_or_cmd_done:
+                capture.close()
+            else:
+                # The command may still be running; keep its tee unblocked until it exits.
+                capture.detach()
+
+        if not window_closed_or_cmd_done:
+            append_output_func(f"⚠️ Tmux window '{window_name}' poll timed out.", style_class='warning')
+
+        sink.close()
+        if live["tui_detected"]:
+            suggestion_command = f'/command move "{command_to_execute}" interactive_tui'
+            if live["shown"]:
+                # Part of the output is already on screen; only the rest was withheld.
+                notice = "[TUI-like output detected; the remaining output was not displayed.]"
+            else:
+                notice = f"Output from '{original_user_input_display}':\n[Semi-interactive TUI-like output not displayed directly.]"
+            append_output_func(f"{notice}\n💡 Tip: Try: {suggestion_command}", style_class='info')
+        elif not live["shown"] and window_closed_or_cmd_done:
+            append_output_func(f"Output from '{original_user_input_display}': (No output captured)", style_class='info')
+
+    async def _wait_for_tmux_window(self, window_name: str, waiter_process, timeout_seconds: float) -> bool:
+        """Waits until a semi-interactive tmux window signals completion or disappears.
+
+        Completion normally arrives through the 'tmux wait-for' process, so micro_X
+        continues as soon as the command exits. As a safety net (a killed window
+        whose shell is still blocked on its child, or a lost signal), the window list
+        is also checked every 'timeouts.tmux_fallback_poll_seconds' (30s by default,
+        so a long-running command costs a tmux call only twice a minute).
+
+        Returns:
+            True if the command finished, False if the timeout expired first.
+        """
+        fallback_interval = self.config.get('timeouts', {}).get('tmux_fallback_poll_seconds', 30)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        signalled = asyncio.ensure_future(waiter_process.wait())
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                done, _ = await asyncio.wait({signalled}, timeout=min(fallback_interval, remaining))
+                if done:
+                    logger.debug(f"Tmux window '{window_name}' signalled completion.")
+                    return True
                 check_proc = await asyncio.create_subprocess_exec("tmux", "list-windows", "-F", "#{window_name}", stdout=asyncio.subprocess.PIPE)
                 stdout_check, _ = await check_proc.communicate()
-                if window_name not in stdout_check.decode(errors='replace'):
-                    window_closed_or_cmd_done = True; break
-            
-            if not window_closed_or_cmd_done:
-                append_output_func(f"⚠️ Tmux window '{window_name}' poll timed out.", style_class='warning')
-
-            temp_log_file.seek(0)
-            output_content = temp_log_file.read().strip()
-            # Output processing logic remains the same
-            tui_line_threshold = self.config.get('behavior', {}).get('tui_detection_line_threshold_pct', 30.0)
-            tui_char_threshold = self.config.get('behavior', {}).get('tui_detection_char_threshold_pct', 3.0)
-            if output_content and is_tui_like_output(output_content, tui_line_threshold, tui_char_threshold):
-                suggestion_command = f'/command move "{command_to_execute}" interactive_tui'
-                append_output_func(f"Output from '{original_user_input_display}':\n[Semi-interactive TUI-like output not displayed directly.]\n💡 Tip: Try: {suggestion_command}", style_class='info')
-            elif output_content:
-                append_output_func(f"Output from '{original_user_input_display}':\n{output_content}")
-            elif window_closed_or_cmd_done:
-                append_output_func(f"Output from '{original_user_input_display}': (No output captured)", style_class='info')
+                if window_name not in stdout_check.decode(errors='replace').split():
+                    logger.debug(f"Tmux window '{window_name}' closed without signalling completion.")
+                    return True
+        finally:
+            signalled.cancel()
 
     async def _run_interactive_tui_tmux(self, command_to_execute, original_user_input_display, window_name):
         append_output_func = self.ui_manager.append_output
@@ -424,27 +904,28 @@ class ShellEngine:
         command_to_execute_list = [sys.executable, script_path] + parts[2:]
         if self.config.get("behavior", {}).get("verbosity_level", "normal") != "quiet":
             self.ui_manager.append_output(f"🚀 Executing script: {' '.join(command_to_execute_list)}", style_class='info')
+        if subcommand == 'ollama_cli':
+            self._prepare_ollama_cli(parts[2:])
 
         async def run_script_and_handle_output():
             try:
                 env = os.environ.copy()
                 env["PYTHONPATH"] = self.PROJECT_ROOT
-                self.current_process = await asyncio.create_subprocess_exec(
-                    *command_to_execute_list,
-                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
-                    cwd=self.PROJECT_ROOT,
-                    env=env
-                )
+                self.current_process = await TrackedProcess.start(command_to_execute_list, cwd=self.PROJECT_ROOT, env=env)
                 self.current_process_command = full_command_str
+                process = self.current_process
+                output_bytes = 0
 
                 # Print the header once before the output starts
                 self.ui_manager.append_output(f"Output from '{subcommand}.py':", style_class='info')
 
                 async def read_stream(stream, style):
+                    nonlocal output_bytes
                     while True:
                         line = await stream.readline()
                         if not line:
                             break
+                        output_bytes += len(line)
                         self.ui_manager.append_output(line.decode(errors='replace'), style_class=style)
 
                 # Create concurrent tasks to read stdout and stderr
@@ -452,9 +933,11 @@ class ShellEngine:
                 stderr_task = asyncio.create_task(read_stream(self.current_process.stderr, 'warning'))
 
                 # Wait for the process to finish and for the streams to be fully read
-                await self.current_process.wait()
+                await process.wait()
                 await asyncio.gather(stdout_task, stderr_task)
-                
+                self._record_command_run(full_command_str, KIND_SCRIPT, process.returncode, process.resource_usage(),
+                                         output_bytes, backend=BACKEND_SUBPROCESS)
+
                 # Check if the process was killed externally
                 if self.current_process is None:
                     return
@@ -462,6 +945,7 @@ class ShellEngine:
                 if self.current_process.returncode == 0:
                     self.ui_manager.append_output(f"✅ Script '{subcommand}.py' completed.", style_class='success')
                     if subcommand == 'alias': self._reload_aliases()
+                    elif subcommand == 'ollama_cli': await self._finish_ollama_cli(parts[2:])
                 else:
                     self.ui_manager.append_output(f"⚠️ Script '{subcommand}.py' exited with code {self.current_process.returncode}.", style_class='warning')
             except Exception as e:
@@ -475,6 +959,28 @@ class ShellEngine:
 
         asyncio.create_task(run_script_and_handle_output())
 
+    def _prepare_ollama_cli(self, args: list[str]):
+        """Stops the model warm-up before '/ollama stop' or '/ollama restart' runs.
+
+        The /ollama utility runs in its own process, so the warm-up loop of this
+        process is stopped (and restarted by _finish_ollama_cli) here; otherwise it
+        would keep reloading models into the server being stopped.
+        """
+        if self.ollama_manager_module and args and args[0] in ("stop", "restart"):
+            self.ollama_manager_module.stop_model_warmup()
+
+    async def _finish_ollama_cli(self, args: list[str]):
+        """Applies the outcome of a finished /ollama utility run to this process."""
+        if not self.ollama_manager_module or not args:
+            return
+        if args[0] in ("start", "restart"):
+            if await self.ollama_manager_module.is_ollama_server_running(force_check=True):
+                self.ollama_manager_module.start_model_warmup(self.config)
+        elif args[0] == "status":
+            # Warm-up runs in this process, so its failures are unknown to the utility.
+            for model_name, error in self.ollama_manager_module.get_model_warmup_failures().items():
+                self.ui_manager.append_output(f"⚠️ Last warm-up of '{model_name}' failed: {error}", style_class='warning')
+
     async def _handle_utils_command_async(self, full_command_str: str):
         await self._handle_script_command_async(full_command_str, self.UTILS_DIR_PATH, self.UTILS_DIR_NAME, "utils")
 
@@ -496,33 +1002,28 @@ class ShellEngine:
 
         # --- ALIAS EXPANSION (LONGEST MATCH) ---
         try:
-            # Sort aliases by length, descending, to match specific aliases first (e.g., '/dev --activate' before '/dev')
-            sorted_aliases = sorted(self.aliases.keys(), key=len, reverse=True)
-            
+            # A single walk over the input finds the longest alias it starts with (e.g. '/dev --activate' before '/dev').
             original_input_for_alias_check = user_input_stripped
             alias_found = False
 
-            for alias_name in sorted_aliases:
-                # Check if the user's input starts with the alias and is followed by a space or is an exact match
-                if original_input_for_alias_check == alias_name or original_input_for_alias_check.startswith(alias_name + ' '):
-                    expanded_command = self.aliases[alias_name]
-                    
-                    # The part of the input *after* the alias
-                    remaining_input = original_input_for_alias_check[len(alias_name):].strip()
-                    
-                    # Append the remaining part of the input to the expanded command
-                    # shlex.quote is used to handle arguments with spaces correctly
-                    if remaining_input:
-                        final_command = f"{expanded_command} {remaining_input}"
-                    else:
-                        final_command = expanded_command
+            alias_name = _find_longest_alias(self._alias_trie, original_input_for_alias_check)
+            if alias_name is not None:
+                expanded_command = self.aliases[alias_name]
 
-                    if self.config.get("behavior", {}).get("verbosity_level", "normal") != "quiet":
-                        self.ui_manager.append_output(f"↪️ Alias expanded: '{alias_name}' -> '{final_command}'", style_class='info')
-                    
-                    user_input_stripped = final_command
-                    alias_found = True
-                    break # Stop after the first (longest) match
+                # The part of the input *after* the alias
+                remaining_input = original_input_for_alias_check[len(alias_name):].strip()
+
+                # Append the remaining part of the input to the expanded command
+                if remaining_input:
+                    final_command = f"{expanded_command} {remaining_input}"
+                else:
+                    final_command = expanded_command
+
+                if self.config.get("behavior", {}).get("verbosity_level", "normal") != "quiet":
+                    self.ui_manager.append_output(f"↪️ Alias expanded: '{alias_name}' -> '{final_command}'", style_class='info')
+
+                user_input_stripped = final_command
+                alias_found = True
 
             if alias_found:
                 # --- FIX START: Immediate execution for categorized aliases ---
@@ -554,6 +1055,10 @@ class ShellEngine:
             await self._handle_utils_command_async(user_input_stripped); return True
         elif user_input_stripped.startswith("/run"):
             await self._handle_user_script_command_async(user_input_stripped); return True
+        elif user_input_stripped.split(" ", 1)[0] in ("/jobs", "/fg", "/kill"):
+            await self._handle_job_command_async(user_input_stripped); return True
+        elif user_input_stripped == "/stats" or user_input_stripped.startswith("/stats "):
+            self._show_command_stats(user_input_stripped[len("/stats"):]); return True
         # --- REMOVED /update and /ollama direct handling ---
         return False
 
@@ -561,7 +1066,8 @@ class ShellEngine:
                               ai_raw_candidate: Optional[str] = None,
                               original_direct_input_if_different: Optional[str] = None,
                               forced_category: Optional[str] = None,
-                              is_ai_generated: bool = False):
+                              is_ai_generated: bool = False,
+                              background: bool = False):
         if not self.ui_manager: logger.error("process_command: UIManager not initialized."); return
         append_output_func = self.ui_manager.append_output
         confirmation_result = None
@@ -618,16 +1124,103 @@ class ShellEngine:
             if not is_direct_simple_command:
                 self.ui_manager.update_status_bar(f"▶️ {exec_message_prefix} ({category} - {self.category_manager_module.CATEGORY_DESCRIPTIONS.get(category, 'Unknown')}): {command_to_execute_sanitized}", style='class:status-bar')
 
-            if category == "simple": await self.execute_shell_command(command_to_execute_sanitized, original_user_input_for_display)
+            if background and category == "interactive_tui":
+                self.ui_manager.append_output(f"ℹ️ '{original_user_input_for_display}' is interactive; running it in the foreground instead.", style_class='info')
+                background = False
+
+            if background: await self.start_background_job(command_to_execute_sanitized, original_user_input_for_display)
+            elif category == "simple": await self.execute_shell_command(command_to_execute_sanitized, original_user_input_for_display)
             else: await self.execute_command_in_tmux(command_to_execute_sanitized, original_user_input_for_display, category)
         finally:
             self.ui_manager.update_status_bar("")
             if self.ui_manager and not self.ui_manager.categorization_flow_active and not self.ui_manager.confirmation_flow_active and not self.ui_manager.is_in_edit_mode:
                 if self.main_restore_normal_input_ref: self.main_restore_normal_input_ref()
 
+    def _router_config_key(self) -> str:
+        """Returns a comparable snapshot of the router model config."""
+        return json.dumps(self.config.get('ai_models', {}).get('router'), sort_keys=True, default=str)
+
+    async def get_router_agent(self):
+        """Returns the router agent, building it in a worker thread on first use.
+
+        The agent is rebuilt only when the router entry under 'ai_models' changes,
+        so config reloads that touch other sections keep the existing instance.
+
+        Returns:
+            The router AgentExecutor, or None if no router model is configured or building failed.
+        """
+        if self._router_agent_lock is None:
+            self._router_agent_lock = asyncio.Lock()
+        async with self._router_agent_lock:
+            config_key = self._router_config_key()
+            if config_key != self._router_agent_config_key:
+                try:
+                    self.router_agent_instance = await asyncio.to_thread(create_router_agent, self.config)
+                except Exception as e:
+                    logger.error(f"Failed to create router agent: {e}", exc_info=True)
+                    self.router_agent_instance = None
+                self._router_agent_config_key = config_key
+                logger.info("Router agent built." if self.router_agent_instance else "Router agent not available.")
+            if self.router_agent_instance is not None:
+                # Attach this loop's shared async client to the (cached) router chat model.
+                ollama_client.get_chat_model(get_router_model_name(self.config), self.config, temperature=0)
+            return self.router_agent_instance
+
+    def start_router_agent_warmup(self):
+        """Builds the router agent in the background so the first routed query doesn't wait for it."""
+        if self._router_warmup_task is None or self._router_warmup_task.done():
+            self._router_warmup_task = asyncio.create_task(self.get_router_agent())
+        return self._router_warmup_task
+
+    async def _should_consult_router(self, user_input: str) -> bool:
+        """Decides whether the LLM router agent is worth a round-trip for this input.
+
+        Scores the input against the embedded router tool descriptions. Inputs that are
+        not close to any tool go straight to translation. Without a tool index (e.g. no
+        embedding model), the router is always consulted.
+
+        Args:
+            user_input: The stripped user input.
+
+        Returns:
+            True if the router agent should be run.
+        """
+        manager = self.embedding_manager_instance
+        if not manager or not manager.has_tool_index():
+            return True
+        threshold = self.config.get("intent_classification", {}).get("router_prefilter_threshold", 0.5)
+        tool_name, score = await manager.match_tool(user_input)
+        if tool_name is None:
+            return True
+        if score < threshold:
+            logger.info(f"Skipping router agent for '{user_input}': closest tool '{tool_name}' scored {score:.2f} < {threshold:.2f}")
+            return False
+        logger.info(f"Consulting router agent for '{user_input}': closest tool '{tool_name}' scored {score:.2f}")
+        return True
+
     async def submit_user_input(self, user_input: str, from_edit_mode: bool = False):
         """The main entry point for processing all user input that isn't a simple built-in.
 
+        See _process_user_input() for the flow. If the input is superseded while its
+        model calls are still queued or running (main cancels the interactive request
+        group when new input is submitted), the input is dropped without falling back
+        to running it as a command.
+
+        Args:
+            user_input (str): The raw text from the user's input field.
+            from_edit_mode (bool): True if the input is a resubmission after
+                the user chose to modify an AI suggestion.
+        """
+        try:
+            await self._process_user_input(user_input, from_edit_mode)
+        except ollama_scheduler.OllamaRequestCancelled:
+            logger.info(f"Dropped input '{user_input.strip()}': superseded by newer input.")
+            if self.ui_manager:
+                self.ui_manager.append_output(f"ℹ️ Dropped '{user_input.strip()}': superseded by newer input.", style_class='info')
+
+    async def _process_user_input(self, user_input: str, from_edit_mode: bool = False):
+        """Processes user input that isn't a simple built-in.
+
         It orchestrates the flow:
         
         1. Handles `/translate` queries by calling the AI handler.
@@ -652,6 +1245,15 @@ class ShellEngine:
             await self.handle_cd_command(user_input_stripped)
             return
 
+        # --- Background jobs: '/bg <command>' or '<command> &' skip AI translation ---
+        is_background, background_command = self._split_background_request(user_input_stripped)
+        if is_background:
+            if not background_command:
+                self.ui_manager.append_output("⚠️ Usage: /bg <command>  or  <command> &", style_class='warning')
+                return
+            await self.process_command(background_command, user_input_stripped, background=True)
+            return
+
         # --- INTENT CLASSIFICATION (NEW) ---
         INTENT_COMMAND_MAP = {
             "show_help": ("/help", False),
@@ -708,7 +1310,7 @@ class ShellEngine:
         }
 
         if self.embedding_manager_instance:
-            intent, score = self.embedding_manager_instance.classify_intent(user_input_stripped)
+            intent, score = await self.embedding_manager_instance.classify_intent(user_input_stripped)
             classification_threshold = self.config.get("intent_classification", {}).get("classification_threshold", 0.70)
 
             if score > classification_threshold:
@@ -778,21 +1380,25 @@ class ShellEngine:
                 await self.process_command(user_input_stripped, user_input_stripped)
                 return
 
-            # --- 1. Try the Router Agent ---
-            self.ui_manager.update_status_bar(f"✨ '{user_input_stripped}' is not a known command. Checking with Router AI...", style='class:status-bar.thinking')
-            if current_app_inst and current_app_inst.is_running: current_app_inst.invalidate()
-            
-            router_command = await run_router_agent(self.router_agent_instance, user_input_stripped)
+            # --- 1. Try the Router Agent (only if a tool is a plausible match) ---
+            if await self._should_consult_router(user_input_stripped):
+                self.ui_manager.update_status_bar(f"✨ '{user_input_stripped}' is not a known command. Checking with Router AI...", style='class:status-bar.thinking')
+                if current_app_inst and current_app_inst.is_running: current_app_inst.invalidate()
 
-            if router_command:
-                # The router agent found a tool to use. The tool's output is the command to run.
-                # We can treat this as a built-in command and execute it directly.
-                await self.handle_built_in_command(router_command)
-                if self.main_restore_normal_input_ref: self.main_restore_normal_input_ref()
-                return
+                router_command = await run_router_agent(await self.get_router_agent(), user_input_stripped)
+
+                if router_command:
+                    # The router agent found a tool to use. The tool's output is the command to run.
+                    # We can treat this as a built-in command and execute it directly.
+                    await self.handle_built_in_command(router_command)
+                    if self.main_restore_normal_input_ref: self.main_restore_normal_input_ref()
+                    return
+                status_message = "🤔 Router found no tool. Trying with Translator AI..."
+            else:
+                status_message = f"✨ '{user_input_stripped}' is not a known command. Trying with Translator AI..."
 
             # --- 2. Fallback to Translator Agent ---
-            self.ui_manager.update_status_bar(f"🤔 Router found no tool. Trying with Translator AI...", style='class:status-bar.thinking')
+            self.ui_manager.update_status_bar(status_message, style='class:status-bar.thinking')
             if current_app_inst and current_app_inst.is_running: current_app_inst.invalidate()
 
             linux_command, ai_raw_candidate = await self.ai_handler_module.get_validated_ai_command(user_input_stripped, self.config, self.ui_manager.append_output, self.ui_manager.get_app_instance)
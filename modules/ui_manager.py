@@ -13,11 +13,16 @@ from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.history import FileHistory
 
 from modules.category_manager import CATEGORY_MAP as CM_CATEGORY_MAP, CATEGORY_DESCRIPTIONS as CM_CATEGORY_DESCRIPTIONS
-from modules.ai_handler import explain_linux_command_with_ai
+from modules.ai_handler import stream_explanation_with_ai
+from modules import ollama_scheduler
+from modules.output_control import DEFAULT_MAX_FRAME_RATE, OutputArea, RenderScheduler
 
 
 logger = logging.getLogger(__name__)
 
+# A streamed explanation line longer than this is flushed at its last space rather than held back.
+EXPLANATION_STREAM_FLUSH_CHARS = 120
+
 class UIManager:
     """The main class for managing the application's UI.
     
@@ -45,12 +50,16 @@ class UIManager:
         self.auto_scroll = True
         self.output_buffer = []
         self.max_output_buffer_lines = config.get('ui', {}).get('max_output_buffer_lines', 500) # Default to 500 lines
+        # Output appends and status updates redraw through this, at most 'ui.max_frame_rate' times per second.
+        self.render_scheduler = RenderScheduler(self._invalidate_app,
+                                                config.get('ui', {}).get('max_frame_rate', DEFAULT_MAX_FRAME_RATE))
 
         self.categorization_flow_active = False
         self.categorization_flow_state = {}
 
         self.confirmation_flow_active = False
         self.confirmation_flow_state = {}
+        self.explain_stream_task = None
 
         self.hung_task_flow_active = False
         self.hung_task_flow_state = {}
@@ -106,6 +115,11 @@ class UIManager:
                    not self.categorization_flow_state['future'].done():
                     self.categorization_flow_state['future'].set_result({'action': 'cancel_execution'})
                 event.app.invalidate()
+            elif self.confirmation_flow_active and self.explain_stream_task and not self.explain_stream_task.done():
+                # First Esc only stops the streaming explanation; the command is still awaiting a decision.
+                logger.info("Explanation stream stopped by Escape.")
+                self.explain_stream_task.cancel()
+                event.app.invalidate()
             elif self.confirmation_flow_active:
                 self.append_output("\n⚠️ Command confirmation cancelled by user.", style_class='warning')
                 logger.info("Confirmation flow cancelled by Escape.")
@@ -214,6 +228,7 @@ class UIManager:
 
     def exit(self):
         """Tells the prompt_toolkit application to exit gracefully."""
+        self.render_scheduler.cancel()
         if self.app and hasattr(self.app, 'exit'):
             logger.info("UIManager: Calling app.exit() to terminate prompt_toolkit loop.")
             self.app.exit()
@@ -625,6 +640,8 @@ class UIManager:
         finally:
             logger.debug(f"UIManager: Confirmation flow finally block. Active: {self.confirmation_flow_active}")
             self.confirmation_flow_active = False
+            # The user has decided; an explanation still queued or generating is no longer wanted.
+            ollama_scheduler.get_scheduler().cancel_group(ollama_scheduler.GROUP_EXPLAIN)
             if action_taken == 'edit_mode_engaged':
                 command_for_edit = self.confirmation_flow_state.get('command_to_confirm', '')
                 accept_handler = self.confirmation_flow_state.get('normal_input_accept_handler_ref')
@@ -682,7 +699,7 @@ class UIManager:
             valid_choice_made = True
         elif response in ['5', 'e', 'explain']:
             self.confirmation_flow_state['step'] = 'explain'
-            asyncio.create_task(self._handle_explain_command_async())
+            self.explain_stream_task = asyncio.create_task(self._handle_explain_command_async())
             valid_choice_made = True
         elif response in ['6', 'm', 'modify']:
             if future_to_set and not future_to_set.done():
@@ -699,18 +716,68 @@ class UIManager:
             return
 
     async def _handle_explain_command_async(self):
+        """Streams the explanation into the output while the user can already decide.
+
+        The post-explanation choice prompt is active from the start, so picking an
+        action ends the flow (and the explanation request) immediately. Esc stops
+        the stream and leaves the command awaiting a decision.
+        """
         command_to_explain = self.confirmation_flow_state['command_to_confirm']
         self.append_output(f"\n🧠 Asking AI to explain: {command_to_explain}", style_class='ai-thinking')
+        self.append_output("   Choose any time: [1] Yes  [2] Simple  [3] Semi-Interactive  [4] TUI  [5] Modify  [6] Cancel  (Esc stops the explanation)", style_class='categorize-prompt')
+        self.set_flow_input_mode(
+            prompt_text="[Explaining...] Choice (1-6): ",
+            accept_handler_func=self._handle_confirmation_after_explain_response,
+            is_confirmation=True
+        )
 
         if self.app and hasattr(self.app, 'is_running') and self.app.is_running:
             self.app.invalidate()
 
-        explanation = await explain_linux_command_with_ai(command_to_explain, self.config, self.append_output)
+        pending = []
+        header_shown = False
+
+        def flush_lines(final: bool = False):
+            # append_output re-renders the whole pane, so only whole lines (or long runs) are appended.
+            text = "".join(pending)
+            if final:
+                complete, rest = text, ""
+            elif "\n" in text:
+                complete, _, rest = text.rpartition("\n")
+            elif len(text) > EXPLANATION_STREAM_FLUSH_CHARS and " " in text:
+                complete, _, rest = text.rpartition(" ")
+            else:
+                return
+            pending[:] = [rest] if rest else []
+            if complete.strip() or not final:
+                self.append_output(complete, style_class='info')
+
+        def on_chunk(text: str):
+            nonlocal header_shown
+            if not self.confirmation_flow_active:
+                return
+            if not header_shown:
+                self.append_output("\n💡 AI Explanation:", style_class='info-header')
+                header_shown = True
+            pending.append(text)
+            flush_lines()
 
-        if explanation:
-            self.append_output("\n💡 AI Explanation:", style_class='info-header')
-            self.append_output(explanation, style_class='info')
-        else:
+        try:
+            explanation = await stream_explanation_with_ai(command_to_explain, self.config, on_chunk)
+        except asyncio.CancelledError:
+            if not self.confirmation_flow_active:
+                return
+            flush_lines(final=True)
+            self.append_output("⏹️ Explanation stopped.", style_class='warning')
+            self._ask_confirmation_after_explain()
+            return
+
+        if not self.confirmation_flow_active:
+            logger.info("UIManager: Confirmation flow ended before the explanation finished; discarding the rest.")
+            return
+
+        flush_lines(final=True)
+        if not explanation and not header_shown:
             self.append_output("⚠️ AI could not provide an explanation.", style_class='warning')
 
         self._ask_confirmation_after_explain()
@@ -820,10 +887,9 @@ class UIManager:
             logger.info(f"UI_OUTPUT_INITIAL_BUFFER: {content.strip()}")
 
 
-        self.output_field = TextArea(
+        self.output_field = OutputArea(
             text="".join([text_content for _, text_content in self.output_buffer]),
-            style='class:output-field', scrollbar=True, focusable=False,
-            wrap_lines=True, read_only=True
+            style='class:output-field'
         )
         self.current_prompt_text = initial_prompt_text
         self.input_field = TextArea(
@@ -851,8 +917,8 @@ class UIManager:
         ]
         self.root_container = HSplit(layout_components)
         self.layout = Layout(self.root_container, focused_element=self.input_field)
-        if self.output_field and self.output_field.buffer:
-            self.output_field.buffer.on_cursor_position_changed += self._on_output_cursor_pos_changed
+        if self.output_field:
+            self.output_field.control.on_cursor_position_changed += self._on_output_cursor_pos_changed
         logger.info("UIManager: UI elements fully initialized.")
         return self.layout
 
@@ -860,30 +926,34 @@ class UIManager:
         self.status_bar_control.text = text
         self.status_bar.style = style
         if self.app:
-            self.app.invalidate()
+            self.render_scheduler.request()
 
     def _on_output_cursor_pos_changed(self, _=None):
         if self.categorization_flow_active or self.confirmation_flow_active or self.api_input_flow_active or self.is_in_edit_mode:
-            if self.output_field and self.output_field.buffer:
-                self.output_field.buffer.cursor_position = len(self.output_field.buffer.text)
+            if self.output_field:
+                self.output_field.control.move_cursor_to_end()
             return
         if not (self.output_field and self.output_field.window and self.output_field.window.render_info):
             return
-        doc = self.output_field.buffer.document
+        line_count = self.output_field.store.line_count
         render_info = self.output_field.window.render_info
         
         if not render_info: return
-        if doc.line_count <= render_info.window_height:
+        if line_count <= render_info.window_height:
             if not self.auto_scroll: self.auto_scroll = True
             return
-        is_scrolled_up = doc.cursor_position_row < (doc.line_count - render_info.window_height + 1)
+        is_scrolled_up = self.output_field.control.cursor_row < (line_count - render_info.window_height + 1)
         if is_scrolled_up:
             if self.auto_scroll: self.auto_scroll = False
         else:
             if not self.auto_scroll: self.auto_scroll = True
 
     def append_output(self, text: str, style_class: str = 'default', internal_call: bool = False):
-        """The primary method for adding text to the main output field."""
+        """The primary method for adding text to the main output field.
+
+        The text is appended to the output pane's OutputTextStore, so an append costs
+        O(len(text)) regardless of how much output is already shown.
+        """
         # Log the text that is about to be appended to the UI output field
         # Strip trailing newline for cleaner logs, as append_output ensures it later.
         logger.info(f"UI_OUTPUT: {text.rstrip()}")
@@ -897,6 +967,10 @@ class UIManager:
         if not text.endswith('\n'): text += '\n'
         
         self.output_buffer.append((style_class, text))
+        store = self.output_field.store
+        control = self.output_field.control
+        store.append(text)
+        dropped_lines = 0
 
         # --- NEW LOGIC: Enforce buffer size limit ---
         if len(self.output_buffer) > self.max_output_buffer_lines:
@@ -905,45 +979,44 @@ class UIManager:
             # Removing a block (e.g., 10% of max_output_buffer_lines) when over limit
             # can be more efficient than removing one-by-one frequently.
             lines_to_remove = len(self.output_buffer) - self.max_output_buffer_lines + (self.max_output_buffer_lines // 10)
+            dropped_lines = sum(content.count('\n') for _, content in self.output_buffer[:lines_to_remove])
             self.output_buffer = self.output_buffer[lines_to_remove:]
+            store.drop_lines(dropped_lines)
             logger.debug(f"Output buffer trimmed. New size: {len(self.output_buffer)} lines.")
         # --- END NEW LOGIC ---
 
-        plain_text_output = "".join([content for _, content in self.output_buffer])
-        
-        buffer = self.output_field.buffer
-        current_cursor_pos = buffer.cursor_position # Store cursor position before updating document
-        
-        # This line is the core of the re-rendering.
-        buffer.set_document(Document(plain_text_output, cursor_position=len(plain_text_output)), bypass_readonly=True)
-        
         if self.auto_scroll or self.categorization_flow_active or self.confirmation_flow_active or self.api_input_flow_active or self.is_in_edit_mode:
-            buffer.cursor_position = len(plain_text_output)
+            control.move_cursor_to_end()
         else:
-            # Restore previous cursor position if not auto-scrolling
-            buffer.cursor_position = min(current_cursor_pos, len(plain_text_output))
+            # Keep the view on the same text if not auto-scrolling (lines trimmed above it shift it up)
+            control.set_cursor_row(control.cursor_row - dropped_lines)
 
         if not internal_call:
             self.last_output_was_separator = False
 
         if self.app: 
-            if hasattr(self.app, 'invalidate'):
-                try:
-                    if hasattr(self.app, 'is_running') and self.app.is_running:
-                        logger.debug("UIManager.append_output: Invalidating running app.")
-                        self.app.invalidate()
-                    elif not hasattr(self.app, 'is_running'): 
-                        logger.debug("UIManager.append_output: self.app is set but no is_running, attempting invalidate.")
-                        self.app.invalidate()
-                    else: 
-                        logger.debug("UIManager.append_output: self.app is set but not running. Invalidation skipped.")
-                except Exception as e:
-                    logger.error(f"Error during app invalidation: {e}", exc_info=True)
-            else:
-                logger.debug("UIManager.append_output: self.app object present but lacks invalidate method.")
+            self.render_scheduler.request()
         else:
             logger.debug("UIManager.append_output: self.app not set. Invalidation skipped.")
 
+    def _invalidate_app(self):
+        """Redraws the application if it is running; called by the render scheduler."""
+        if not self.app:
+            return
+        if hasattr(self.app, 'invalidate'):
+            try:
+                if hasattr(self.app, 'is_running') and self.app.is_running:
+                    self.app.invalidate()
+                elif not hasattr(self.app, 'is_running'): 
+                    logger.debug("UIManager._invalidate_app: self.app is set but no is_running, attempting invalidate.")
+                    self.app.invalidate()
+                else: 
+                    logger.debug("UIManager._invalidate_app: self.app is set but not running. Invalidation skipped.")
+            except Exception as e:
+                logger.error(f"Error during app invalidation: {e}", exc_info=True)
+        else:
+            logger.debug("UIManager._invalidate_app: self.app object present but lacks invalidate method.")
+
 
     def add_interaction_separator(self):
         if not self.config.get("ui", {}).get("enable_output_separator", True):
@@ -1018,7 +1091,7 @@ class UIManager:
         self.current_prompt_text = f"({dir_for_prompt}) > "
         if self.app and hasattr(self.app, 'invalidate'): 
             if self.layout and self.input_field: self.app.layout.focus(self.input_field)
-            self.app.invalidate()
+            self.render_scheduler.flush()
 
     def set_normal_input_mode(self, accept_handler_func: callable, current_directory_path: str):
         """Resets the UI to the default state for normal command input."""
@@ -1033,7 +1106,7 @@ class UIManager:
             self.input_field.buffer.reset()
             if self.app and hasattr(self.app, 'invalidate'):
                 if self.layout: self.app.layout.focus(self.input_field)
-                self.app.invalidate()
+                self.render_scheduler.flush()
 
     def set_flow_input_mode(self, prompt_text: str, accept_handler_func: callable, is_categorization: bool = False, is_confirmation: bool = False, is_api_input: bool = False):
         """Sets the UI for a special input flow (categorization, confirmation, or API)."""
@@ -1064,7 +1137,7 @@ class UIManager:
             self.input_field.buffer.reset()
             if self.app and hasattr(self.app, 'invalidate'):
                 if self.layout: self.app.layout.focus(self.input_field)
-                self.app.invalidate()
+                self.render_scheduler.flush()
 
     def set_edit_mode(self, accept_handler_func: callable, command_to_edit: str):
         """Sets the UI to allow editing a command, populating the input field."""
@@ -1084,4 +1157,4 @@ class UIManager:
             logger.info(f"UIManager: Input buffer set to '{command_to_edit}' for editing.")
             if self.app and hasattr(self.app, 'invalidate'):
                 if self.layout: self.app.layout.focus(self.input_field)
-                self.app.invalidate()
\ No newline at end of file
+                self.render_scheduler.flush()
\ No newline at end of file
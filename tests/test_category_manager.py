@@ -5,6 +5,7 @@
 import pytest
 import json
 import os
+import threading
 import logging # Import logging module
 from unittest.mock import mock_open, patch, MagicMock
 
@@ -148,33 +149,178 @@ def test_load_single_category_file_incorrect_structure(mock_load_jsonc, caplog):
     assert "Category 'simple' in dummy/structured_error.json is not a list. Resetting to empty list." in caplog.text
 
 
-@patch("modules.category_manager._load_single_category_file")
 @patch("modules.category_manager._save_user_command_categories")
 @patch("modules.category_manager.load_and_merge_command_categories")
 def test_add_command_to_category_new_command(
-    mock_load_merge, mock_save_user_cats, mock_load_single, monkeypatch
+    mock_load_merge, mock_save_user_cats, monkeypatch, tmp_path
 ):
-    mock_load_single.return_value = {
-        "simple": [], "semi_interactive": [], "interactive_tui": []
-    }
+    journal_path = tmp_path / category_manager.USER_CATEGORY_JOURNAL_FILENAME
+    monkeypatch.setattr(category_manager, 'USER_CATEGORY_JOURNAL_FILE_PATH', str(journal_path))
+    monkeypatch.setattr(category_manager, '_USER_ASSIGNMENTS', {})
+    monkeypatch.setattr(category_manager, '_JOURNAL_ENTRY_COUNT', 0)
+    monkeypatch.setattr(category_manager, '_CURRENTLY_LOADED_CATEGORIES',
+                        {"simple": ["ls"], "semi_interactive": [], "interactive_tui": []})
     mock_append_output = MagicMock()
     monkeypatch.setattr(category_manager, '_append_output_func_ref', mock_append_output)
-    
-    if not category_manager.CATEGORY_MAP:
-         category_manager.CATEGORY_MAP = {
-            "1": "simple", "simple": "simple",
-            "2": "semi_interactive", "semi_interactive": "semi_interactive",
-            "3": "interactive_tui", "interactive_tui": "interactive_tui"
-        }
 
     category_manager.add_command_to_category("new_cmd", "simple")
-    
-    saved_data = mock_save_user_cats.call_args[0][0]
-    assert "new_cmd" in saved_data["simple"]
-    mock_load_merge.assert_called_once()
-    
+
+    # The change is journaled and applied in memory; nothing is rewritten or reloaded.
+    assert [json.loads(line) for line in journal_path.read_text().splitlines()] == [
+        {"op": "set", "command": "new_cmd", "category": "simple"}]
+    assert category_manager.classify_command("new_cmd") == "simple"
+    mock_save_user_cats.assert_not_called()
+    mock_load_merge.assert_not_called()
+
     expected_message = "✅ Command 'new_cmd' now set as 'simple'."
     mock_append_output.assert_any_call(
         expected_message,
         style_class='success'
     )
+
+
+# --- Tests for the command index ---
+
+@pytest.fixture
+def category_files(tmp_path, monkeypatch):
+    """Initializes the category manager against temporary default/user files; restores module state afterwards."""
+    for name in ("_SCRIPT_DIR_PATH", "_CONFIG_DIR_NAME_CONST", "_append_output_func_ref", "DEFAULT_CATEGORY_FILE_PATH",
+                 "USER_CATEGORY_FILE_PATH", "USER_CATEGORY_JOURNAL_FILE_PATH", "_CURRENTLY_LOADED_CATEGORIES",
+                 "_COMMAND_INDEX", "_INDEXED_CATEGORIES", "_DEFAULT_COMMAND_INDEX", "_RULE_MATCHER",
+                 "_USER_ASSIGNMENTS", "_JOURNAL_ENTRY_COUNT"):
+        monkeypatch.setattr(category_manager, name, getattr(category_manager, name))
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / category_manager.DEFAULT_CATEGORY_FILENAME).write_text(json.dumps(
+        {"simple": ["ls", "git log", "make"], "semi_interactive": ["ping host"], "interactive_tui": ["vim"]}))
+    (config_dir / category_manager.USER_CATEGORY_FILENAME).write_text(json.dumps(
+        {"simple": ["top -b"], "semi_interactive": ["git log"], "interactive_tui": ["make"]}))
+    category_manager.init_category_manager(str(tmp_path), "config", MagicMock())
+    return config_dir
+
+def test_merge_lets_user_categories_override_defaults(category_files):
+    assert category_manager._CURRENTLY_LOADED_CATEGORIES == {
+        "simple": ["ls", "top -b"],
+        "semi_interactive": ["ping host", "git log"],
+        "interactive_tui": ["vim", "make"],
+    }
+    assert category_manager.classify_command("make") == "interactive_tui"
+    assert category_manager.classify_command("git log") == "semi_interactive"
+    assert category_manager.classify_command("ls") == "simple"
+
+def test_add_and_remove_update_the_index_in_place(category_files):
+    with patch("modules.category_manager.load_and_merge_command_categories") as mock_load_merge:
+        category_manager.add_command_to_category("ping host", "simple")
+        assert category_manager.classify_command("ping host") == "simple"
+        assert "ping host" not in category_manager._CURRENTLY_LOADED_CATEGORIES["semi_interactive"]
+
+        category_manager.remove_command_from_category("ping host")
+        assert category_manager.classify_command("ping host") == "semi_interactive"
+        category_manager.remove_command_from_category("top -b")
+        assert category_manager.classify_command("top -b") == category_manager.UNKNOWN_CATEGORY_SENTINEL
+    mock_load_merge.assert_not_called()
+
+    # A full reload (user file + journal) agrees with the in-place updates.
+    in_place = {k: sorted(v) for k, v in category_manager._CURRENTLY_LOADED_CATEGORIES.items()}
+    category_manager.load_and_merge_command_categories()
+    assert {k: sorted(v) for k, v in category_manager._CURRENTLY_LOADED_CATEGORIES.items()} == in_place
+
+def test_index_follows_replaced_category_dict(mock_loaded_categories, monkeypatch):
+    assert category_manager.classify_command("vim") == "interactive_tui"
+    monkeypatch.setattr(category_manager, '_CURRENTLY_LOADED_CATEGORIES', {"simple": ["vim"]})
+    assert category_manager.classify_command("vim") == "simple"
+
+# --- Tests for category rules ---
+
+RULE_CATEGORIES_DATA = {
+    "simple": ["git log -1", "prefix:git", "glob:docker * ps", "base:ls"],
+    "semi_interactive": ["prefix:git log", "glob:docker compose *", "re:^make( |$)", "glob:* --help"],
+    "interactive_tui": ["base:vim", "re:(", "prefix:git log -p"],
+}
+
+@pytest.mark.parametrize("command, expected", [
+    ("git log -1", "simple"),                     # exact entries win
+    ("git log --oneline", "semi_interactive"),    # longest prefix wins
+    ("git log -p main", "interactive_tui"),
+    ("git status", "simple"),
+    ("docker compose ps", "semi_interactive"),    # more literal text wins among globs
+    ("docker stack ps", "simple"),
+    ("make -j4", "semi_interactive"),
+    ("makefile-lint", category_manager.UNKNOWN_CATEGORY_SENTINEL),
+    ("/usr/bin/vim notes.txt", "interactive_tui"),
+    ("ls --help", "semi_interactive"),            # globs beat base rules
+    ("ls -la", "simple"),
+    ("prefix:git", category_manager.UNKNOWN_CATEGORY_SENTINEL), # rules are not commands
+])
+def test_classify_command_with_rules(monkeypatch, command, expected):
+    monkeypatch.setattr(category_manager, '_CURRENTLY_LOADED_CATEGORIES', {k: list(v) for k, v in RULE_CATEGORIES_DATA.items()})
+    assert category_manager.classify_command(command) == expected
+
+@pytest.mark.parametrize("text", ["how do I use --help", "show me the --help"])
+def test_default_rules_do_not_claim_natural_language(monkeypatch, text):
+    default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", category_manager.DEFAULT_CATEGORY_FILENAME)
+    monkeypatch.setattr(category_manager, '_CURRENTLY_LOADED_CATEGORIES', category_manager._load_single_category_file(default_path))
+    assert category_manager.classify_command(text) == category_manager.UNKNOWN_CATEGORY_SENTINEL
+
+def test_rules_added_in_place_are_recompiled(category_files):
+    assert category_manager.classify_command("cargo build --release") == category_manager.UNKNOWN_CATEGORY_SENTINEL
+    category_manager.add_command_to_category("prefix:cargo build", "semi_interactive")
+    assert category_manager.classify_command("cargo build --release") == "semi_interactive"
+    category_manager.move_command_category("prefix:cargo build", "simple")
+    assert category_manager.classify_command("cargo build") == "simple"
+    assert category_manager._CURRENTLY_LOADED_CATEGORIES["semi_interactive"].count("prefix:cargo build") == 0
+    category_manager.remove_command_from_category("prefix:cargo build")
+    assert category_manager.classify_command("cargo build") == category_manager.UNKNOWN_CATEGORY_SENTINEL
+
+
+# --- Tests for the user category journal ---
+
+def test_append_during_compaction_waits_and_is_kept(category_files, monkeypatch):
+    journal_path = category_files / category_manager.USER_CATEGORY_JOURNAL_FILENAME
+    category_manager.add_command_to_category("cargo build", "semi_interactive")
+    real_save = category_manager._save_user_command_categories
+    appended = threading.Event()
+
+    def append_from_another_session():
+        with category_manager._user_category_journal_lock(exclusive=False), open(journal_path, "a") as f:
+            f.write(json.dumps({"op": "set", "command": "late", "category": "simple"}) + "\n")
+        appended.set()
+
+    def save_while_another_session_appends(categories):
+        threading.Thread(target=append_from_another_session, daemon=True).start()
+        assert not appended.wait(0.2) # Held off by the compaction lock
+        return real_save(categories)
+
+    monkeypatch.setattr(category_manager, '_save_user_command_categories', save_while_another_session_appends)
+    assert category_manager._compact_user_category_journal()
+    assert appended.wait(5)
+    category_manager.load_and_merge_command_categories()
+    assert category_manager.classify_command("late") == "simple"
+    assert category_manager.classify_command("cargo build") == "semi_interactive"
+
+def test_journal_survives_a_torn_last_line_and_is_compacted(category_files, monkeypatch):
+    monkeypatch.setattr(category_manager, 'JOURNAL_COMPACTION_THRESHOLD', 4)
+    journal_path = category_files / category_manager.USER_CATEGORY_JOURNAL_FILENAME
+    user_path = category_files / category_manager.USER_CATEGORY_FILENAME
+
+    category_manager.add_command_to_category("cargo build", "semi_interactive")
+    category_manager.remove_command_from_category("top -b")
+    with open(journal_path, "a") as f:
+        f.write('{"op": "set", "command": "half')  # a crash in the middle of an append
+    category_manager.load_and_merge_command_categories()
+    assert category_manager.classify_command("cargo build") == "semi_interactive"
+    assert category_manager.classify_command("top -b") == category_manager.UNKNOWN_CATEGORY_SENTINEL
+    assert category_manager._JOURNAL_ENTRY_COUNT == 2
+
+    with open(journal_path, "a") as f:
+        f.write("\n")
+    category_manager.add_command_to_category("make", "simple")
+    category_manager.add_command_to_category("cargo test", "semi_interactive")  # 4th entry: compaction
+
+    assert not journal_path.exists()
+    saved = json.loads(user_path.read_text())
+    assert saved == {"interactive_tui": [], "semi_interactive": ["git log", "cargo build", "cargo test"], "simple": ["make"]}
+    assert not list(category_files.glob("*.tmp"))
+    before = {k: sorted(v) for k, v in category_manager._CURRENTLY_LOADED_CATEGORIES.items()}
+    category_manager.load_and_merge_command_categories()
+    assert {k: sorted(v) for k, v in category_manager._CURRENTLY_LOADED_CATEGORIES.items()} == before
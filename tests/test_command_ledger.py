@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from modules import command_ledger
+from modules.command_ledger import CommandLedger, format_stats_report, get_command_ledger, summarize_entries
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_ledger():
+    command_ledger._ledger_instance = None
+    yield
+    command_ledger._ledger_instance = None
+
+
+def test_record_appends_one_json_line_per_run(tmp_path):
+    ledger = CommandLedger(str(tmp_path / "logs" / "ledger.jsonl"))
+    ledger.record("make", "simple", exit_code=0, wall_seconds=1.23456, cpu_user_seconds=0.5, output_bytes=10, backend="subprocess")
+    ledger.record("make test", "background", exit_code=2, wall_seconds=3.0)
+
+    lines = (tmp_path / "logs" / "ledger.jsonl").read_text().splitlines()
+    assert len(lines) == 2
+    first = json.loads(lines[0])
+    assert first["command"] == "make" and first["kind"] == "simple" and first["wall_seconds"] == 1.2346
+    assert first["cpu_system_seconds"] is None
+    assert [e["command"] for e in ledger.read_entries()] == ["make", "make test"]
+
+
+def test_read_entries_skips_damaged_lines_and_keeps_the_most_recent(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    path.write_text('{"command": "a"}\n{"command": "b", "wall_s\n[1, 2]\n{"command": "c"}\n{"command": "d"}\n')
+    ledger = CommandLedger(str(path), max_stats_entries=2)
+    assert [e["command"] for e in ledger.read_entries()] == ["c", "d"]
+    assert CommandLedger(str(tmp_path / "missing.jsonl")).read_entries() == []
+
+
+def test_summarize_groups_runs_per_command():
+    entries = [
+        {"command": "build", "exit_code": 0, "wall_seconds": 2.0, "cpu_user_seconds": 1.0, "cpu_system_seconds": 0.5, "max_rss_kb": 1000, "output_bytes": 10},
+        {"command": "build", "exit_code": 1, "wall_seconds": 4.0, "cpu_user_seconds": 2.0, "cpu_system_seconds": 0.5, "max_rss_kb": 3000, "output_bytes": 5},
+        {"command": "vim", "exit_code": None, "wall_seconds": 9.0},
+    ]
+    build, vim = summarize_entries(entries)
+    assert build["runs"] == 2 and build["failures"] == 1
+    assert build["total_wall_seconds"] == 6.0 and build["max_wall_seconds"] == 4.0
+    assert build["total_cpu_seconds"] == 4.0 and build["max_rss_kb"] == 3000 and build["total_output_bytes"] == 15
+    assert vim["total_cpu_seconds"] is None and vim["max_rss_kb"] is None and vim["failures"] == 0
+
+
+def test_stats_report_ranks_commands_and_limits_to_top_n():
+    entries = [{"command": f"cmd{i}", "exit_code": 0, "wall_seconds": float(i), "max_rss_kb": None, "output_bytes": 0} for i in range(1, 5)]
+    report = format_stats_report(entries, top_n=2)
+    slowest = report.split("Slowest (longest single run):\n", 1)[1].splitlines()
+    assert "cmd4" in slowest[0] and "cmd3" in slowest[1] and "cmd2" not in report
+    assert "Highest peak memory" not in report
+    assert format_stats_report([]) == "No commands recorded yet."
+
+
+def test_get_command_ledger_resolves_paths_and_can_be_disabled(tmp_path):
+    assert get_command_ledger({"command_ledger": {"enabled": False}}) is None
+    ledger = get_command_ledger({})
+    assert ledger.path == f"{command_ledger.PROJECT_ROOT}/logs/command_ledger.jsonl"
+    custom = get_command_ledger({"command_ledger": {"path": str(tmp_path / "l.jsonl")}})
+    assert custom.path == str(tmp_path / "l.jsonl")
+    assert get_command_ledger({"command_ledger": {"path": str(tmp_path / "l.jsonl")}}) is custom
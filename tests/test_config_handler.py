@@ -130,3 +130,34 @@ def test_save_json_file_type_error(mock_makedirs):
         success = config_handler.save_json_file("dummy/output.json", data_to_save)
         
     assert success is False
+
+
+# --- Test Cases for save_json_file_atomic ---
+
+def test_save_json_file_atomic_replaces_file_and_keeps_mode(tmp_path):
+    target = tmp_path / "settings.json"
+    target.write_text('{"old": true}')
+    os.chmod(target, 0o600)
+
+    assert config_handler.save_json_file_atomic(str(target), {"b": 1, "a": 2}) is True
+
+    assert target.read_text() == json.dumps({"a": 2, "b": 1}, indent=2, sort_keys=True)
+    assert os.stat(target).st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ["settings.json"]
+
+
+def test_save_json_file_atomic_leaves_original_on_failure(tmp_path):
+    target = tmp_path / "settings.json"
+    target.write_text('{"old": true}')
+
+    assert config_handler.save_json_file_atomic(str(target), {"unserializable": {1, 2}}) is False
+
+    assert target.read_text() == '{"old": true}'
+    assert os.listdir(tmp_path) == ["settings.json"]
+
+
+def test_save_json_file_atomic_writes_the_same_layout_as_save_json_file(tmp_path):
+    data = {"simple": {"ls": 1}, "interactive_tui": {}, "semi_interactive": {"make": 2}}
+    assert config_handler.save_json_file(str(tmp_path / "plain.json"), data) is True
+    assert config_handler.save_json_file_atomic(str(tmp_path / "atomic.json"), data) is True
+    assert (tmp_path / "atomic.json").read_text() == (tmp_path / "plain.json").read_text()
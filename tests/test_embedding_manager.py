@@ -1,9 +1,11 @@
+import asyncio
 import pytest
 import numpy as np
 import json
-from unittest.mock import MagicMock, patch, mock_open
+from unittest.mock import AsyncMock, MagicMock, patch, mock_open
 
 from modules.embedding_manager import EmbeddingManager
+from modules.ollama_scheduler import GROUP_INTERACTIVE, PRIORITY_BACKGROUND, OllamaRequestCancelled, OllamaRequestScheduler
 
 # Sample embedding vector for mocking
 SAMPLE_EMBEDDING = [0.1] * 1024
@@ -37,7 +39,7 @@ def embedding_manager(mock_config, mock_ollama_client):
     # Mock the file system read for intents.json
     m = mock_open(read_data=json.dumps(MOCK_INTENTS))
     with patch('builtins.open', m):
-        with patch('modules.embedding_manager.ollama.Client', return_value=mock_ollama_client):
+        with patch('modules.embedding_manager.ollama_client.get_sync_client', return_value=mock_ollama_client):
             manager = EmbeddingManager(config=mock_config)
             manager.initialize()
             return manager
@@ -69,13 +71,13 @@ def test_initialization_failure(mock_config):
     """
     m = mock_open(read_data=json.dumps(MOCK_INTENTS))
     with patch('builtins.open', m):
-        with patch('modules.embedding_manager.ollama.Client', side_effect=Exception("Connection failed")):
+        with patch('modules.embedding_manager.ollama_client.get_sync_client', side_effect=Exception("Connection failed")):
             manager = EmbeddingManager(config=mock_config)
             manager.initialize()
             assert manager.client is None
             assert len(manager.intent_embeddings) == 0
 
-def test_classify_intent_success(embedding_manager):
+async def test_classify_intent_success(embedding_manager):
     """
     Tests successful intent classification with a high similarity score.
     """
@@ -83,18 +85,93 @@ def test_classify_intent_success(embedding_manager):
     input_embedding = np.array(SAMPLE_EMBEDDING) * 0.98  # Slightly different
     embedding_manager.client.embeddings.return_value = {'embedding': input_embedding.tolist()}
 
-    intent, score = embedding_manager.classify_intent(user_input)
+    intent, score = await embedding_manager.classify_intent(user_input)
 
     assert intent in MOCK_INTENTS
     assert score > 0.95
 
-def test_classify_intent_no_client(mock_config):
+async def test_classify_intent_no_client(mock_config):
     """
     Tests that classification returns (None, 0.0) if the client is not available.
     """
     manager = EmbeddingManager(config=mock_config)
     manager.client = None # Ensure client is None
-    intent, score = manager.classify_intent("any input")
+    intent, score = await manager.classify_intent("any input")
     assert intent is None
     assert score == 0.0
 
+
+def _tool(name, description):
+    tool = MagicMock()
+    tool.name = name
+    tool.description = description
+    return tool
+
+async def test_match_tool_scores_against_tool_index(embedding_manager):
+    """
+    Tests that the tool index picks the closest tool and reuses the input embedding.
+    """
+    vectors = {
+        "run tests: Runs the test suite.": [1.0, 0.0, 0.0],
+        "add alias: Creates a new alias.": [0.0, 1.0, 0.0],
+        "please run the tests": [0.9, 0.1, 0.0],
+    }
+    embedding_manager.client.embeddings.side_effect = lambda model, prompt: {'embedding': vectors[prompt]}
+    await embedding_manager.initialize_tool_index([
+        _tool("run_tests", "Runs the\n    test suite."),
+        _tool("add_alias", "Creates a new alias."),
+    ])
+    assert embedding_manager.has_tool_index()
+    assert embedding_manager.tool_matrix.shape == (2, 3)
+
+    calls_before = embedding_manager.client.embeddings.call_count
+    tool_name, score = await embedding_manager.match_tool("please run the tests")
+    await embedding_manager.match_tool("please run the tests")
+    assert tool_name == "run_tests"
+    assert score == pytest.approx(0.9 / np.linalg.norm([0.9, 0.1]))
+    assert embedding_manager.client.embeddings.call_count == calls_before + 1
+
+async def test_tool_index_is_built_in_the_background_at_background_priority(embedding_manager):
+    embedding_manager.client.embeddings.return_value = {'embedding': [1.0, 0.0]}
+    async def run(model, coro_factory, priority, group=None):
+        return await coro_factory()
+    scheduler = MagicMock()
+    scheduler.run = AsyncMock(side_effect=run)
+    with patch('modules.embedding_manager.ollama_scheduler.get_scheduler', return_value=scheduler):
+        task = embedding_manager.start_tool_index_build([_tool("run_tests", "Runs the test suite.")])
+        assert not embedding_manager.has_tool_index()
+        await task
+    assert embedding_manager.has_tool_index()
+    assert scheduler.run.call_args.kwargs['priority'] == PRIORITY_BACKGROUND
+
+async def test_match_tool_without_index(embedding_manager):
+    """
+    Tests that match_tool returns (None, 0.0) before the index is built.
+    """
+    assert not embedding_manager.has_tool_index()
+    assert await embedding_manager.match_tool("anything") == (None, 0.0)
+
+async def test_match_tool_is_cancelled_with_the_interactive_group(embedding_manager):
+    """
+    Tests that the input embedding runs in the scheduler's interactive group and gives up when it is cancelled.
+    """
+    embedding_manager.tool_matrix = np.array([[1.0, 0.0, 0.0]])
+    embedding_manager.tool_names = ["run_tests"]
+    calls_before = embedding_manager.client.embeddings.call_count
+    scheduler = OllamaRequestScheduler()
+    release = asyncio.Event()
+
+    async def _hold_slot():
+        await release.wait()
+
+    with patch('modules.embedding_manager.ollama_scheduler.get_scheduler', return_value=scheduler):
+        holder = asyncio.create_task(scheduler.run(embedding_manager.embedding_model, _hold_slot))
+        await asyncio.sleep(0)
+        match = asyncio.create_task(embedding_manager.match_tool("please run the tests"))
+        await asyncio.sleep(0)
+        scheduler.cancel_group(GROUP_INTERACTIVE)
+        with pytest.raises(OllamaRequestCancelled):
+            await match
+        release.set()
+        await holder
+    assert embedding_manager.client.embeddings.call_count == calls_before
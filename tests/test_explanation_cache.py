@@ -0,0 +1,108 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from modules import explanation_cache
+from modules.explanation_cache import ExplanationCache, make_cache_key, normalize_command
+from utils import lc_explainer
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_cache():
+    explanation_cache._cache_instance = None
+    yield
+    explanation_cache._cache_instance = None
+
+
+@pytest.fixture
+def explainer_config(tmp_path):
+    return {
+        'ai_models': {'explainer': {'model': 'explain-model', 'options': {'temperature': 0}}},
+        'prompts': {'explainer': {'system': 'Explain.', 'user_template': "Explain: '{command_text}'"}},
+        'explanation_cache': {'path': str(tmp_path / 'explanations.json'), 'max_entries': 2},
+    }
+
+
+def test_normalize_command_collapses_whitespace_outside_quotes():
+    assert normalize_command("  ls   -la  'my   dir' ") == "ls -la 'my   dir'"
+    assert normalize_command('grep  "a  b"\tfile') == 'grep "a  b" file'
+    assert normalize_command("touch a\\  b") == "touch a\\  b"
+    assert normalize_command("echo 'unbalanced   quote") == "echo 'unbalanced   quote"
+
+
+@pytest.mark.parametrize("first, second", [
+    ("rm *", "rm '*'"),
+    ("echo $HOME", "echo '$HOME'"),
+    ("ls 'my dir'", 'ls "my dir"'),
+])
+def test_normalize_command_keeps_quoting_that_changes_meaning(first, second):
+    assert normalize_command(first) != normalize_command(second)
+
+
+def test_cache_key_depends_on_model_options_and_prompts():
+    base = make_cache_key("ls -la", "m1", {"temperature": 0}, "sys", "user")
+    assert base == make_cache_key("ls  -la", "m1", {"temperature": 0}, "sys", "user")
+    assert base != make_cache_key("ls -la", "m2", {"temperature": 0}, "sys", "user")
+    assert base != make_cache_key("ls -la", "m1", {"temperature": 1}, "sys", "user")
+    assert base != make_cache_key("ls -la", "m1", {"temperature": 0}, "sys2", "user")
+
+
+def test_lru_eviction_and_persistence(tmp_path):
+    path = tmp_path / "cache" / "explanations.json"
+    cache = ExplanationCache(str(path), max_entries=2)
+    cache.put("a", "explains a")
+    cache.put("b", "explains b")
+    assert cache.get("a") == "explains a" # 'b' is now least recently used
+    cache.put("c", "explains c")
+    assert cache.get("b") is None
+
+    reloaded = ExplanationCache(str(path), max_entries=2)
+    assert len(reloaded) == 2
+    assert reloaded.get("c") == "explains c"
+    assert not list(path.parent.glob("*.tmp")) # No temp files left behind
+
+
+def test_put_merges_entries_written_by_other_sessions(tmp_path):
+    path = str(tmp_path / "explanations.json")
+    first, second = ExplanationCache(path), ExplanationCache(path)
+    first.put("a", "explains a")
+    assert second.get("a") == "explains a" # Loaded after first wrote
+    first.put("b", "explains b")
+    second.put("c", "explains c") # Must not drop 'b', which second never saw
+    reloaded = ExplanationCache(path)
+    assert [reloaded.get(key) for key in "abc"] == ["explains a", "explains b", "explains c"]
+    second.clear()
+    assert len(ExplanationCache(path)) == 0
+
+
+def test_corrupt_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "explanations.json"
+    path.write_text("{not json")
+    cache = ExplanationCache(str(path))
+    assert cache.get("anything") is None
+    cache.put("k", "v")
+    assert json.loads(path.read_text())["entries"][0][0] == "k"
+
+
+def test_disabled_cache_returns_none(explainer_config):
+    explainer_config['explanation_cache']['enabled'] = False
+    assert explanation_cache.get_explanation_cache(explainer_config) is None
+
+
+async def test_explainer_serves_repeated_commands_from_cache(explainer_config):
+    with patch('utils.lc_explainer.ollama_client.call_with_retries', new_callable=AsyncMock, return_value="<think>hmm</think>Lists files.") as mock_call, \
+         patch('utils.lc_explainer.ollama_client.get_chat_model'):
+        first = await lc_explainer.get_ai_explanation("ls -la", explainer_config)
+        second = await lc_explainer.get_ai_explanation("ls   -la", explainer_config)
+    assert first == second == "Lists files."
+    assert mock_call.await_count == 1
+
+
+async def test_explainer_does_not_cache_failures(explainer_config):
+    with patch('utils.lc_explainer.ollama_client.call_with_retries', new_callable=AsyncMock, side_effect=[ConnectionError("down"), "Lists files."]) as mock_call, \
+         patch('utils.lc_explainer.ollama_client.get_chat_model'):
+        first = await lc_explainer.get_ai_explanation("ls -la", explainer_config)
+        second = await lc_explainer.get_ai_explanation("ls -la", explainer_config)
+    assert first.startswith("An error occurred")
+    assert second == "Lists files."
+    assert mock_call.await_count == 2
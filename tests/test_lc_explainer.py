@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from modules import explanation_cache
+from utils import lc_explainer
+from utils.lc_explainer import ThinkTagStripper
+
+
+@pytest.fixture
+def explainer_config(tmp_path):
+    explanation_cache._cache_instance = None
+    yield {
+        'ai_models': {'explainer': 'explain-model'},
+        'prompts': {'explainer': {'system': 'Explain.', 'user_template': "Explain: '{command_text}'"}},
+        'explanation_cache': {'path': str(tmp_path / 'explanations.json')},
+        'behavior': {'ollama_api_call_retries': 0},
+    }
+    explanation_cache._cache_instance = None
+
+
+def _strip_chunks(chunks):
+    stripper = ThinkTagStripper()
+    return "".join(stripper.feed(c) for c in chunks) + stripper.flush()
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    (["<think>plan</think>\n\nLists files."], "Lists files."),
+    (["<thi", "nk>pl", "an</th", "ink>  Lists", " files."], "Lists files."),
+    (["Lists <b>bold</b> files."], "Lists <b>bold</b> files."),
+    (["Ends with <", "thin"], "Ends with <thin"),
+    (["<think>never closed"], ""),
+])
+def test_think_tag_stripper(chunks, expected):
+    assert _strip_chunks(chunks) == expected
+
+
+def _fake_chain(chunks):
+    async def astream(inputs):
+        for chunk in chunks:
+            yield chunk
+    chain = MagicMock()
+    chain.astream = astream
+    return chain
+
+
+async def test_stream_ai_explanation_emits_visible_chunks_and_caches(explainer_config):
+    received = []
+    with patch('utils.lc_explainer._build_chain', return_value=_fake_chain(["<think>x</think>", "Lists ", "files."])):
+        result = await lc_explainer.stream_ai_explanation("ls", explainer_config, received.append)
+    assert result == "Lists files."
+    assert received == ["Lists ", "files."]
+
+    cached = []
+    with patch('utils.lc_explainer._build_chain') as mock_build:
+        assert await lc_explainer.stream_ai_explanation("ls", explainer_config, cached.append) == "Lists files."
+    mock_build.assert_not_called()
+    assert cached == ["Lists files."]
+
+
+async def test_stream_interrupted_after_output_is_not_retried(explainer_config):
+    explainer_config['behavior']['ollama_api_call_retries'] = 3
+    calls = []
+
+    async def astream(inputs):
+        calls.append(1)
+        yield "Lists "
+        raise ConnectionError("connection reset")
+    chain = MagicMock()
+    chain.astream = astream
+
+    received = []
+    with patch('utils.lc_explainer._build_chain', return_value=chain):
+        result = await lc_explainer.stream_ai_explanation("ls", explainer_config, received.append)
+    assert len(calls) == 1
+    assert result.startswith("An error occurred")
+    assert received[0] == "Lists "
@@ -338,6 +338,7 @@ async def test_main_async_runner_proceeds_if_dev_mode_and_integrity_fails(mocker
     # *** START OF FIX ***
     # Configure the mock shell engine instance to have an awaitable mock for the ollama service check
     mock_shell_engine.ollama_manager_module.ensure_ollama_service = AsyncMock(return_value=True)
+    mock_shell_engine.shutdown = AsyncMock()
     # *** END OF FIX ***
     mock_shell_engine_constructor.return_value = mock_shell_engine
 
@@ -382,6 +383,7 @@ async def test_main_async_runner_proceeds_if_integrity_ok_and_not_halting(mocker
     # *** START OF FIX ***
     # Configure the mock shell engine instance to have an awaitable mock for the ollama service check
     mock_shell_engine.ollama_manager_module.ensure_ollama_service = AsyncMock(return_value=True)
+    mock_shell_engine.shutdown = AsyncMock()
     # *** END OF FIX ***
     mock_shell_engine_constructor.return_value = mock_shell_engine
     
@@ -0,0 +1,182 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from modules import man_index
+from modules.man_index import ManIndex, parse_options, parse_summary
+
+HELP_TEXT = """Usage: ls [OPTION]... [FILE]...
+List information about the FILEs (the current directory by default).
+Sort entries alphabetically if none of -cftuvSUX nor --sort is specified.
+
+Mandatory arguments to long options are mandatory for short options too.
+  -a, --all                  do not ignore entries starting with .
+      --block-size=SIZE      with -l, scale sizes by SIZE when printing them;
+                             e.g., '--block-size=M'; see SIZE format below
+      --color[=WHEN],
+      --colour[=WHEN]        colorize the output; WHEN can be 'always'
+  -l                         use a long listing format
+"""
+
+MAN_TEXT = """LS(1)                            User Commands                           LS(1)
+
+NAME
+       ls - list directory contents
+
+DESCRIPTION
+       -a, --all
+              do not ignore entries starting with .
+
+       -l     use a long listing format
+"""
+
+
+def test_parse_options_help_layout():
+    options = parse_options(HELP_TEXT)
+    assert options['-a'] == options['--all'] == "do not ignore entries starting with ."
+    assert options['--block-size'].startswith("with -l, scale sizes by SIZE")
+    assert options['--color'] == options['--colour']
+    assert options['-l'] == "use a long listing format"
+
+
+def test_parse_options_man_layout():
+    options = parse_options(MAN_TEXT)
+    assert options['--all'] == "do not ignore entries starting with ."
+    assert options['-l'] == "use a long listing format"
+
+
+def test_parse_summary():
+    assert parse_summary(MAN_TEXT, "man") == "list directory contents"
+    assert parse_summary(HELP_TEXT, "help") == "List information about the FILEs (the current directory by default)."
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = ManIndex(str(tmp_path))
+    entry = {"version": man_index.INDEX_FORMAT_VERSION, "command": "ls", "source": "help",
+             "signature": ["/bin/ls", 1, 1], "summary": "list directory contents", "options": parse_options(HELP_TEXT)}
+    idx._entries = {"ls": entry, "grep": dict(entry, command="grep", options={"-i": "ignore case"})}
+    return idx
+
+
+def test_explain_expands_short_flag_clusters(index):
+    explanation = index.explain("ls -la --color=auto /tmp")
+    assert explanation.splitlines()[0] == "ls: list directory contents"
+    assert "-l" in explanation and "use a long listing format" in explanation
+    assert "--color=auto" in explanation
+    assert "Arguments: /tmp" in explanation
+
+
+def test_explain_handles_pipelines(index):
+    explanation = index.explain("ls -a | grep -i foo")
+    assert explanation.startswith("A pipeline of 2 commands")
+    assert "ignore case" in explanation
+
+
+@pytest.mark.parametrize("command", [
+    "ls -lZ",            # Undocumented flag
+    "ls > out.txt",      # Redirection
+    "ls && rm -rf x",    # Command list
+    "ls $(pwd)",         # Substitution
+    "unknowncmd -x",     # Not on PATH
+])
+def test_explain_returns_none_when_not_covered(index, command):
+    with patch('modules.man_index.shutil.which', return_value=None):
+        assert index.explain(command) is None
+
+
+def test_explain_uses_the_subcommand_page_for_subcommand_tools(index):
+    git = dict(index._entries["ls"], command="git", options={"-p": "Pipe all output into less"})
+    git_log = dict(index._entries["ls"], command="git-log", summary="Show commit logs", options={"-p": "Generate patch"})
+    index._entries.update({"git": git, "git-log": git_log})
+    explanation = index.explain("git log -p")
+    assert explanation.splitlines()[0] == "git log: Show commit logs"
+    assert "Generate patch" in explanation and "less" not in explanation
+    assert "Arguments" not in explanation
+
+
+@pytest.mark.parametrize("command", [
+    "git status -s",     # No git-status page
+    "git -C repo log",   # Global option before the subcommand
+])
+def test_explain_does_not_fall_back_to_the_top_level_page_for_subcommands(index, command):
+    index._entries.update({"git": dict(index._entries["ls"], command="git", options={"-s": "x", "-C": "y"}),
+                           "git-status": None})
+    assert index.explain(command) is None
+
+
+def test_get_entry_reads_the_subcommand_man_page(tmp_path):
+    idx = ManIndex(str(tmp_path))
+    with patch('modules.man_index.shutil.which', side_effect=lambda name: f"/usr/bin/{name}"), \
+         patch.object(ManIndex, '_executable_signature', return_value=["/usr/bin/git", 1, 2]), \
+         patch.object(ManIndex, '_run', return_value=MAN_TEXT) as mock_run:
+        entry = idx.get_entry("git", "log")
+        assert idx.get_entry("git", "../etc") is None
+    mock_run.assert_called_once_with(["man", "-P", "cat", "git-log"])
+    assert entry["command"] == "git-log"
+    assert (tmp_path / "git-log.json").exists()
+
+
+def test_get_entry_builds_once_and_caches_on_disk(tmp_path):
+    idx = ManIndex(str(tmp_path), use_help_output=True, help_allowlist={"ls"})
+    with patch('modules.man_index.shutil.which', side_effect=lambda name: None if name == "man" else f"/usr/bin/{name}"), \
+         patch.object(ManIndex, '_executable_signature', return_value=["/usr/bin/ls", 1, 2]), \
+         patch.object(ManIndex, '_run', return_value=HELP_TEXT) as mock_run:
+        entry = idx.get_entry("ls")
+        assert entry["source"] == "help"
+        mock_run.assert_called_once_with(["/usr/bin/ls", "--help"])
+
+        fresh = ManIndex(str(tmp_path), use_help_output=True, help_allowlist={"ls"})
+        assert fresh.get_entry("ls")["options"] == entry["options"]
+        assert mock_run.call_count == 1
+    assert json.loads((tmp_path / "ls.json").read_text())["summary"] == entry["summary"]
+
+
+def test_help_output_is_off_by_default(tmp_path):
+    idx = ManIndex(str(tmp_path), help_allowlist={"ls"})
+    with patch('modules.man_index.shutil.which', side_effect=lambda name: None if name == "man" else f"/usr/bin/{name}"), \
+         patch.object(ManIndex, '_run') as mock_run:
+        assert idx.get_entry("ls") is None
+    mock_run.assert_not_called()
+
+
+def test_help_output_is_only_run_for_allowlisted_commands(tmp_path):
+    idx = ManIndex(str(tmp_path), use_help_output=True)
+    with patch('modules.man_index.shutil.which', side_effect=lambda name: None if name == "man" else f"/usr/bin/{name}"), \
+         patch.object(ManIndex, '_executable_signature', side_effect=lambda path: [path, 1, 2]), \
+         patch.object(ManIndex, '_run', return_value=HELP_TEXT) as mock_run:
+        assert idx.get_entry("some-script") is None
+        assert idx.get_entry("docker")["source"] == "help"
+    mock_run.assert_called_once_with(["/usr/bin/docker", "--help"])
+
+
+def test_help_output_is_not_run_for_denylisted_commands(tmp_path):
+    idx = ManIndex(str(tmp_path), use_help_output=True, help_denylist={"visudo"}, help_allowlist={"reboot", "visudo"})
+    with patch('modules.man_index.shutil.which', side_effect=lambda name: None if name == "man" else f"/usr/sbin/{name}"), \
+         patch.object(ManIndex, '_run') as mock_run:
+        assert idx.get_entry("reboot") is None
+        assert idx.get_entry("visudo") is None
+    mock_run.assert_not_called()
+
+
+async def test_ai_handler_prefers_local_explanation():
+    from modules import ai_handler
+    with patch('modules.ai_handler.man_index.explain_command', return_value="ls: list directory contents"), \
+         patch('modules.ai_handler.get_lc_explanation', new_callable=AsyncMock) as mock_llm:
+        assert await ai_handler.explain_linux_command_with_ai("ls", {}, None) == "ls: list directory contents"
+    mock_llm.assert_not_called()
+
+    with patch('modules.ai_handler.man_index.explain_command', return_value=None), \
+         patch('modules.ai_handler.get_lc_explanation', new_callable=AsyncMock, return_value="LLM says") as mock_llm:
+        assert await ai_handler.explain_linux_command_with_ai("ls > x", {}, None) == "LLM says"
+
+
+@pytest.mark.parametrize("command", ["sudo rm -rf /", "sudo dd if=a of=/dev/sda", "ls | shutdown -h now"])
+async def test_ai_handler_leaves_dangerous_commands_to_the_llm(command):
+    from modules import ai_handler
+    config = {"security": {"dangerous_patterns": [r"\brm\s+-rf\s+/", r"\b(shutdown|reboot)\b"], "warn_on_commands": ["dd"]}}
+    with patch('modules.ai_handler.man_index.explain_command', return_value="rm: remove files") as mock_local, \
+         patch('modules.ai_handler.get_lc_explanation', new_callable=AsyncMock, return_value="DANGER") as mock_llm:
+        assert await ai_handler.explain_linux_command_with_ai(command, config, None) == "DANGER"
+    mock_local.assert_not_called()
+    mock_llm.assert_awaited_once()
@@ -0,0 +1,119 @@
+import math
+import pytest
+import ollama
+
+from modules import ollama_client
+from utils.mock_ollama import DEFAULT_MODELS, MockOllamaServer, _token_direction, configured_model_names, pseudo_embedding
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b)) / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b)))
+
+
+@pytest.fixture
+def server():
+    script = [
+        {"match": "list.*files", "response": "<bash>ls -la</bash>"},
+        {"endpoint": "chat", "match": "weather", "response": "",
+         "tool_calls": [{"name": "web_search", "arguments": {"query": "weather today"}}]},
+        {"match": "explode", "status": 500, "error": "scripted failure"},
+    ]
+    with MockOllamaServer(models=["mock-model:latest", "embed-model:latest"], script=script, embedding_dim=32) as srv:
+        yield srv
+
+
+@pytest.fixture
+def client(server):
+    return ollama.Client(host=server.url)
+
+
+def test_tags_lists_configured_models(client):
+    names = [m.model for m in client.list().models]
+    assert names == ["mock-model:latest", "embed-model:latest"]
+
+
+def test_generate_uses_scripted_response(client):
+    response = client.generate(model="mock-model", prompt="please list all files here")
+    assert response.response == "<bash>ls -la</bash>"
+    assert response.done
+
+
+def test_unmatched_prompt_gets_default_response(server, client):
+    response = client.generate(model="mock-model", prompt="something else")
+    assert response.response == server.default_response
+
+
+def test_chat_streaming_reassembles_content(client):
+    chunks = list(client.chat(model="mock-model", messages=[{"role": "user", "content": "list my files"}], stream=True))
+    assert "".join(c.message.content for c in chunks) == "<bash>ls -la</bash>"
+    assert chunks[-1].done
+
+
+def test_chat_returns_scripted_tool_calls(client):
+    response = client.chat(model="mock-model", messages=[{"role": "user", "content": "what's the weather?"}])
+    call = response.message.tool_calls[0]
+    assert call.function.name == "web_search"
+    assert call.function.arguments == {"query": "weather today"}
+
+
+def test_scripted_and_unknown_model_errors(client):
+    with pytest.raises(ollama.ResponseError) as exc_info:
+        client.generate(model="mock-model", prompt="explode now")
+    assert exc_info.value.status_code == 500
+    with pytest.raises(ollama.ResponseError) as exc_info:
+        client.generate(model="missing-model", prompt="hi")
+    assert exc_info.value.status_code == 404
+
+
+def test_embeddings_are_deterministic_and_similarity_preserving(client):
+    texts = ["list files in directory", "list the files in this directory", "reboot the machine"]
+    embeddings = client.embed(model="embed-model", input=texts).embeddings
+    assert len(embeddings[0]) == 32
+    assert embeddings[0] == pytest.approx(pseudo_embedding(texts[0], 32))
+    assert _cosine(embeddings[0], embeddings[1]) > _cosine(embeddings[0], embeddings[2])
+
+
+def test_pseudo_embedding_reuses_token_directions():
+    _token_direction.cache_clear()
+    pseudo_embedding("list files here", 16)
+    pseudo_embedding("list files there", 16)
+    info = _token_direction.cache_info()
+    assert (info.misses, info.hits) == (4, 2)
+
+
+def test_configured_model_names_cover_the_default_config():
+    names = configured_model_names()
+    assert names[:len(DEFAULT_MODELS)] == DEFAULT_MODELS
+    assert {"qwen3:0.6b", "nomic-embed-text", "vitali87/shell-commands-qwen2-1.5b-q8_0-extended"} <= set(names)
+    assert len(names) == len(set(names))
+
+
+def test_configured_model_names_fall_back_without_config(tmp_path):
+    assert configured_model_names(str(tmp_path / "missing.json")) == DEFAULT_MODELS
+
+
+def test_keep_alive_is_reflected_in_ps(client):
+    client.generate(model="mock-model", prompt="", keep_alive="10m")
+    assert [m.model for m in client.ps().models] == ["mock-model"]
+    client.generate(model="mock-model", prompt="", keep_alive=0)
+    assert client.ps().models == []
+
+
+def test_failure_injection_spares_health_probes():
+    with MockOllamaServer(failure_rate=1.0, failure_status=503) as srv:
+        with pytest.raises(ollama.ResponseError) as exc_info:
+            ollama.Client(host=srv.url).generate(model="mock-model", prompt="hi")
+        assert exc_info.value.status_code == 503
+        # Health probes are not subject to injected failures.
+        assert ollama.Client(host=srv.url).list().models
+
+
+async def test_shared_langchain_model_talks_to_mock(server, monkeypatch):
+    for name in ('_config_cached', '_settings_cached', '_sync_client', '_async_client', '_async_client_loop'):
+        monkeypatch.setattr(ollama_client, name, None)
+    monkeypatch.setattr(ollama_client, '_langchain_models', {})
+    config = {'ollama_service': {'ollama_host': '127.0.0.1', 'ollama_port': server.port}}
+    model = ollama_client.get_chat_model("mock-model", config, temperature=0)
+    result = await model.ainvoke("list files please")
+    assert result.content == "<bash>ls -la</bash>"
+    assert server.request_counts["/api/chat"] == 1
@@ -0,0 +1,93 @@
+import pytest
+import ollama
+from unittest.mock import AsyncMock, patch
+
+from modules import ollama_client
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_clients():
+    """Each test starts with no cached clients or config."""
+    ollama_client._config_cached = None
+    ollama_client._settings_cached = None
+    ollama_client._sync_client = None
+    ollama_client._async_client = None
+    ollama_client._async_client_loop = None
+    ollama_client._langchain_models.clear()
+    yield
+
+
+@pytest.fixture
+def mock_config():
+    return {
+        'ollama_service': {'ollama_host': 'localhost', 'ollama_port': 12345, 'keep_alive': '15m'},
+        'behavior': {'ollama_api_call_retries': 2, 'ai_retry_delay_seconds': 0.5},
+    }
+
+
+def test_get_ollama_host_from_config(mock_config):
+    assert ollama_client.get_ollama_host(mock_config) == 'http://localhost:12345'
+
+
+def test_get_ollama_host_falls_back_to_env(monkeypatch):
+    monkeypatch.setenv('OLLAMA_HOST', '127.0.0.1:9999')
+    assert ollama_client.get_ollama_host({}) == 'http://127.0.0.1:9999'
+
+
+def test_sync_client_is_shared_and_rebuilt_on_settings_change(mock_config):
+    first = ollama_client.get_sync_client(mock_config)
+    assert ollama_client.get_sync_client() is first
+
+    changed = {'ollama_service': dict(mock_config['ollama_service'], ollama_port=54321)}
+    rebuilt = ollama_client.get_sync_client(changed)
+    assert rebuilt is not first
+    assert str(rebuilt._client.base_url).startswith('http://localhost:54321')
+
+
+async def test_async_client_is_shared_within_a_loop(mock_config):
+    client = ollama_client.get_async_client(mock_config)
+    assert ollama_client.get_async_client() is client
+
+
+async def test_chat_model_is_cached_and_uses_pooled_client_settings(mock_config):
+    mock_config['ollama_service'].update(request_timeout_seconds=42, connect_timeout_seconds=3)
+    model = ollama_client.get_chat_model('test-model', mock_config, temperature=0)
+    assert ollama_client.get_chat_model('test-model', mock_config, temperature=0) is model
+    assert ollama_client.get_chat_model('test-model', mock_config) is not model
+    assert model.keep_alive == '15m'
+    for settings in (model.sync_client_kwargs, model.async_client_kwargs):
+        assert (settings['timeout'].read, settings['timeout'].connect) == (42, 3)
+    assert isinstance(model.async_client_kwargs['transport'], ollama_client.httpx.AsyncHTTPTransport)
+
+
+async def test_call_with_retries_backs_off_exponentially(mock_config):
+    factory = AsyncMock(side_effect=[ConnectionError("refused"), ConnectionError("refused"), "done"])
+    with patch('modules.ollama_client.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        result = await ollama_client.call_with_retries(factory, mock_config)
+    assert result == "done"
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [0.5, 1.0]
+
+
+async def test_call_with_retries_does_not_retry_client_errors(mock_config):
+    factory = AsyncMock(side_effect=ollama.ResponseError("model not found", 404))
+    with patch('modules.ollama_client.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        with pytest.raises(ollama.ResponseError):
+            await ollama_client.call_with_retries(factory, mock_config)
+    assert factory.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+async def test_call_with_retries_gives_up_after_max_retries(mock_config):
+    factory = AsyncMock(side_effect=ConnectionError("refused"))
+    with patch('modules.ollama_client.asyncio.sleep', new_callable=AsyncMock):
+        with pytest.raises(ConnectionError):
+            await ollama_client.call_with_retries(factory, mock_config)
+    assert factory.call_count == 3
+
+
+def test_langchain_models_built_from_threads_are_cached_once(mock_config):
+    from concurrent.futures import ThreadPoolExecutor
+    ollama_client.configure(mock_config)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: ollama_client.get_chat_model('test-model', temperature=0), range(32)))
+    assert all(model is models[0] for model in models)
@@ -0,0 +1,171 @@
+import asyncio
+import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from modules import ollama_manager
+
+
+@pytest.fixture
+def mock_config():
+    """Config with duplicate model names across roles and a short re-warm interval."""
+    return {
+        'ai_models': {
+            'primary_translator': {'model': 'translator-model'},
+            'validator': {'model': 'small-model'},
+            'router': {'model': 'small-model'},
+            'explainer': 'explainer-model',
+        },
+        'ollama_service': {
+            'warmup_models': True,
+            'keep_alive': '10m',
+            'rewarm_interval_seconds': 60,
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def reset_manager_state():
+    """Keeps module-level warm-up and health state from leaking between tests."""
+    ollama_manager.stop_model_warmup()
+    ollama_manager._model_warmup_status.clear()
+    ollama_manager._health_state.update(status=ollama_manager.HEALTH_UNKNOWN, latency_ms=None, error=None, checked_at=0.0)
+    yield
+    ollama_manager.stop_model_warmup()
+    ollama_manager.stop_health_heartbeat()
+    ollama_manager._model_warmup_status.clear()
+
+
+@pytest.fixture
+def mock_client():
+    """Shared async Ollama client stand-in used by ollama_manager."""
+    client = MagicMock()
+    client.list = AsyncMock()
+    client.ps = AsyncMock(return_value=_ps_response({}))
+    client.generate = AsyncMock()
+    with patch('modules.ollama_manager.ollama_client.get_async_client', return_value=client):
+        yield client
+
+
+def _ps_response(models):
+    response = MagicMock()
+    response.models = []
+    for name, expires_at in models.items():
+        model_info = MagicMock()
+        model_info.model = name
+        model_info.expires_at = expires_at
+        response.models.append(model_info)
+    return response
+
+
+def test_get_configured_model_names_deduplicates(mock_config):
+    names = ollama_manager.get_configured_model_names(mock_config)
+    assert names == ['translator-model', 'small-model', 'explainer-model']
+
+
+async def test_warm_up_skips_resident_models(mock_config, mock_client):
+    far_future = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    mock_client.ps.return_value = _ps_response({'small-model:latest': far_future})
+    mock_generate = mock_client.generate
+    results = await ollama_manager.warm_up_configured_models(mock_config)
+
+    assert results == {'translator-model': True, 'small-model': True, 'explainer-model': True}
+    warmed = [c.kwargs['model'] for c in mock_generate.call_args_list]
+    assert warmed == ['translator-model', 'explainer-model']
+    assert all(c.kwargs['keep_alive'] == '10m' for c in mock_generate.call_args_list)
+    assert ollama_manager._model_warmup_status['small-model']['state'] == 'warm'
+
+
+async def test_warm_up_refreshes_models_about_to_expire(mock_config, mock_client):
+    soon = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+    resident = {'translator-model:latest': soon, 'small-model:latest': soon, 'explainer-model:latest': soon}
+    mock_client.ps.return_value = _ps_response(resident)
+    await ollama_manager.warm_up_configured_models(mock_config)
+    assert mock_client.generate.call_count == 3
+
+
+async def test_warm_up_failure_is_recorded(mock_config, mock_client):
+    mock_client.generate.side_effect = Exception("model not found")
+    results = await ollama_manager.warm_up_configured_models(mock_config)
+    assert results['translator-model'] is False
+    assert ollama_manager._model_warmup_status['translator-model']['state'] == 'failed'
+    assert 'model not found' in ollama_manager._model_warmup_status['translator-model']['error']
+
+
+async def test_start_model_warmup_respects_disabled_flag(mock_config):
+    mock_config['ollama_service']['warmup_models'] = False
+    assert ollama_manager.start_model_warmup(mock_config) is False
+    assert ollama_manager._model_warmup_task is None
+
+
+async def test_start_model_warmup_runs_in_background(mock_config, mock_client):
+    assert ollama_manager.start_model_warmup(mock_config) is True
+    first_task = ollama_manager._model_warmup_task
+    assert ollama_manager.start_model_warmup(mock_config) is True
+    assert ollama_manager._model_warmup_task is first_task
+    await asyncio.sleep(0.05)
+    assert mock_client.generate.call_count == 3
+
+
+async def test_get_model_warmup_failures_lists_failed_models(mock_config, mock_client):
+    mock_client.generate.side_effect = Exception("model not found")
+    await ollama_manager.warm_up_configured_models(mock_config)
+    failures = ollama_manager.get_model_warmup_failures()
+    assert set(failures) == {'translator-model', 'small-model', 'explainer-model'}
+    assert 'model not found' in failures['translator-model']
+
+
+# --- Cached health state ---
+
+async def test_is_ollama_server_running_uses_cached_state(mock_client):
+    assert await ollama_manager.is_ollama_server_running() is True
+    assert await ollama_manager.is_ollama_server_running() is True
+    assert mock_client.list.call_count == 1
+    assert ollama_manager.get_ollama_health()['status'] == ollama_manager.HEALTH_UP
+
+
+async def test_is_ollama_server_running_reprobes_after_ttl(mock_client):
+    await ollama_manager.is_ollama_server_running()
+    ollama_manager._health_state['checked_at'] -= 3600
+    await ollama_manager.is_ollama_server_running()
+    await ollama_manager.is_ollama_server_running(force_check=True)
+    assert mock_client.list.call_count == 3
+
+
+async def test_connection_failure_marks_server_down(mock_client):
+    mock_client.list.side_effect = ConnectionError("refused")
+    assert await ollama_manager.is_ollama_server_running() is False
+    health = ollama_manager.get_ollama_health()
+    assert health['status'] == ollama_manager.HEALTH_DOWN
+    assert 'refused' in health['error']
+
+
+async def test_failed_request_marks_state_down_immediately(mock_client):
+    assert await ollama_manager.is_ollama_server_running() is True
+    ollama_manager.mark_ollama_request_failed(ConnectionError("connection reset"))
+    assert await ollama_manager.is_ollama_server_running() is False
+    assert mock_client.list.call_count == 1
+
+
+def test_server_side_errors_do_not_mark_state_down():
+    ollama_manager._health_state.update(status=ollama_manager.HEALTH_UP)
+    ollama_manager.mark_ollama_request_failed(ollama_manager.ollama.ResponseError("model not found"))
+    ollama_manager.mark_ollama_request_failed(ValueError("bad output parse"))
+    assert ollama_manager.get_ollama_health()['status'] == ollama_manager.HEALTH_UP
+
+
+async def test_slow_probe_reports_degraded(monkeypatch, mock_client):
+    monkeypatch.setattr(ollama_manager, '_config_cached', {'ollama_service': {'health_degraded_latency_ms': -1}})
+    health = await ollama_manager.check_ollama_health()
+    assert health['status'] == ollama_manager.HEALTH_DEGRADED
+    assert await ollama_manager.is_ollama_server_running() is True
+
+
+async def test_hung_probe_times_out_as_down(monkeypatch, mock_client):
+    monkeypatch.setattr(ollama_manager, '_config_cached', {'ollama_service': {'health_probe_timeout_seconds': 0.01}})
+
+    async def never_answers():
+        await asyncio.sleep(10)
+    mock_client.list.side_effect = never_answers
+    health = await ollama_manager.check_ollama_health()
+    assert health['status'] == ollama_manager.HEALTH_DOWN
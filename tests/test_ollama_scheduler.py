@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+
+from modules.ollama_scheduler import (
+    OllamaRequestScheduler, OllamaRequestCancelled,
+    PRIORITY_INTERACTIVE, PRIORITY_EXPLAIN, PRIORITY_BACKGROUND
+)
+
+
+@pytest.fixture
+def scheduler():
+    return OllamaRequestScheduler(default_concurrency=1)
+
+
+def _recording_call(order, name, gate=None):
+    async def call():
+        order.append(name)
+        if gate:
+            await gate.wait()
+        return name
+    return call
+
+
+async def test_run_returns_result(scheduler):
+    result = await scheduler.run("model-a", _recording_call([], "ok"))
+    assert result == "ok"
+    assert scheduler.get_stats()["wait"]["interactive"]["count"] == 1
+
+
+async def test_queued_requests_are_served_by_priority(scheduler):
+    order = []
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(scheduler.run("model-a", _recording_call(order, "blocker", gate)))
+    await asyncio.sleep(0)
+
+    background = asyncio.create_task(scheduler.run("model-a", _recording_call(order, "background"), PRIORITY_BACKGROUND))
+    explain = asyncio.create_task(scheduler.run("model-a", _recording_call(order, "explain"), PRIORITY_EXPLAIN))
+    interactive = asyncio.create_task(scheduler.run("model-a", _recording_call(order, "interactive"), PRIORITY_INTERACTIVE))
+    await asyncio.sleep(0)
+    assert scheduler.get_stats()["queued"] == {"interactive": 1, "explain": 1, "background": 1}
+
+    gate.set()
+    await asyncio.gather(blocker, background, explain, interactive)
+    assert order == ["blocker", "interactive", "explain", "background"]
+
+
+async def test_concurrency_is_limited_per_model():
+    scheduler = OllamaRequestScheduler(default_concurrency=1, model_limits={"model-b": 2})
+    running = {"model-a": 0, "model-b": 0}
+    peak = {"model-a": 0, "model-b": 0}
+
+    def make_call(model):
+        async def call():
+            running[model] += 1
+            peak[model] = max(peak[model], running[model])
+            await asyncio.sleep(0.01)
+            running[model] -= 1
+        return call
+
+    await asyncio.gather(*(scheduler.run(m, make_call(m)) for m in ["model-a", "model-b"] * 4))
+    assert peak == {"model-a": 1, "model-b": 2}
+    assert scheduler.get_stats()["active"] == {}
+
+
+async def test_cancel_group_cancels_queued_and_running_requests(scheduler):
+    gate = asyncio.Event()
+    running = asyncio.create_task(scheduler.run("model-a", _recording_call([], "running", gate), group="explain"))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(scheduler.run("model-a", _recording_call([], "queued"), PRIORITY_EXPLAIN, group="explain"))
+    other = asyncio.create_task(scheduler.run("model-a", _recording_call([], "other")))
+    await asyncio.sleep(0)
+
+    assert scheduler.cancel_group("explain") == 2
+
+    with pytest.raises(OllamaRequestCancelled):
+        await running
+    with pytest.raises(OllamaRequestCancelled):
+        await queued
+    # The freed slot goes to the remaining request.
+    assert await other == "other"
+    assert scheduler.get_stats()["wait"]["explain"]["cancelled"] == 1
+
+
+async def test_cancelling_the_caller_propagates(scheduler):
+    gate = asyncio.Event()
+    caller = asyncio.create_task(scheduler.run("model-a", _recording_call([], "slow", gate)))
+    await asyncio.sleep(0)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    # The slot must have been released.
+    assert await scheduler.run("model-a", _recording_call([], "next")) == "next"
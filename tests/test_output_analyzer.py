@@ -0,0 +1,181 @@
+# tests/test_output_analyzer.py
+
+import pytest
+
+from modules.output_analyzer import (
+    DECISIVE_SEQUENCE_KINDS, ESCAPE_SEQUENCE_PATTERN, SEQ_ALT_SCREEN, SEQ_CSI, SEQ_CURSOR_POSITION, SEQ_ESC,
+    SEQ_OSC, SEQ_PRIVATE_MODE, SEQ_SGR, TUIOutputDetector, is_tui_like_output, iter_escape_sequences,
+)
+
+PLAIN_LINES = "".join(f"line {i}: nothing special here\n" for i in range(50))
+
+
+def _full_text_is_tui(text, line_threshold_pct=30.0, char_threshold_pct=3.0):
+    """The whole-capture analysis, kept as the reference for the streaming detector."""
+    lines = text.splitlines()
+    if not lines:
+        return False
+    if any(kind in DECISIVE_SEQUENCE_KINDS for kind, _ in iter_escape_sequences(text)):
+        return True
+    ansi_lines = sum(1 for line in lines if ESCAPE_SEQUENCE_PATTERN.search(line))
+    ansi_chars = sum(len(seq) for _, seq in iter_escape_sequences(text))
+    return (ansi_lines / len(lines) * 100 >= line_threshold_pct
+            or ansi_chars / len(text) * 100 >= char_threshold_pct)
+
+
+SAMPLES = [
+    "",
+    "hello\nworld\n",
+    PLAIN_LINES,
+    "\x1B[31mError:\x1B[0m something failed\n" + PLAIN_LINES,
+    "\x1B[H\x1B[2Jhtop output with ansi codes",
+    "\x1B[1m\x1B[31m\x1B[4m",
+    "a\r\nb\rc\x0bd\n\n\x1B[K",
+    "trailing partial \x1B[12",
+    "\x1B]0;my title\x07" + PLAIN_LINES,
+    "progress \x1B[?25l50%\x1B[1D\x1B[?25h\n" + PLAIN_LINES,
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_is_tui_like_output_matches_full_text_analysis(text):
+    assert is_tui_like_output(text) is _full_text_is_tui(text)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+@pytest.mark.parametrize("chunk_size", [1, 3, 7])
+def test_detector_finish_matches_full_text_analysis_when_undecided(text, chunk_size):
+    detector = TUIOutputDetector()
+    decided_early = False
+    for start in range(0, len(text), chunk_size):
+        decided_early = detector.feed(text[start:start + chunk_size])
+        if decided_early:
+            break
+    if not decided_early:
+        assert detector.finish() is _full_text_is_tui(text)
+
+
+def test_detector_counts_escape_split_across_chunks():
+    detector = TUIOutputDetector(line_threshold_pct=101.0, char_threshold_pct=101.0)
+    detector.feed("abc\x1B")
+    detector.feed("[3")
+    detector.feed("1mdef\n")
+    assert detector.ansi_chars == len("\x1B[31m")
+    assert (detector.lines, detector.ansi_lines) == (1, 1)
+
+
+def test_detector_counts_crlf_split_across_chunks_as_one_line_break():
+    detector = TUIOutputDetector()
+    detector.feed("one\r")
+    detector.feed("\ntwo\n")
+    detector.finish()
+    assert detector.lines == len("one\r\ntwo\n".splitlines())
+    assert detector.total_chars == len("one\r\ntwo\n")
+
+
+def test_detector_decodes_bytes_split_inside_a_character():
+    detector = TUIOutputDetector()
+    data = "héllo \x1B[1mwörld\x1B[0m\n".encode("utf-8")
+    detector.feed(data[:2])
+    detector.feed(data[2:])
+    assert detector.finish() is is_tui_like_output(data.decode("utf-8"))
+    assert detector.total_chars == len(data.decode("utf-8"))
+
+
+def test_detector_decides_early_and_stops_scanning():
+    detector = TUIOutputDetector()
+    assert detector.feed("\x1B[H\x1B[2J\x1B[7m top \x1B[0m\n") is True
+    chars_at_decision = detector.total_chars
+    assert detector.feed(PLAIN_LINES) is True
+    assert detector.total_chars == chars_at_decision
+    assert detector.finish() is True
+
+
+def test_detector_stays_undecided_for_plain_output():
+    detector = TUIOutputDetector()
+    for line in PLAIN_LINES.splitlines(keepends=True):
+        assert detector.feed(line) is False
+    assert detector.finish() is False
+
+
+def test_colored_line_in_a_small_batch_does_not_decide():
+    detector = TUIOutputDetector()
+    assert detector.feed("\x1B[32mok\x1B[0m build finished\n") is False
+    assert detector.feed("plain line\n" * 3) is False
+    assert detector.is_tui is False # The whole capture is still judged by finish()
+
+
+def test_percentages_decide_once_the_sample_is_large_enough():
+    detector = TUIOutputDetector(min_sample_lines=20, min_sample_chars=100)
+    colored = "\x1B[1mprogress\x1B[0m 10%\n"
+    for _ in range(19):
+        assert detector.feed(colored) is False
+    assert detector.feed(colored) is True
+    assert detector.decided_by is None
+
+
+def test_colored_batch_after_plain_output_does_not_decide():
+    detector = TUIOutputDetector()
+    assert detector.feed(PLAIN_LINES * 20) is False
+    assert detector.feed("\x1B[31mERROR\x1B[0m one failure\n") is False
+
+
+def test_detector_catches_ui_started_after_plain_output():
+    detector = TUIOutputDetector()
+    assert detector.feed(PLAIN_LINES * 20) is False
+    assert detector.feed("\x1B[?25l\x1B[H\x1B[2J\x1B[1;1Hmenu\x1B[2;1Hitem\n") is True
+
+
+@pytest.mark.parametrize("sequence, kind", [
+    ("\x1B[?1049h", SEQ_ALT_SCREEN),
+    ("\x1B[?47l", SEQ_ALT_SCREEN),
+    ("\x1B[?25l", SEQ_PRIVATE_MODE),
+    ("\x1B[H", SEQ_CURSOR_POSITION),
+    ("\x1B[12;40f", SEQ_CURSOR_POSITION),
+    ("\x1B[1;31m", SEQ_SGR),
+    ("\x1B[2K", SEQ_CSI),
+    ("\x1B[3A", SEQ_CSI),
+    ("\x1B]0;title\x07", SEQ_OSC),
+    ("\x1B]8;;https://example.com\x1B\\", SEQ_OSC),
+    ("\x1B7", SEQ_ESC),
+    ("\x1B(B", SEQ_ESC),
+])
+def test_iter_escape_sequences_classifies_by_kind(sequence, kind):
+    assert list(iter_escape_sequences(f"before {sequence} after")) == [(kind, sequence)]
+
+
+def test_alternate_screen_decides_on_first_bytes():
+    detector = TUIOutputDetector()
+    assert detector.feed(b"\x1B[?1049h") is True
+    assert detector.decided_by == SEQ_ALT_SCREEN
+
+
+def test_decisive_sequence_split_across_chunks():
+    detector = TUIOutputDetector()
+    assert detector.feed(PLAIN_LINES + "\x1B[?10") is False
+    assert detector.feed("49h") is True
+    assert detector.decided_by == SEQ_ALT_SCREEN
+
+
+def test_cursor_addressing_short_circuits_low_density_output():
+    text = "\x1B[5;1H" + PLAIN_LINES * 10
+    assert is_tui_like_output(text) is True
+    detector = TUIOutputDetector()
+    detector.feed(text)
+    assert detector.decided_by == SEQ_CURSOR_POSITION
+
+
+def test_colored_log_output_is_not_decisive():
+    detector = TUIOutputDetector()
+    detector.feed("\x1B[32mok\x1B[0m step 1\n" + PLAIN_LINES * 2)
+    assert detector.finish() is False
+    assert detector.decided_by is None
+    assert detector.sequence_counts == {SEQ_SGR: 2}
+
+
+def test_osc_split_across_chunks_is_counted_once():
+    detector = TUIOutputDetector(line_threshold_pct=101.0, char_threshold_pct=101.0)
+    detector.feed("\x1B]0;my ti")
+    detector.feed("tle\x07prompt\n")
+    assert detector.sequence_counts == {SEQ_OSC: 1}
+    assert detector.ansi_chars == len("\x1B]0;my title\x07")
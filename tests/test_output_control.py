@@ -0,0 +1,134 @@
+# tests/test_output_control.py
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from prompt_toolkit.document import Document
+from prompt_toolkit.layout.mouse_handlers import MouseHandlers
+from prompt_toolkit.layout.screen import Screen, WritePosition
+
+from modules.output_control import OutputArea, OutputControl, OutputTextStore, RenderScheduler
+
+
+def _render(area: OutputArea, width: int = 40, height: int = 5) -> Screen:
+    screen = Screen()
+    area.window.write_to_screen(screen, MouseHandlers(), WritePosition(0, 0, width, height),
+                                parent_style="", erase_bg=False, z_index=None)
+    return screen
+
+
+def _screen_row(screen: Screen, row: int, width: int = 39) -> str:
+    return "".join(screen.data_buffer[row][x].char for x in range(width)).rstrip()
+
+
+class TestOutputTextStore:
+    @pytest.mark.parametrize("chunks", [
+        ["one\n", "two\n", "three\n"],
+        ["partial", " line\nnext", "\n\n"],
+        ["", "\n", "no newline"],
+    ])
+    def test_lines_match_document_semantics(self, chunks):
+        store = OutputTextStore()
+        for chunk in chunks:
+            store.append(chunk)
+        document = Document("".join(chunks))
+        assert store.text == document.text
+        assert store.line_count == document.line_count
+        assert [store.get_line(i) for i in range(store.line_count)] == document.lines
+
+    def test_drop_lines_removes_from_front_and_compacts(self):
+        store = OutputTextStore("".join(f"line {i}\n" for i in range(100)))
+        store.drop_lines(60)
+        assert store.line_count == 41
+        assert store.get_line(0) == "line 60"
+        assert len(store._lines) == 41 # Compacted once more than half was dead
+        store.drop_lines(1000)
+        assert store.line_count == 1 and store.text == ""
+
+    def test_get_line_out_of_range_is_empty(self):
+        store = OutputTextStore("a\nb")
+        assert store.get_line(-1) == "" and store.get_line(5) == ""
+
+    def test_text_is_cached_until_changed(self):
+        store = OutputTextStore("a\n")
+        assert store.text is store.text
+        store.append("b\n")
+        assert store.text == "a\nb\n"
+
+
+class TestOutputControl:
+    def test_cursor_moves_fire_event_only_on_change(self):
+        control = OutputControl(OutputTextStore("a\nb\nc"))
+        handler = MagicMock()
+        control.on_cursor_position_changed += handler
+        assert control.cursor_row == 2
+        control.move_cursor_down()
+        handler.assert_not_called()
+        control.move_cursor_up()
+        assert control.cursor_row == 1
+        handler.assert_called_once_with(control)
+
+    def test_content_fetches_only_requested_lines(self):
+        store = OutputTextStore("".join(f"line {i}\n" for i in range(10000)))
+        store.get_line = MagicMock(side_effect=store.get_line)
+        content = OutputControl(store).create_content(width=40, height=5)
+        assert content.line_count == 10001
+        assert content.cursor_position.y == 10000
+        assert content.get_line(42) == [("", "line 42"), ("", " ")]
+        assert store.get_line.call_count == 1
+
+
+class TestOutputArea:
+    def test_window_follows_the_end_of_the_output(self):
+        area = OutputArea("".join(f"line {i}\n" for i in range(50)))
+        screen = _render(area)
+        assert _screen_row(screen, 3) == "line 49"
+        assert _screen_row(screen, 4) == ""
+
+    def test_window_stays_put_when_cursor_was_moved_up(self):
+        area = OutputArea("".join(f"line {i}\n" for i in range(50)))
+        _render(area)
+        area.control.set_cursor_row(10)
+        area.store.append("line 50\n")
+        screen = _render(area)
+        assert any(_screen_row(screen, row) == "line 10" for row in range(5))
+        assert not any(_screen_row(screen, row) == "line 50" for row in range(5))
+
+
+class TestRenderScheduler:
+    def test_without_event_loop_requests_redraw_immediately(self):
+        invalidate = MagicMock()
+        scheduler = RenderScheduler(invalidate, max_frame_rate=10)
+        scheduler.request()
+        scheduler.request()
+        assert invalidate.call_count == 2
+
+    async def test_requests_within_a_frame_are_coalesced(self):
+        invalidate = MagicMock()
+        scheduler = RenderScheduler(invalidate, max_frame_rate=20)
+        for _ in range(100):
+            scheduler.request()
+        assert invalidate.call_count == 1 # The first request draws at once
+        assert scheduler.pending
+        await asyncio.sleep(0.1)
+        assert invalidate.call_count == 2 # One more redraw for the other 99
+        assert not scheduler.pending
+
+    async def test_flush_redraws_now_and_drops_the_scheduled_redraw(self):
+        invalidate = MagicMock()
+        scheduler = RenderScheduler(invalidate, max_frame_rate=20)
+        scheduler.request()
+        scheduler.request()
+        scheduler.flush()
+        assert invalidate.call_count == 2
+        assert not scheduler.pending
+        await asyncio.sleep(0.1)
+        assert invalidate.call_count == 2
+
+    async def test_zero_frame_rate_disables_the_limit(self):
+        invalidate = MagicMock()
+        scheduler = RenderScheduler(invalidate, max_frame_rate=0)
+        for _ in range(5):
+            scheduler.request()
+        assert invalidate.call_count == 5
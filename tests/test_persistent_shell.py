@@ -0,0 +1,103 @@
+import asyncio
+import shutil
+
+import pytest
+
+from modules.persistent_shell import PersistentShell
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="bash is required")
+
+
+@pytest.fixture
+async def shell(tmp_path):
+    persistent_shell = PersistentShell(cwd=str(tmp_path))
+    yield persistent_shell
+    await persistent_shell.close()
+
+
+async def run(shell, command, cwd=None):
+    handle = await shell.run(command, cwd=cwd)
+    stdout, stderr = await asyncio.gather(handle.stdout.read(), handle.stderr.read())
+    returncode = await handle.wait()
+    return returncode, stdout.decode(), stderr.decode(), handle.cwd
+
+
+async def test_state_persists_between_commands(shell, tmp_path):
+    await run(shell, "export GREETING=hello; shout() { echo \"$1!\"; }; set -o pipefail")
+    returncode, stdout, stderr, _ = await run(shell, "echo $GREETING; shout hey; false | true")
+    assert stdout == "hello\nhey!\n"
+    assert stderr == ""
+    assert returncode == 1 # pipefail was kept
+
+
+async def test_output_without_trailing_newline_and_stderr(shell):
+    returncode, stdout, stderr, _ = await run(shell, "printf partial; echo oops >&2; exit_code() { return 3; }; exit_code")
+    assert stdout == "partial"
+    assert stderr == "oops\n"
+    assert returncode == 3
+
+
+async def test_cwd_is_synced_both_ways(shell, tmp_path):
+    subdir = tmp_path / "sub"
+    subdir.mkdir()
+    _, stdout, _, cwd = await run(shell, "pwd", cwd=str(subdir))
+    assert stdout.strip() == str(subdir)
+    _, _, _, cwd = await run(shell, "cd ..", cwd=str(subdir))
+    assert cwd == str(tmp_path)
+
+
+async def test_commands_do_not_read_the_control_stream(shell):
+    returncode, stdout, _, _ = await run(shell, "cat; echo after")
+    assert (returncode, stdout) == (0, "after\n")
+
+
+async def test_shell_restarts_after_exit(shell):
+    await run(shell, "export KEPT=1")
+    returncode, _, _, _ = await run(shell, "exit 7")
+    assert returncode == 7
+    assert not shell.is_running
+    returncode, stdout, _, _ = await run(shell, "echo \"restarted:${KEPT:-unset}\"")
+    assert (returncode, stdout) == (0, "restarted:unset\n")
+
+
+async def test_terminate_stops_the_command_but_keeps_the_shell(shell):
+    await run(shell, "export KEPT=1")
+    handle = await shell.run("sleep 30")
+    await asyncio.sleep(0.2)
+    handle.terminate()
+    returncode = await asyncio.wait_for(handle.wait(), timeout=5)
+    assert returncode != 0
+    _, stdout, _, _ = await run(shell, "echo $KEPT")
+    assert stdout == "1\n"
+
+
+async def test_output_after_the_marker_is_kept_for_the_next_command():
+    shell = PersistentShell()
+    source = asyncio.StreamReader()
+    source.feed_data(f"out\n\n{shell._token} 0 0 /tmp\nlate from a background job\n".encode())
+    first, second = asyncio.StreamReader(), asyncio.StreamReader()
+    assert await shell._forward(source, first, "stdout") == (0, False, "/tmp")
+    assert await first.read() == b"out\n"
+    source.feed_data(f"next\n{shell._token} 0 0 /tmp\n".encode())
+    await shell._forward(source, second, "stdout")
+    assert await second.read() == b"late from a background job\nnext"
+
+
+async def test_exec_redirect_in_a_command_does_not_hang_the_shell(shell, tmp_path):
+    log = tmp_path / "out.log"
+    returncode, _, _, _ = await asyncio.wait_for(run(shell, f"exec >{log} 2>&1; echo captured"), timeout=5)
+    assert returncode == 0
+    assert log.read_text() == "captured\n"
+    _, stdout, stderr, _ = await asyncio.wait_for(run(shell, "echo back; echo err >&2"), timeout=5)
+    assert (stdout, stderr) == ("back\n", "err\n")
+
+
+async def test_terminate_leaves_earlier_background_jobs_alone(shell, tmp_path):
+    marker = tmp_path / "alive"
+    await run(shell, f"(sleep 1; touch {marker}) >/dev/null 2>&1 &")
+    handle = await shell.run("sleep 30")
+    await asyncio.sleep(0.2)
+    handle.terminate()
+    assert await asyncio.wait_for(handle.wait(), timeout=5) != 0
+    await asyncio.sleep(1.2)
+    assert marker.exists()
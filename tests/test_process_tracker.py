@@ -0,0 +1,100 @@
+import asyncio
+import sys
+
+import pytest
+
+from modules.process_tracker import (TrackedProcess, JobManager, pump_text_stream, format_resource_usage,
+                                     JOB_DONE, JOB_FAILED, JOB_KILLED, JOB_RUNNING)
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX process handling")
+
+
+async def test_pump_text_stream_batches_complete_lines():
+    reader = asyncio.StreamReader()
+    for chunk in (b"one\ntw", b"o\nthr", b"ee"):
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    batches = []
+    await pump_text_stream(reader, batches.append, 0, chunk_size=6)
+    assert "".join(batches) == "one\ntwo\nthree"
+    assert all(batch.endswith("\n") for batch in batches[:-1])
+
+
+async def test_pump_text_stream_reads_without_waiting_for_flush_interval():
+    reader = asyncio.StreamReader()
+    line = b"x" * 99 + b"\n"
+    for _ in range(1000):
+        reader.feed_data(line * 100) # 10 MB in 100 KB chunks
+    reader.feed_eof()
+    batches = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await pump_text_stream(reader, batches.append, 5.0, max_pending_chars=1_000_000)
+    assert loop.time() - started < 2.0 # Well below one flush interval
+    assert len("".join(batches)) == 10_000_000
+    # The first read at once, then a batch whenever the queue reaches its cap.
+    assert 10 <= len(batches) <= 12
+    assert max(len(batch) for batch in batches) < 1_000_000 + 65536
+
+
+async def test_pump_text_stream_delivers_queued_text_at_the_end_of_the_interval():
+    reader = asyncio.StreamReader()
+    batches = []
+    pump = asyncio.create_task(pump_text_stream(reader, batches.append, 0.05))
+    reader.feed_data(b"first\n")
+    await asyncio.sleep(0.01)
+    reader.feed_data(b"second\n")
+    reader.feed_data(b"third\n")
+    await asyncio.sleep(0.01)
+    assert batches == ["first\n"] # The rest waits for the end of the interval...
+    await asyncio.sleep(0.1)
+    assert batches == ["first\n", "second\nthird\n"] # ...even though the stream is still open
+    reader.feed_eof()
+    await pump
+
+
+async def test_tracked_process_collects_exit_code_and_resource_usage(tmp_path):
+    process = await TrackedProcess.start_shell("pwd; echo err >&2; exit 3", cwd=str(tmp_path))
+    stdout, stderr = await asyncio.gather(process.stdout.read(), process.stderr.read())
+    assert await process.wait() == 3
+    assert (stdout, stderr) == (f"{tmp_path}\n".encode(), b"err\n")
+    usage = process.resource_usage()
+    assert {"wall_seconds", "cpu_user_seconds", "cpu_system_seconds", "max_rss_kb"} <= usage.keys()
+    assert usage["wall_seconds"] >= 0
+    assert "wall" in format_resource_usage(usage)
+
+
+async def test_tracked_process_terminate_reaches_the_process_group():
+    process = await TrackedProcess.start_shell("sleep 30 & wait", new_session=True)
+    await asyncio.sleep(0.1)
+    process.terminate()
+    assert await asyncio.wait_for(process.wait(), timeout=5) < 0
+    # The grandchild got the signal too, so the pipes reach EOF promptly.
+    await asyncio.wait_for(process.stdout.read(), timeout=5)
+
+
+async def test_job_manager_buffers_output_and_reports_completion():
+    finished = []
+    manager = JobManager(on_job_finished=finished.append, max_output_lines=2)
+    job = await manager.start("echo a; echo b; echo c >&2; exit 1", display_command="three lines")
+    assert job.state == JOB_RUNNING
+    await job.wait()
+
+    assert finished == [job]
+    assert job.state == JOB_FAILED
+    assert len(job.output) == 2 and job.dropped_lines == 1
+    assert ("c", True) in job.output
+    assert manager.latest() is job
+
+
+async def test_job_manager_kill_and_listing():
+    manager = JobManager()
+    quick = await manager.start("true")
+    slow = await manager.start("sleep 30")
+    await quick.wait()
+
+    assert await manager.kill(slow.job_id) is True
+    assert slow.state == JOB_KILLED
+    assert quick.state == JOB_DONE
+    assert await manager.kill(slow.job_id) is False
+    assert [job.job_id for job in manager.list_jobs()] == [quick.job_id, slow.job_id]
@@ -0,0 +1,28 @@
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from modules.router_agent import run_router_agent
+
+
+async def test_stdout_is_only_redirected_while_the_agent_runs():
+    original_stdout = sys.stdout
+    stdout_seen = {}
+
+    async def agent_ainvoke(inputs):
+        stdout_seen["agent"] = sys.stdout
+        print("> Entering new AgentExecutor chain...")
+        return {"intermediate_steps": [(MagicMock(), "/help")]}
+
+    async def scheduler_run(model, coro_factory, priority, group):
+        stdout_seen["queued"] = sys.stdout # Still waiting for a slot
+        return await coro_factory()
+
+    agent_executor = MagicMock(metadata={"model": "router-model"})
+    agent_executor.ainvoke = agent_ainvoke
+    scheduler = MagicMock()
+    scheduler.run = AsyncMock(side_effect=scheduler_run)
+    with patch('modules.router_agent.ollama_scheduler.get_scheduler', return_value=scheduler):
+        assert await run_router_agent(agent_executor, "show help") == "/help"
+    assert stdout_seen["queued"] is original_stdout
+    assert stdout_seen["agent"] is not original_stdout
+    assert sys.stdout is original_stdout
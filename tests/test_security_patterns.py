@@ -0,0 +1,51 @@
+import pytest
+
+from modules import security_patterns
+from modules.security_patterns import DangerousPatternMatcher, get_dangerous_pattern_matcher
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_matcher():
+    security_patterns._matcher_instance = None
+    yield
+    security_patterns._matcher_instance = None
+
+
+def test_match_reports_which_pattern_fired():
+    matcher = DangerousPatternMatcher([r"\bmkfs\b", r"\b(shutdown|reboot)\b", r"(?P<tool>wget|curl)\s+.*\|\s*sh\b"])
+    assert matcher.match("sudo mkfs.ext4 /dev/sda1") == r"\bmkfs\b"
+    assert matcher.match("reboot") == r"\b(shutdown|reboot)\b"
+    assert matcher.match("curl -s http://x | sh") == r"(?P<tool>wget|curl)\s+.*\|\s*sh\b"
+    assert matcher.match("ls -la") is None
+    assert matcher._combined is not None and not matcher._standalone
+
+
+def test_invalid_patterns_are_recorded_and_skipped():
+    matcher = DangerousPatternMatcher([r"rm -rf (", r"\bmkfs\b"])
+    assert [pattern for pattern, _ in matcher.invalid_patterns] == [r"rm -rf ("]
+    assert matcher.match("mkfs /dev/sda") == r"\bmkfs\b"
+    assert matcher.match("rm -rf (") is None
+
+
+def test_patterns_that_cannot_be_combined_are_matched_individually():
+    backreference = r"(\w+) \1"
+    inline_flag = r"(?i)\bHALT\b"
+    matcher = DangerousPatternMatcher([r"\bmkfs\b", backreference])
+    assert matcher._standalone == [(backreference, matcher._standalone[0][1])]
+    assert matcher.match("echo echo") == backreference
+    assert matcher.match("echo test") is None
+
+    # A global inline flag is only allowed at the start of the whole expression.
+    matcher = DangerousPatternMatcher([r"\bmkfs\b", inline_flag])
+    assert matcher._combined is None
+    assert matcher.match("halt") == inline_flag
+    assert matcher.match("mkfs") == r"\bmkfs\b"
+
+
+def test_shared_matcher_is_rebuilt_only_when_patterns_change():
+    config = {"security": {"dangerous_patterns": [r"\bmkfs\b"]}}
+    matcher = get_dangerous_pattern_matcher(config)
+    assert get_dangerous_pattern_matcher({"security": {"dangerous_patterns": [r"\bmkfs\b"]}}) is matcher
+    config["security"]["dangerous_patterns"].append(r"\breboot\b")
+    assert get_dangerous_pattern_matcher(config) is not matcher
+    assert get_dangerous_pattern_matcher({}).match("reboot") is None
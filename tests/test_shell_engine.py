@@ -1,16 +1,21 @@
 # tests/test_shell_engine.py
 import pytest
 import os
+import shlex
 import uuid
+import json
 import asyncio
+import threading
+import time
 from unittest.mock import MagicMock, patch, AsyncMock, call
 import re
 from unittest.mock import mock_open
 
 # Assuming shell_engine.py is in a 'modules' subdirectory
-from modules.shell_engine import ShellEngine
+from modules.shell_engine import ShellEngine, _TmuxOutputCapture, _build_alias_trie, _find_longest_alias
 # Import for is_tui_like_output, as it's now used in ShellEngine
 from modules.output_analyzer import is_tui_like_output
+from modules.ollama_scheduler import OllamaRequestCancelled
 
 @pytest.fixture
 def mock_config_for_engine():
@@ -44,7 +49,8 @@ def mock_config_for_engine():
         "ui": {},
         "paths": {"tmux_log_base_path": "/tmp"},
         "prompts": {},
-        "ollama_service": {}
+        "ollama_service": {},
+        "command_ledger": {"enabled": False}
     }
 
 @pytest.fixture
@@ -167,6 +173,16 @@ def test_sanitize_and_validate(shell_engine, command, expected_output):
                         kwargs.get('style_class') == 'security-critical')
 
 
+def test_sanitize_and_validate_reports_invalid_patterns_once(shell_engine):
+    shell_engine.config["security"]["dangerous_patterns"] = ["rm -rf (", "\\bmkfs\\b"]
+
+    assert shell_engine.sanitize_and_validate("ls", "ls") == "ls"
+    assert shell_engine.sanitize_and_validate("mkfs /dev/sda", "mkfs /dev/sda") is None
+    assert shell_engine.sanitize_and_validate("pwd", "pwd") == "pwd"
+
+    warnings = [c for c in shell_engine.ui_manager.append_output.call_args_list if c.kwargs.get('style_class') == 'warning']
+    assert warnings == [call("⚠️ Invalid security regex pattern in config: 'rm -rf ('.", style_class='warning')]
+
 # --- Tests for handle_cd_command ---
 
 @pytest.mark.asyncio
@@ -221,26 +237,37 @@ async def test_handle_cd_command_home_dir(shell_engine):
 
 # --- Tests for execute_shell_command ---
 
+def _make_streaming_process(stdout_chunks, stderr_chunks=(), returncode=0):
+    """Builds a mock process whose stdout/stderr are real StreamReaders fed with the given chunks."""
+    process = AsyncMock()
+    process.pid = 1234
+    process.stdout = asyncio.StreamReader()
+    process.stderr = asyncio.StreamReader()
+    for chunk in stdout_chunks:
+        process.stdout.feed_data(chunk)
+    process.stdout.feed_eof()
+    for chunk in stderr_chunks:
+        process.stderr.feed_data(chunk)
+    process.stderr.feed_eof()
+    process.wait.return_value = returncode
+    process.returncode = returncode
+    process.resource_usage = MagicMock(return_value={"wall_seconds": 0.01, "cpu_user_seconds": 0.0,
+                                                      "cpu_system_seconds": 0.0, "max_rss_kb": None})
+    return process
+
 @pytest.mark.asyncio
 async def test_execute_shell_command_direct_simple_success(shell_engine):
     """
     Tests the corrected behavior for a direct, simple command execution.
     It should now print the command prompt line first, then the output.
     """
-    mock_process = AsyncMock()
-    mock_process.communicate.return_value = (b"Hello from stdout\n", b"")
-    mock_process.returncode = 0
+    mock_process = _make_streaming_process([b"Hello from stdout\n"])
 
-    with patch('asyncio.create_subprocess_shell', return_value=mock_process) as mock_sub_shell:
+    with patch('modules.shell_engine.TrackedProcess.start_shell', return_value=mock_process) as mock_sub_shell:
         # When command_to_execute == original_user_input_display, it's a direct command
         await shell_engine.execute_shell_command("echo hello", "echo hello")
         
-        mock_sub_shell.assert_called_once_with(
-            "echo hello",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=shell_engine.current_directory
-        )
+        mock_sub_shell.assert_called_once_with("echo hello", cwd=shell_engine.current_directory)
         
         # Verify the two separate calls to append_output
         expected_calls = [
@@ -256,11 +283,9 @@ async def test_execute_shell_command_verbose_success(shell_engine):
     Tests the behavior for a verbose command (e.g., from an alias or AI).
     It should print a single, descriptive output block.
     """
-    mock_process = AsyncMock()
-    mock_process.communicate.return_value = (b"Verbose output\n", b"")
-    mock_process.returncode = 0
+    mock_process = _make_streaming_process([b"Verbose output\n"])
 
-    with patch('asyncio.create_subprocess_shell', return_value=mock_process):
+    with patch('modules.shell_engine.TrackedProcess.start_shell', return_value=mock_process):
         # When original input is different, it triggers the verbose prefix
         await shell_engine.execute_shell_command("ls -l", "/translate list files")
 
@@ -272,11 +297,9 @@ async def test_execute_shell_command_verbose_success(shell_engine):
 
 @pytest.mark.asyncio
 async def test_execute_shell_command_failure_with_stderr(shell_engine):
-    mock_process = AsyncMock()
-    mock_process.communicate.return_value = (b"", b"Error: command not found\n")
-    mock_process.returncode = 127
+    mock_process = _make_streaming_process([], [b"Error: command not found\n"], returncode=127)
 
-    with patch('asyncio.create_subprocess_shell', return_value=mock_process):
+    with patch('modules.shell_engine.TrackedProcess.start_shell', return_value=mock_process):
         await shell_engine.execute_shell_command("nonexistent_cmd", "nonexistent_cmd")
         
         # The prompt line is still printed first for a direct command
@@ -290,6 +313,56 @@ async def test_execute_shell_command_failure_with_stderr(shell_engine):
         # Check that the specific "exited with code" message is NOT present when stderr exists
         assert not any("exited with code" in call.args[0] for call in shell_engine.ui_manager.append_output.call_args_list if 'warning' in call.kwargs.get('style_class', ''))
 
+@pytest.mark.asyncio
+async def test_execute_shell_command_holds_partial_lines_until_complete(shell_engine):
+    """A line split across reads (including a split UTF-8 sequence) is shown whole."""
+    shell_engine.config['behavior'] = {'output_flush_interval_ms': 0}
+    mock_process = _make_streaming_process([b"caf\xc3", b"\xa9 one\nsecond ", b"line"])
+
+    with patch('modules.shell_engine.TrackedProcess.start_shell', return_value=mock_process):
+        await shell_engine.execute_shell_command("cat menu", "cat menu")
+
+    shown = [c.args[0] for c in shell_engine.ui_manager.append_output.call_args_list[1:]]
+    assert "".join(shown) == "café one" + "second line"
+    assert shown[0] == "café one"
+
+
+@pytest.mark.asyncio
+async def test_execute_shell_command_spills_output_beyond_cap(shell_engine, tmp_path):
+    shell_engine.config['behavior'] = {'max_command_output_bytes': 20, 'output_flush_interval_ms': 0}
+    mock_process = _make_streaming_process([b"first line\n", b"second line\n", b"third line\n"])
+
+    with patch('modules.shell_engine.TrackedProcess.start_shell', return_value=mock_process), \
+         patch('modules.shell_engine.tempfile.tempdir', str(tmp_path)):
+        await shell_engine.execute_shell_command("big", "big")
+
+    messages = [c.args[0] for c in shell_engine.ui_manager.append_output.call_args_list]
+    assert "first line" in messages
+    assert not any("third line" in m for m in messages)
+    spill_files = list(tmp_path.glob("micro_x_output_*.log"))
+    assert len(spill_files) == 1
+    assert spill_files[0].read_text() == "second line\nthird line\n"
+    assert any(f"less {spill_files[0]}" in m for m in messages)
+
+
+@pytest.mark.asyncio
+async def test_execute_shell_command_uses_persistent_shell_backend(shell_engine, tmp_path):
+    shell_engine.config['behavior'] = {'execution_backend': 'persistent_shell', 'output_flush_interval_ms': 0}
+    shell_engine.current_directory = str(tmp_path)
+    (tmp_path / "sub").mkdir()
+    try:
+        with patch('modules.shell_engine.TrackedProcess.start_shell') as mock_sub_shell:
+            await shell_engine.execute_shell_command("export MX_VAR=kept; cd sub", "export MX_VAR=kept; cd sub")
+            await shell_engine.execute_shell_command("echo $MX_VAR", "echo $MX_VAR")
+        mock_sub_shell.assert_not_called()
+    finally:
+        await shell_engine.shutdown()
+
+    assert shell_engine.current_directory == str(tmp_path / "sub")
+    shell_engine.ui_manager.update_input_prompt.assert_called_with(str(tmp_path / "sub"))
+    shell_engine.ui_manager.append_output.assert_any_call("kept")
+    assert shell_engine.persistent_shell is None
+
 @pytest.mark.asyncio
 async def test_execute_shell_command_empty_command(shell_engine):
     await shell_engine.execute_shell_command("  ", "empty_input")
@@ -299,65 +372,146 @@ async def test_execute_shell_command_empty_command(shell_engine):
 
 # --- Tests for execute_command_in_tmux ---
 
+def _fake_tmux_exec(output: bytes, waiter_process, launch_process):
+    """Returns a create_subprocess_exec replacement whose 'new-window' writes output into the capture FIFO."""
+    async def fake_exec(*args, **kwargs):
+        if args[1] == "new-window":
+            fifo_path = shlex.split(re.search(r"\|& tee ([^;\s]+)", args[4]).group(1))[0]
+            fd = os.open(fifo_path, os.O_WRONLY)
+            os.write(fd, output)
+            os.close(fd)
+            return launch_process
+        return waiter_process
+    return fake_exec
+
 @pytest.mark.asyncio
-async def test_execute_command_in_tmux_semi_interactive_success(shell_engine, mocker):
+async def test_execute_command_in_tmux_semi_interactive_success(shell_engine):
+    shell_engine.config['behavior']['output_flush_interval_ms'] = 0
     mock_tmux_launch_process = AsyncMock(returncode=0)
-    mock_tmux_launch_process.communicate.return_value = (b"", b"")
-
-    # Simulate window closing: first check finds it, second does not
-    mock_tmux_check_process = AsyncMock(returncode=0)
-    mock_tmux_check_process.communicate.side_effect = [(b"window_name_1\n", b""), (b"", b"")]
+    # The 'tmux wait-for' process returns as soon as the window signals completion
+    mock_tmux_waiter_process = AsyncMock(returncode=0)
+    fake_exec = _fake_tmux_exec(b"semi-interactive command output\n", mock_tmux_waiter_process, mock_tmux_launch_process)
 
-    # Mock the temporary file
-    mock_file = mocker.MagicMock()
-    mock_file.name = "/tmp/fake_temp_log.log"
-    mock_file.read.return_value = "semi-interactive command output"
-    
-    mock_temp_file_context = mocker.MagicMock()
-    mock_temp_file_context.__enter__.return_value = mock_file
-
-    mocker.patch('tempfile.NamedTemporaryFile', return_value=mock_temp_file_context)
-    
     with patch('shutil.which', return_value="/usr/bin/tmux"), \
-         patch('asyncio.create_subprocess_exec', side_effect=[mock_tmux_launch_process, mock_tmux_check_process]), \
-         patch('asyncio.sleep', new_callable=AsyncMock), \
-         patch('modules.output_analyzer.is_tui_like_output', return_value=False):
-        
+         patch('asyncio.create_subprocess_exec', side_effect=fake_exec) as mock_exec:
+
         await shell_engine.execute_command_in_tmux("ping -c 1 example.com", "ping example.com", "semi_interactive")
-        
+
         shell_engine.ui_manager.append_output.assert_any_call(
             "Output from 'ping example.com':\nsemi-interactive command output"
         )
-        mock_file.seek.assert_called_once_with(0)
+
+        # The waiter is started before the window, on a channel derived from the window name
+        waiter_args = mock_exec.call_args_list[0].args
+        launch_args = mock_exec.call_args_list[1].args
+        assert waiter_args[:2] == ("tmux", "wait-for")
+        assert waiter_args[2] == f"{launch_args[3]}_done"
+        assert f"tmux wait-for -S {waiter_args[2]}" in launch_args[4]
+        # The capture FIFO is removed afterwards
+        fifo_path = shlex.split(re.search(r"\|& tee ([^;\s]+)", launch_args[4]).group(1))[0]
+        assert not os.path.exists(os.path.dirname(fifo_path))
 
 @pytest.mark.asyncio
-async def test_execute_command_in_tmux_semi_interactive_tui_detected(shell_engine, mocker):
+async def test_execute_command_in_tmux_semi_interactive_tui_detected(shell_engine):
+    shell_engine.config['behavior']['output_flush_interval_ms'] = 0
     mock_tmux_launch_process = AsyncMock(returncode=0)
-    mock_tmux_launch_process.communicate.return_value = (b"", b"")
-
-    mock_tmux_check_process = AsyncMock(returncode=0)
-    mock_tmux_check_process.communicate.side_effect = [(b"window_name_1\n", b""), (b"", b"")]
-
-    mock_file = mocker.MagicMock()
-    mock_file.name = "/tmp/fake_tui_log.log"
-    mock_file.read.return_value = "\x1B[H\x1B[2Jhtop output with ansi codes"
-
-    mock_temp_file_context = mocker.MagicMock()
-    mock_temp_file_context.__enter__.return_value = mock_file
-
-    mocker.patch('tempfile.NamedTemporaryFile', return_value=mock_temp_file_context)
+    mock_tmux_waiter_process = AsyncMock(returncode=0)
+    fake_exec = _fake_tmux_exec(b"\x1B[H\x1B[2Jhtop output with ansi codes", mock_tmux_waiter_process, mock_tmux_launch_process)
 
     with patch('shutil.which', return_value="/usr/bin/tmux"), \
-         patch('asyncio.create_subprocess_exec', side_effect=[mock_tmux_launch_process, mock_tmux_check_process]), \
-         patch('asyncio.sleep', new_callable=AsyncMock), \
-         patch('modules.output_analyzer.is_tui_like_output', return_value=True):
-        
+         patch('asyncio.create_subprocess_exec', side_effect=fake_exec):
+
         await shell_engine.execute_command_in_tmux("htop", "htop", "semi_interactive")
-        
+
         shell_engine.ui_manager.append_output.assert_any_call(
             "Output from 'htop':\n[Semi-interactive TUI-like output not displayed directly.]\n💡 Tip: Try: /command move \"htop\" interactive_tui", style_class='info'
         )
-        mock_file.seek.assert_called_once_with(0)
+        assert not any("htop output" in c.args[0] and "Tip" not in c.args[0]
+                       for c in shell_engine.ui_manager.append_output.call_args_list)
+
+@pytest.mark.asyncio
+async def test_execute_command_in_tmux_tui_detected_after_output_was_shown(shell_engine):
+    shell_engine.config['behavior']['output_flush_interval_ms'] = 0
+    mock_tmux_launch_process = AsyncMock(returncode=0)
+    mock_tmux_waiter_process = AsyncMock(returncode=0)
+    writer_done = asyncio.Event()
+
+    async def fake_exec(*args, **kwargs):
+        if args[1] != "new-window":
+            return mock_tmux_waiter_process
+        fifo_path = shlex.split(re.search(r"\|& tee ([^;\s]+)", args[4]).group(1))[0]
+        loop = asyncio.get_running_loop()
+
+        def write_in_two_parts():
+            fd = os.open(fifo_path, os.O_WRONLY)
+            os.write(fd, b"Loading...\n")
+            time.sleep(0.2)
+            os.write(fd, b"\x1B[?1049h\x1B[Hmenu")
+            os.close(fd)
+            loop.call_soon_threadsafe(writer_done.set)
+        threading.Thread(target=write_in_two_parts, daemon=True).start()
+        return mock_tmux_launch_process
+
+    async def wait_for_writer(*args, **kwargs):
+        await writer_done.wait()
+        return True
+
+    with patch('shutil.which', return_value="/usr/bin/tmux"), \
+         patch('asyncio.create_subprocess_exec', side_effect=fake_exec), \
+         patch.object(shell_engine, '_wait_for_tmux_window', side_effect=wait_for_writer):
+        await shell_engine.execute_command_in_tmux("mytool", "mytool", "semi_interactive")
+
+    messages = [c.args[0] for c in shell_engine.ui_manager.append_output.call_args_list]
+    assert "Output from 'mytool':\nLoading..." in messages
+    assert messages[-1] == ("[TUI-like output detected; the remaining output was not displayed.]\n"
+                            "💡 Tip: Try: /command move \"mytool\" interactive_tui")
+    assert not any("not displayed directly" in m for m in messages)
+
+@pytest.mark.asyncio
+async def test_wait_for_tmux_window_falls_back_to_window_check(shell_engine):
+    """If no completion signal arrives, a vanished window still ends the wait."""
+    shell_engine.config['timeouts']['tmux_fallback_poll_seconds'] = 0.01
+    never_signalled = asyncio.Event()
+    mock_waiter = AsyncMock()
+    mock_waiter.wait.side_effect = never_signalled.wait
+    mock_check_process = AsyncMock()
+    mock_check_process.communicate.side_effect = [(b"micro_x_abc\nother\n", b""), (b"other\n", b"")]
+
+    with patch('asyncio.create_subprocess_exec', return_value=mock_check_process) as mock_exec:
+        finished = await shell_engine._wait_for_tmux_window("micro_x_abc", mock_waiter, timeout_seconds=5)
+
+    assert finished is True
+    assert mock_exec.call_count == 2
+    assert mock_exec.call_args.args[:2] == ("tmux", "list-windows")
+
+@pytest.mark.asyncio
+async def test_wait_for_tmux_window_does_not_poll_while_the_signal_is_pending(shell_engine):
+    shell_engine.config['timeouts'].pop('tmux_fallback_poll_seconds', None) # The 30s default
+    signalled = asyncio.Event()
+    mock_waiter = AsyncMock()
+    mock_waiter.wait.side_effect = signalled.wait
+    asyncio.get_running_loop().call_later(0.2, signalled.set)
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        finished = await shell_engine._wait_for_tmux_window("micro_x_abc", mock_waiter, timeout_seconds=60)
+
+    assert finished is True
+    mock_exec.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_wait_for_tmux_window_times_out(shell_engine):
+    shell_engine.config['timeouts']['tmux_fallback_poll_seconds'] = 10
+    mock_waiter = AsyncMock()
+    mock_waiter.wait.side_effect = asyncio.Event().wait
+    mock_check_process = AsyncMock()
+    mock_check_process.communicate.return_value = (b"micro_x_abc\n", b"")
+
+    with patch('asyncio.create_subprocess_exec', return_value=mock_check_process) as mock_exec:
+        finished = await shell_engine._wait_for_tmux_window("micro_x_abc", mock_waiter, timeout_seconds=0.05)
+
+    assert finished is False
+    # The window is only checked when the timeout cuts the first wait short, not every second
+    assert mock_exec.call_count == 1
 
 @pytest.mark.asyncio
 async def test_execute_command_in_tmux_interactive_tui_success(shell_engine):
@@ -400,3 +554,231 @@ async def test_submit_user_input_cd_command(shell_engine):
 
         mock_handle_cd.assert_awaited_once_with(user_input)
         mock_process_command.assert_not_awaited()
+
+
+# --- Router pre-filter ---
+
+async def test_should_consult_router_without_tool_index(shell_engine):
+    assert await shell_engine._should_consult_router("show me the weather") is True
+
+
+@pytest.mark.parametrize("score, expected", [(0.3, False), (0.8, True)])
+async def test_should_consult_router_uses_threshold(shell_engine, score, expected):
+    shell_engine.config["intent_classification"] = {"router_prefilter_threshold": 0.5}
+    shell_engine.embedding_manager_instance = MagicMock()
+    shell_engine.embedding_manager_instance.has_tool_index.return_value = True
+    shell_engine.embedding_manager_instance.match_tool = AsyncMock(return_value=("run_tests", score))
+    assert await shell_engine._should_consult_router("run the tests") is expected
+
+
+async def test_submit_user_input_skips_router_for_unrelated_input(shell_engine):
+    shell_engine.embedding_manager_instance = MagicMock()
+    shell_engine.embedding_manager_instance.classify_intent = AsyncMock(return_value=(None, 0.0))
+    shell_engine.embedding_manager_instance.has_tool_index.return_value = True
+    shell_engine.embedding_manager_instance.match_tool = AsyncMock(return_value=("run_tests", 0.1))
+    shell_engine.category_manager_module.classify_command.return_value = shell_engine.category_manager_module.UNKNOWN_CATEGORY_SENTINEL
+    shell_engine.ollama_manager_module.is_ollama_server_running = AsyncMock(return_value=True)
+    shell_engine.ai_handler_module.get_validated_ai_command = AsyncMock(return_value=("ls -la", "ls -la"))
+    shell_engine.process_command = AsyncMock()
+
+    with patch('modules.shell_engine.run_router_agent', new_callable=AsyncMock) as mock_router:
+        await shell_engine.submit_user_input("list everything in this folder")
+
+    mock_router.assert_not_called()
+    shell_engine.process_command.assert_awaited_once()
+
+
+async def test_submit_user_input_drops_input_superseded_during_translation(shell_engine):
+    shell_engine.embedding_manager_instance = None
+    shell_engine.category_manager_module.classify_command.return_value = shell_engine.category_manager_module.UNKNOWN_CATEGORY_SENTINEL
+    shell_engine.ollama_manager_module.is_ollama_server_running = AsyncMock(return_value=True)
+    shell_engine.ai_handler_module.get_validated_ai_command = AsyncMock(side_effect=OllamaRequestCancelled())
+    shell_engine.process_command = AsyncMock()
+
+    with patch('modules.shell_engine.run_router_agent', new_callable=AsyncMock, return_value=None), \
+         patch.object(shell_engine, 'get_router_agent', new_callable=AsyncMock):
+        await shell_engine.submit_user_input("list everything in this folder")
+
+    shell_engine.process_command.assert_not_awaited() # No fallback to running the text as a command
+    assert "superseded" in shell_engine.ui_manager.append_output.call_args[0][0]
+
+
+# --- Lazy router agent ---
+
+async def test_get_router_agent_builds_once_and_rebuilds_on_router_change(shell_engine):
+    shell_engine.config["ai_models"] = {"router": {"model": "router-a"}}
+    assert shell_engine.router_agent_instance is None
+
+    with patch('modules.shell_engine.create_router_agent', side_effect=lambda cfg: MagicMock(name=cfg['ai_models']['router']['model'])) as mock_create, \
+         patch('modules.shell_engine.ollama_client.get_chat_model'):
+        first = await shell_engine.get_router_agent()
+        assert await shell_engine.get_router_agent() is first
+
+        shell_engine.config["ui"] = {"max_prompt_length": 5} # Unrelated change
+        assert await shell_engine.get_router_agent() is first
+        assert mock_create.call_count == 1
+
+        shell_engine.config["ai_models"]["router"]["model"] = "router-b"
+        second = await shell_engine.get_router_agent()
+    assert second is not first
+    assert mock_create.call_count == 2
+
+
+async def test_start_router_agent_warmup_runs_in_background(shell_engine):
+    with patch('modules.shell_engine.create_router_agent', return_value=None) as mock_create:
+        task = shell_engine.start_router_agent_warmup()
+        assert shell_engine.start_router_agent_warmup() is task
+        assert await task is None
+    mock_create.assert_called_once()
+
+# --- Tests for background jobs ---
+
+@pytest.mark.parametrize("user_input, expected", [
+    ("sleep 5 &", (True, "sleep 5")),
+    ("/bg make -j4", (True, "make -j4")),
+    ("make && make install", (False, "make && make install")),
+    ("echo \\&", (False, "echo \\&")),
+])
+def test_split_background_request(user_input, expected):
+    assert ShellEngine._split_background_request(user_input) == expected
+
+@pytest.mark.asyncio
+async def test_submit_user_input_starts_background_job(shell_engine):
+    shell_engine.category_manager_module.classify_command.return_value = "simple"
+    shell_engine.start_background_job = AsyncMock()
+    shell_engine.execute_shell_command = AsyncMock()
+
+    await shell_engine.submit_user_input("sleep 5 &")
+
+    shell_engine.start_background_job.assert_awaited_once_with("sleep 5", "sleep 5 &")
+    shell_engine.execute_shell_command.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_background_request_for_tui_command_runs_in_foreground(shell_engine):
+    shell_engine.category_manager_module.classify_command.return_value = "interactive_tui"
+    shell_engine.start_background_job = AsyncMock()
+    shell_engine.execute_command_in_tmux = AsyncMock()
+
+    await shell_engine.submit_user_input("/bg htop")
+
+    shell_engine.start_background_job.assert_not_called()
+    shell_engine.execute_command_in_tmux.assert_awaited_once_with("htop", "/bg htop", "interactive_tui")
+
+@pytest.mark.asyncio
+async def test_job_builtins_list_follow_and_kill(shell_engine):
+    append_output = shell_engine.ui_manager.append_output
+    try:
+        assert await shell_engine.handle_built_in_command("/jobs") is True
+        append_output.assert_called_with("ℹ️ No background jobs.", style_class='info')
+
+        await shell_engine.start_background_job("echo started; sleep 0.2; echo finished", "demo job")
+        await shell_engine.start_background_job("sleep 30", "sleeper")
+        await shell_engine.handle_built_in_command("/fg 1")
+        messages = [c.args[0] for c in append_output.call_args_list]
+        assert "Output from job [1] 'demo job':" in messages
+        assert messages.index("started") < messages.index("finished")
+        assert any(m.startswith("✅ [1] Done: demo job") for m in messages)
+        assert shell_engine.current_process is None
+
+        await shell_engine.handle_built_in_command("/kill 2")
+        append_output.assert_any_call("🛑 Killed job [2]: sleeper", style_class='success')
+        await shell_engine.handle_built_in_command("/kill 7")
+        append_output.assert_called_with("❌ No such job: [7]. Use /jobs to list jobs.", style_class='error')
+    finally:
+        await shell_engine.shutdown()
+
+# --- Tests for the command ledger and /stats ---
+
+@pytest.mark.asyncio
+async def test_executed_commands_are_recorded_and_shown_by_stats(shell_engine, tmp_path):
+    ledger_path = tmp_path / "ledger.jsonl"
+    shell_engine.config['command_ledger'] = {'path': str(ledger_path)}
+    shell_engine.config['behavior'] = {'output_flush_interval_ms': 0}
+    mock_process = _make_streaming_process([b"built\n"], [b"warning\n"], returncode=2)
+
+    with patch('modules.shell_engine.TrackedProcess.start_shell', return_value=mock_process):
+        await shell_engine.execute_shell_command("make", "make")
+
+    entry = json.loads(ledger_path.read_text())
+    assert entry["command"] == "make" and entry["kind"] == "simple" and entry["backend"] == "subprocess"
+    assert entry["exit_code"] == 2 and entry["output_bytes"] == len("built\nwarning\n")
+    assert entry["wall_seconds"] == 0.01 and entry["cwd"] == shell_engine.current_directory
+
+    assert await shell_engine.handle_built_in_command("/stats 3") is True
+    report = shell_engine.ui_manager.append_output.call_args.args[0]
+    assert report.startswith("📊 1 runs of 1 distinct commands") and "make" in report
+    await shell_engine.handle_built_in_command("/stats many")
+    shell_engine.ui_manager.append_output.assert_called_with("ℹ️ Usage: /stats [N]  (show the top N commands per category)", style_class='info')
+
+def test_tmux_capture_reads_exit_code_and_cpu_times():
+    capture = _TmuxOutputCapture()
+    try:
+        assert capture.read_status() == (None, None, None)
+        with open(capture.status_path, "w") as f:
+            f.write("3\n0m0.001s 0m0.002s\n1m2.500s 0m0.250s\n")
+        assert capture.read_status() == (3, 62.5, 0.25)
+    finally:
+        capture.close()
+    assert not os.path.exists(capture.directory)
+
+# --- Tests for alias expansion ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("/dev", "/dev"),
+    ("/dev --activate", "/dev --activate"),
+    ("/dev --activate now", "/dev --activate"),
+    ("/dev --act", "/dev"),
+    ("/dev  --activate", "/dev"),
+    ("/developer", None),
+    ("/logs -h", "/logs -h"),
+    ("ls", None),
+    ("", None),
+])
+def test_find_longest_alias(text, expected):
+    aliases = {"/dev": "/utils dev", "/dev --activate": "python utils/dev.py --activate", "/logs": "x", "/logs -h": "y"}
+    assert _find_longest_alias(_build_alias_trie(aliases), text) == expected
+
+@pytest.mark.asyncio
+async def test_alias_expansion_uses_longest_alias_and_follows_reloads(shell_engine):
+    shell_engine.aliases = {"/dev": "/utils dev", "/dev --activate": "python utils/dev.py --activate"}
+    shell_engine.category_manager_module.classify_command.return_value = "simple"
+    shell_engine.process_command = AsyncMock()
+
+    assert await shell_engine.handle_built_in_command("/dev --activate --force") is True
+    shell_engine.process_command.assert_awaited_once_with("python utils/dev.py --activate --force", "/dev --activate --force")
+
+    shell_engine._load_and_merge_aliases.return_value = {"/gs": "git status"}
+    shell_engine._reload_aliases()
+    shell_engine.process_command.reset_mock()
+    await shell_engine.handle_built_in_command("/gs -s")
+    shell_engine.process_command.assert_awaited_once_with("git status -s", "/gs -s")
+    await shell_engine.handle_built_in_command("/dev --activate")
+    assert shell_engine.process_command.await_count == 1
+
+
+# --- /ollama utility and the model warm-up of this process ---
+
+@pytest.mark.parametrize("args, stops", [(["stop"], True), (["restart"], True), (["status"], False), ([], False)])
+def test_prepare_ollama_cli_stops_warmup_before_stop_and_restart(shell_engine, args, stops):
+    shell_engine._prepare_ollama_cli(args)
+    assert shell_engine.ollama_manager_module.stop_model_warmup.called is stops
+
+
+@pytest.mark.asyncio
+async def test_finish_ollama_cli_restarts_warmup_once_the_server_is_up(shell_engine):
+    manager = shell_engine.ollama_manager_module
+    manager.is_ollama_server_running = AsyncMock(return_value=True)
+    await shell_engine._finish_ollama_cli(["restart"])
+    manager.start_model_warmup.assert_called_once_with(shell_engine.config)
+    manager.start_model_warmup.reset_mock()
+    manager.is_ollama_server_running = AsyncMock(return_value=False)
+    await shell_engine._finish_ollama_cli(["start"])
+    manager.start_model_warmup.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_finish_ollama_status_reports_warmup_failures_of_this_process(shell_engine):
+    shell_engine.ollama_manager_module.get_model_warmup_failures = MagicMock(return_value={"llama3": "model not found"})
+    await shell_engine._finish_ollama_cli(["status"])
+    shell_engine.ui_manager.append_output.assert_called_once_with(
+        "⚠️ Last warm-up of 'llama3' failed: model not found", style_class='warning')
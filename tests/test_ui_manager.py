@@ -312,9 +312,13 @@ class TestUIConfirmationFlow:
     """Tests for the multi-step AI command confirmation flow."""
 
     @pytest.mark.asyncio
-    @patch('modules.ui_manager.explain_linux_command_with_ai', new_callable=AsyncMock) 
+    @patch('modules.ui_manager.stream_explanation_with_ai', new_callable=AsyncMock)
     async def test_conf_flow_explain_then_execute_yes(self, mock_explain_ai, ui_manager_instance, mock_buffer_input):
-        mock_explain_ai.return_value = "This is a detailed explanation of the command."
+        async def fake_stream(command, config, on_chunk):
+            for piece in ["This is a detailed ", "explanation of the command.", "\nSecond line."]:
+                on_chunk(piece)
+            return "This is a detailed explanation of the command.\nSecond line."
+        mock_explain_ai.side_effect = fake_stream
         command_to_confirm = "ls -la /tmp"
         display_source = "/translate list all in tmp"
         mock_normal_accept_handler = MagicMock() 
@@ -335,16 +339,60 @@ class TestUIConfirmationFlow:
 
         result = await flow_task
         assert result == {'action': 'execute', 'command': command_to_confirm}
-        mock_explain_ai.assert_called_once_with(command_to_confirm, ui_manager_instance.config, ui_manager_instance.append_output)
+        mock_explain_ai.assert_called_once()
+        assert mock_explain_ai.call_args.args[:2] == (command_to_confirm, ui_manager_instance.config)
         assert not ui_manager_instance.confirmation_flow_active
-        
-        explanation_found_in_output = False
-        for call_args in ui_manager_instance.append_output.call_args_list:
-            args, _ = call_args
-            if "This is a detailed explanation of the command." in args[0]:
-                explanation_found_in_output = True
-                break
-        assert explanation_found_in_output, "Explanation was not appended to output"
+
+        appended = [args[0] for args, _ in ui_manager_instance.append_output.call_args_list]
+        assert "This is a detailed explanation of the command." in appended, "Explanation was not appended line by line"
+        assert "Second line." in appended
+
+    @pytest.mark.asyncio
+    @patch('modules.ui_manager.stream_explanation_with_ai', new_callable=AsyncMock)
+    async def test_conf_flow_choice_during_explanation_stream(self, mock_explain_ai, ui_manager_instance, mock_buffer_input):
+        stream_started = asyncio.Event()
+        async def slow_stream(command, config, on_chunk):
+            on_chunk("Partial explanation...\n")
+            stream_started.set()
+            await asyncio.sleep(10)
+        mock_explain_ai.side_effect = slow_stream
+
+        flow_task = asyncio.create_task(
+            ui_manager_instance.prompt_for_command_confirmation("ls", "/translate ls", MagicMock())
+        )
+        await simulate_input_sequence(ui_manager_instance, [('_handle_confirmation_main_choice_response', '5')])
+        await asyncio.wait_for(stream_started.wait(), 1)
+
+        # The decision prompt is live while the explanation is still streaming.
+        await simulate_input_sequence(ui_manager_instance, [('_handle_confirmation_after_explain_response', '6')])
+        assert await asyncio.wait_for(flow_task, 1) == {'action': 'cancel'}
+        ui_manager_instance.explain_stream_task.cancel()
+
+    @pytest.mark.asyncio
+    @patch('modules.ui_manager.stream_explanation_with_ai', new_callable=AsyncMock)
+    async def test_conf_flow_escape_stops_only_the_stream(self, mock_explain_ai, ui_manager_instance, mock_buffer_input):
+        stream_started = asyncio.Event()
+        async def slow_stream(command, config, on_chunk):
+            on_chunk("Partial")
+            stream_started.set()
+            await asyncio.sleep(10)
+        mock_explain_ai.side_effect = slow_stream
+
+        flow_task = asyncio.create_task(
+            ui_manager_instance.prompt_for_command_confirmation("ls", "/translate ls", MagicMock())
+        )
+        await simulate_input_sequence(ui_manager_instance, [('_handle_confirmation_main_choice_response', '5')])
+        await asyncio.wait_for(stream_started.wait(), 1)
+
+        ui_manager_instance.explain_stream_task.cancel() # What the Esc binding does mid-stream
+        await asyncio.sleep(0.02)
+        assert ui_manager_instance.confirmation_flow_active
+        appended = [args[0] for args, _ in ui_manager_instance.append_output.call_args_list]
+        assert "Partial" in appended
+        assert "⏹️ Explanation stopped." in appended
+
+        await simulate_input_sequence(ui_manager_instance, [('_handle_confirmation_after_explain_response', '1')])
+        assert (await flow_task)['action'] == 'execute'
 
 
     @pytest.mark.asyncio
@@ -413,5 +461,68 @@ class TestUIConfirmationFlow:
         assert result == {'action': 'cancel'}
         assert not ui_manager_instance.confirmation_flow_active
 
+class TestUIManagerAppendOutput:
+    """append_output against a real output pane (not the mocked fixture)."""
+
+    @pytest.fixture
+    def live_ui_manager(self, mock_config):
+        mock_config["ui"]["max_output_buffer_lines"] = 20
+        manager = UIManager(mock_config)
+        manager.initialize_ui_elements("> ", history=None, output_buffer_main=[("info", "startup\n")])
+        return manager
+
+    def test_appends_extend_the_store_and_follow_the_end(self, live_ui_manager):
+        live_ui_manager.append_output("first")
+        live_ui_manager.append_output("second\n", style_class="info")
+        store = live_ui_manager.output_field.store
+        assert store.text == "startup\nfirst\nsecond\n"
+        assert live_ui_manager.output_field.control.cursor_row == store.line_count - 1
+
+    def test_trimming_drops_the_oldest_entries_from_the_store(self, live_ui_manager):
+        for i in range(25):
+            live_ui_manager.append_output(f"entry {i}\nmore {i}")
+        store = live_ui_manager.output_field.store
+        assert len(live_ui_manager.output_buffer) <= 20
+        assert store.text == "".join(text for _, text in live_ui_manager.output_buffer)
+
+    def test_scrolled_up_view_keeps_its_line_across_trims(self, live_ui_manager):
+        for i in range(20):
+            live_ui_manager.append_output(f"entry {i}")
+        control = live_ui_manager.output_field.control
+        store = live_ui_manager.output_field.store
+        live_ui_manager.auto_scroll = False
+        control.cursor_row = next(row for row in range(store.line_count) if store.get_line(row) == "entry 14")
+        first_line = store.get_line(0)
+        for i in range(20, 23): # Enough to trim the oldest entries again
+            live_ui_manager.append_output(f"entry {i}")
+        assert store.get_line(0) != first_line
+        assert store.get_line(control.cursor_row) == "entry 14"
+
+class TestUIManagerRenderScheduling:
+    async def test_streamed_appends_are_redrawn_at_the_frame_rate(self, mock_config):
+        mock_config["ui"]["max_frame_rate"] = 20
+        manager = UIManager(mock_config)
+        manager.initialize_ui_elements("> ", history=None, output_buffer_main=[])
+        manager.app = MagicMock(is_running=True)
+        for i in range(200):
+            manager.append_output(f"line {i}")
+        assert manager.app.invalidate.call_count == 1
+        await asyncio.sleep(0.1)
+        assert manager.app.invalidate.call_count == 2
+        assert manager.output_field.store.get_line(199) == "line 199"
+
+    async def test_input_prompt_is_drawn_without_waiting_for_the_frame(self, mock_config):
+        mock_config["ui"]["max_frame_rate"] = 1
+        manager = UIManager(mock_config)
+        manager.initialize_ui_elements("> ", history=None, output_buffer_main=[])
+        manager.app = MagicMock(is_running=True)
+        manager.layout = None
+        manager.append_output("first")
+        manager.append_output("pending until the next frame")
+        assert manager.render_scheduler.pending
+        manager.set_flow_input_mode("[Confirm] ", MagicMock(), is_confirmation=True)
+        assert manager.app.invalidate.call_count == 2
+        assert not manager.render_scheduler.pending
+
 # class TestKeyBindingsInUIManager: 
 #     pass
\ No newline at end of file
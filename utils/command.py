@@ -30,6 +30,16 @@ Forcing Direct Command Execution:
     /command add "<cmd>" <category>  - Adds or updates a command's category.
     /command remove "<cmd>"          - Removes a command from your user settings.
     /command move "<cmd>" <new_cat>  - Moves a command to a different category.
+
+Category Rules:
+  Instead of a full command, a category can hold a rule that covers many commands:
+    prefix:<words>   - Commands starting with these words, e.g. "prefix:git log" (git log -5, git log --oneline).
+    glob:<pattern>   - Shell-style wildcards over the whole command, e.g. "glob:docker * ps".
+    re:<regex>       - A regular expression found in the command, e.g. "re:^make( |$)".
+    base:<program>   - Any invocation of a program, e.g. "base:vim" (also /usr/bin/vim).
+  Exact commands always win over rules. Among rules, the longest matching prefix wins,
+  then globs (the one with the most literal text first), then regexes, then base rules.
+  Example: /command add "prefix:git log" semi_interactive
 """
 
 # --- Path Setup ---
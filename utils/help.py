@@ -40,6 +40,9 @@ Common Commands:
   /test               - Runs the project's test suite.
   /list               - Lists available utility and user scripts.
   /run <script>       - Executes a script from the 'user_scripts' directory.
+  /bg <command>       - Runs a command in the background (same as '<command> &').
+  /jobs               - Lists background jobs; /fg [id] shows a job's output, /kill <id> stops it.
+  /stats [N]          - Shows the slowest and most resource-hungry commands you have run.
   /ollama             - Manage the Ollama service.
   /logs               - Tails the logs for the main, testing, or dev branches.
   /dev                - Manage the multi-branch development environment.
@@ -50,7 +53,7 @@ Common Commands:
 
 For more details on a specific feature, use '/help <topic>'.
 Available Topics:
-  translate, alias, command, config, dev, docs, git_branch, history, keybindings, knowledge, list, logs, ollama, run, security, setup_brew, snapshot, test, tree, update, utilities
+  translate, alias, command, config, dev, docs, git_branch, history, jobs, keybindings, knowledge, list, logs, ollama, run, security, setup_brew, snapshot, test, tree, update, utilities
 """
 
 AI_HELP = """
@@ -154,6 +157,38 @@ Listing Scripts:
   To see a list of all available user scripts, you can use the '/list' command.
 """
 
+JOBS_HELP = """
+micro_X Help: Background Jobs
+
+Long-running commands can run in the background while you keep working.
+
+Starting a job:
+  <command> &         - Runs the command in the background.
+  /bg <command>       - Same as above.
+  Background jobs get no keyboard input, and their output is kept in a per-job buffer
+  (the most recent 'behavior.job_output_max_lines' lines) instead of the output area.
+  Interactive (interactive_tui) commands always run in the foreground.
+
+Managing jobs:
+  /jobs               - Lists jobs with their state, run time and PID. Finished jobs also
+                        show CPU time, peak memory and output size.
+  /fg [id]            - Shows a job's buffered output and follows it until it finishes.
+                        Without an id, the most recent job is used. Ctrl+K stops following
+                        by killing the job.
+  /kill <id>          - Stops a job (SIGTERM, then SIGKILL after 2 seconds).
+
+micro_X reports when a job finishes. Running jobs are stopped when micro_X exits.
+
+Command statistics:
+  Every command micro_X runs (including jobs and /run scripts) is recorded with its
+  wall time, CPU time, peak memory, exit code and output size in the command ledger
+  ('command_ledger.path', default logs/command_ledger.jsonl, one JSON object per line).
+  /stats [N]          - Shows the N (default 5) slowest, most CPU-hungry, most
+                        memory-hungry and most verbose commands, with totals.
+  CPU time is not available for the persistent shell backend, and peak memory is only
+  reported for commands started directly by micro_X that outgrow micro_X itself.
+"""
+
 # --- Main Logic ---
 
 def main():
@@ -178,6 +213,8 @@ def main():
         print(AI_HELP)
     elif topic == 'run':
         print(RUN_HELP)
+    elif topic == 'jobs':
+        print(JOBS_HELP)
     elif topic == 'utilities':
         print(UTILITIES_HELP)
     elif topic in ('alias', 'command', 'config', 'dev', 'docs', 'git_branch', 'history', 'knowledge', 'list', 'logs', 'ollama', 'setup_brew', 'snapshot', 'test', 'tree', 'update'):
@@ -1,18 +1,139 @@
 # utils/lc_explainer.py
 
+import asyncio
 import logging
 import re
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_ollama import ChatOllama
+
+from modules import ollama_manager
+from modules import ollama_scheduler
+from modules import ollama_client
+from modules.explanation_cache import get_explanation_cache, make_cache_key
 
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
 
+
+class ExplanationStreamInterrupted(Exception):
+    """Raised when a stream fails after output was already shown, so it must not be retried."""
+
+
+class ThinkTagStripper:
+    """Removes <think>...</think> sections from text that arrives in arbitrary chunks.
+
+    Tags may be split across chunks, so a possible partial tag at the end of a chunk
+    is held back until the next one arrives. Leading whitespace of the visible text
+    is dropped, matching the .strip() applied to non-streamed explanations.
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self):
+        self._pending = ""
+        self._in_think = False
+        self._started = False
+
+    @staticmethod
+    def _partial_tag_length(text: str, tag: str) -> int:
+        """Returns the length of the longest suffix of text that is a prefix of tag."""
+        for length in range(min(len(text), len(tag) - 1), 0, -1):
+            if text.endswith(tag[:length]):
+                return length
+        return 0
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def feed(self, chunk: str) -> str:
+        """Adds a chunk and returns the visible text that is now certain."""
+        self._pending += chunk
+        visible = []
+        while self._pending:
+            if self._in_think:
+                end = self._pending.find(self.CLOSE_TAG)
+                if end < 0:
+                    keep = self._partial_tag_length(self._pending, self.CLOSE_TAG)
+                    self._pending = self._pending[len(self._pending) - keep:]
+                    break
+                self._pending = self._pending[end + len(self.CLOSE_TAG):]
+                self._in_think = False
+            else:
+                start = self._pending.find(self.OPEN_TAG)
+                if start < 0:
+                    keep = self._partial_tag_length(self._pending, self.OPEN_TAG)
+                    visible.append(self._pending[:len(self._pending) - keep])
+                    self._pending = self._pending[len(self._pending) - keep:]
+                    break
+                visible.append(self._pending[:start])
+                self._pending = self._pending[start + len(self.OPEN_TAG):]
+                self._in_think = True
+        return self._emit("".join(visible))
+
+    def flush(self) -> str:
+        """Returns any held-back text once the stream has ended."""
+        remaining = "" if self._in_think else self._pending
+        self._pending = ""
+        return self._emit(remaining)
+
+
+def _get_explainer_setup(config_param: dict) -> dict | None:
+    """Reads the explainer model, options and prompts from the config, or None if not configured."""
+    explainer_config = config_param.get('ai_models', {}).get('explainer', {})
+    if isinstance(explainer_config, dict):
+        model_name = explainer_config.get('model')
+        model_options = explainer_config.get('options')
+    else:
+        model_name = explainer_config
+        model_options = None
+
+    explainer_prompts = config_param.get('prompts', {}).get('explainer')
+
+    if not model_name or not explainer_prompts:
+        logger.error("Explainer AI model or prompts not configured for LangChain.")
+        return None
+
+    return {
+        "model_name": model_name,
+        "model_options": model_options,
+        "system_prompt": explainer_prompts['system'],
+        "user_prompt_template": explainer_prompts['user_template'],
+    }
+
+
+def _build_chain(setup: dict, config_param: dict):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", setup["system_prompt"]),
+        ("user", setup["user_prompt_template"])
+    ])
+
+    chat_model_args = {}
+    if setup["model_options"]:
+        chat_model_args["options"] = setup["model_options"]
+
+    model = ollama_client.get_chat_model(setup["model_name"], config_param, **chat_model_args)
+
+    output_parser = StrOutputParser()
+
+    return prompt | model | output_parser
+
+
+def _cache_key(command_to_explain: str, setup: dict) -> str:
+    return make_cache_key(command_to_explain, setup["model_name"], setup["model_options"],
+                          setup["system_prompt"], setup["user_prompt_template"])
+
+
 async def get_ai_explanation(command_to_explain: str, config_param: dict) -> str | None:
     """
     Uses a LangChain chain to explain a given Linux command.
 
+    Explanations are served from the persistent explanation cache when the same
+    command was already explained with the same model, options and prompts.
+
     Args:
         command_to_explain: The command string to be explained.
         config_param: The main application configuration object.
@@ -26,50 +147,135 @@ async def get_ai_explanation(command_to_explain: str, config_param: dict) -> str
 
     try:
         # 1. Extract configuration from the dict
-        explainer_config = config_param.get('ai_models', {}).get('explainer', {})
-        if isinstance(explainer_config, dict):
-            model_name = explainer_config.get('model')
-            model_options = explainer_config.get('options')
-        else:
-            model_name = explainer_config
-            model_options = None
-
-        explainer_prompts = config_param.get('prompts', {}).get('explainer')
-
-        if not model_name or not explainer_prompts:
-            logger.error("Explainer AI model or prompts not configured for LangChain.")
+        setup = _get_explainer_setup(config_param)
+        if setup is None:
             return "AI Explainer model/prompts not configured."
+        model_name = setup["model_name"]
 
-        system_prompt = explainer_prompts['system']
-        user_prompt_template = explainer_prompts['user_template']
+        cache = get_explanation_cache(config_param)
+        cache_key = _cache_key(command_to_explain, setup)
+        if cache is not None:
+            cached_explanation = cache.get(cache_key)
+            if cached_explanation:
+                logger.info(f"Serving cached explanation for: '{command_to_explain}'")
+                return cached_explanation
 
         # 2. Set up the LangChain chain
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("user", user_prompt_template)
-        ])
-        
-        chat_model_args = {"model": model_name}
-        if model_options:
-            chat_model_args["options"] = model_options
-            
-        model = ChatOllama(**chat_model_args)
-        
-        output_parser = StrOutputParser()
-
-        chain = prompt | model | output_parser
+        chain = _build_chain(setup, config_param)
 
         # 3. Invoke the chain
         logger.info(f"Invoking LangChain explainer (model: {model_name}) for: '{command_to_explain}'")
-        
-        raw_explanation = await chain.ainvoke({"command_text": command_to_explain})
-        
+
+        scheduler = ollama_scheduler.get_scheduler(config_param)
+        raw_explanation = await ollama_client.call_with_retries(
+            lambda: scheduler.run(
+                model_name, lambda: chain.ainvoke({"command_text": command_to_explain}),
+                priority=ollama_scheduler.PRIORITY_EXPLAIN, group=ollama_scheduler.GROUP_EXPLAIN
+            ),
+            config_param, description=f"Explainer call ({model_name})"
+        )
+
         # Programmatically strip the <think> block as a fallback
         explanation = re.sub(r"<think>.*?</think>", "", raw_explanation, flags=re.DOTALL).strip()
-        
+
         logger.debug(f"LangChain Explainer response: {explanation}")
-        return explanation if explanation else "AI Explainer returned an empty response."
+        if not explanation:
+            return "AI Explainer returned an empty response."
+        if cache is not None:
+            await asyncio.to_thread(cache.put, cache_key, explanation, command=command_to_explain, model_name=model_name)
+        return explanation
 
+    except ollama_scheduler.OllamaRequestCancelled:
+        logger.info(f"Explanation for '{command_to_explain}' was cancelled.")
+        return None
     except Exception as e:
+        ollama_manager.mark_ollama_request_failed(e)
         logger.error(f"Error in LangChain explainer for '{command_to_explain}': {e}", exc_info=True)
         return f"An error occurred during explanation: {e}"
+
+
+async def stream_ai_explanation(command_to_explain: str, config_param: dict, on_chunk) -> str | None:
+    """
+    Explains a Linux command, passing the text to on_chunk as the model produces it.
+
+    <think> sections are removed incrementally, so on_chunk only ever sees visible
+    text. A cached explanation is delivered as a single chunk. The stream runs as
+    an explain-priority request and stops when the 'explain' group is cancelled.
+
+    Args:
+        command_to_explain: The command string to be explained.
+        config_param: The main application configuration object.
+        on_chunk: Callable receiving each new piece of visible text.
+
+    Returns:
+        The complete explanation, an error message (also sent to on_chunk if nothing
+        was streamed yet), or None if the request was cancelled.
+    """
+    logger.info(f"Requesting streamed LangChain explanation for command: '{command_to_explain}'")
+    if not command_to_explain:
+        on_chunk("Cannot explain an empty command.")
+        return "Cannot explain an empty command."
+
+    streamed = []
+
+    def emit(text: str):
+        if text:
+            streamed.append(text)
+            on_chunk(text)
+
+    try:
+        setup = _get_explainer_setup(config_param)
+        if setup is None:
+            emit("AI Explainer model/prompts not configured.")
+            return "AI Explainer model/prompts not configured."
+        model_name = setup["model_name"]
+
+        cache = get_explanation_cache(config_param)
+        cache_key = _cache_key(command_to_explain, setup)
+        if cache is not None:
+            cached_explanation = cache.get(cache_key)
+            if cached_explanation:
+                logger.info(f"Serving cached explanation for: '{command_to_explain}'")
+                emit(cached_explanation)
+                return cached_explanation
+
+        chain = _build_chain(setup, config_param)
+
+        async def consume_stream():
+            stripper = ThinkTagStripper()
+            try:
+                async for chunk in chain.astream({"command_text": command_to_explain}):
+                    emit(stripper.feed(chunk))
+                emit(stripper.flush())
+            except Exception as e:
+                if streamed:
+                    raise ExplanationStreamInterrupted(f"Explanation stream interrupted: {e}") from e
+                raise
+
+        logger.info(f"Streaming LangChain explainer (model: {model_name}) for: '{command_to_explain}'")
+        scheduler = ollama_scheduler.get_scheduler(config_param)
+        await ollama_client.call_with_retries(
+            lambda: scheduler.run(
+                model_name, consume_stream,
+                priority=ollama_scheduler.PRIORITY_EXPLAIN, group=ollama_scheduler.GROUP_EXPLAIN
+            ),
+            config_param, description=f"Explainer stream ({model_name})"
+        )
+
+        explanation = "".join(streamed).strip()
+        if not explanation:
+            emit("AI Explainer returned an empty response.")
+            return "AI Explainer returned an empty response."
+        if cache is not None:
+            await asyncio.to_thread(cache.put, cache_key, explanation, command=command_to_explain, model_name=model_name)
+        return explanation
+
+    except ollama_scheduler.OllamaRequestCancelled:
+        logger.info(f"Streamed explanation for '{command_to_explain}' was cancelled.")
+        return None
+    except Exception as e:
+        ollama_manager.mark_ollama_request_failed(e.__cause__ or e)
+        logger.error(f"Error in streamed LangChain explainer for '{command_to_explain}': {e}", exc_info=True)
+        message = f"An error occurred during explanation: {e}"
+        emit(("\n" if streamed else "") + message)
+        return message
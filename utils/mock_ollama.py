@@ -0,0 +1,594 @@
+#!/usr/bin/env python
+
+# utils/mock_ollama.py
+
+import argparse
+import datetime
+import functools
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+HELP_TEXT = """
+micro_X Help: /utils mock_ollama
+
+Runs a local stand-in for the Ollama HTTP API so the AI pipeline (translation,
+routing, embeddings, RAG) can be tested and benchmarked without real models.
+
+Usage:
+  /utils mock_ollama [options]
+
+Options:
+  --host HOST              Interface to bind (default: 127.0.0.1).
+  --port PORT              Port to listen on (default: 11435). Point micro_X at it
+                           by setting ollama_service.ollama_port in your user config.
+  --script FILE            JSON file with scripted responses (see below).
+  --default-response TEXT  Reply used when no scripted rule matches.
+  --models NAMES           Comma-separated model names reported by /api/tags
+                           (default: mock-model:latest plus every model named in
+                           config/default_config.json).
+  --embedding-dim N        Length of the pseudo-embedding vectors (default: 768).
+  --latency-ms MS          Fixed delay added to every request.
+  --jitter-ms MS           Random extra delay of up to MS per request.
+  --token-latency-ms MS    Delay between streamed chunks.
+  --failure-rate P         Probability (0-1) that a request fails with --failure-status.
+  --failure-status CODE    HTTP status used for injected failures (default: 503).
+  --seed N                 Seed for jitter and failure injection (default: 0).
+  -h, --help               Show this help message.
+
+Script file format:
+  {"rules": [
+     {"match": "list.*files", "response": "ls -la"},
+     {"endpoint": "chat", "model": "router", "match": "weather",
+      "tool_calls": [{"name": "web_search", "arguments": {"query": "weather"}}]},
+     {"match": "explode", "status": 500, "error": "scripted failure"}
+  ]}
+  Rules are tried in order. "match" is a regex searched in the prompt (or the last
+  user message for chat); "endpoint" ("chat" or "generate") and "model" are optional.
+
+Embeddings are deterministic: texts that share words get similar vectors.
+"""
+
+DEFAULT_PORT = 11435
+DEFAULT_MODELS = ["mock-model:latest"]
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "default_config.json")
+DEFAULT_RESPONSE = "<bash>echo 'mock ollama response'</bash>"
+DEFAULT_EMBEDDING_DIM = 768
+MOCK_VERSION = "0.0.0-mock"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _timestamp(moment: datetime.datetime | None = None) -> str:
+    return (moment or _utc_now()).isoformat().replace("+00:00", "Z")
+
+
+@functools.lru_cache(maxsize=4096)
+def _token_direction(token: str, dim: int) -> tuple[float, ...]:
+    """Returns the fixed random direction for one token (cached: drawing it dominates embedding time)."""
+    seed = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    return tuple(rng.gauss(0.0, 1.0) for _ in range(dim))
+
+
+def pseudo_embedding(text: str, dim: int = DEFAULT_EMBEDDING_DIM) -> list[float]:
+    """Returns a deterministic unit vector for the text.
+
+    Each lower-cased word is hashed to a fixed random direction and the directions
+    are summed, so texts sharing words have a high cosine similarity while the same
+    text always maps to the same vector across runs and machines.
+
+    Args:
+        text: The text to embed.
+        dim: Length of the returned vector.
+
+    Returns:
+        A list of floats with unit L2 norm.
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower()) or [text]
+    vector = [0.0] * dim
+    for token in tokens:
+        for i, component in enumerate(_token_direction(token, dim)):
+            vector[i] += component
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def configured_model_names(config_path: str = DEFAULT_CONFIG_PATH) -> list[str]:
+    """Returns DEFAULT_MODELS plus the models named in a micro_X config file.
+
+    Covers every 'ai_models' role and the intent classification embedding model, so
+    the mock answers for the models micro_X actually requests. Falls back to
+    DEFAULT_MODELS if the file cannot be read.
+    """
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read model names from '{config_path}': {e}")
+        return list(DEFAULT_MODELS)
+    names = list(DEFAULT_MODELS)
+    candidates = [role.get("model") for role in config.get("ai_models", {}).values() if isinstance(role, dict)]
+    candidates.append(config.get("intent_classification", {}).get("embedding_model"))
+    for name in candidates:
+        if isinstance(name, str) and name and name not in names:
+            names.append(name)
+    return names
+
+
+def load_script(path: str) -> list[dict]:
+    """Loads scripted response rules from a JSON file.
+
+    The file may hold either a list of rules or an object with a "rules" list.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rules = data.get("rules", []) if isinstance(data, dict) else data
+    if not isinstance(rules, list):
+        raise ValueError(f"Script file '{path}' must contain a list of rules.")
+    return rules
+
+
+class MockOllamaServer:
+    """A small threaded HTTP server that speaks enough of the Ollama API for micro_X.
+
+    Supports /api/chat, /api/generate (both streaming and non-streaming),
+    /api/embed, /api/embeddings, /api/tags, /api/ps, /api/show and /api/version.
+    Latency, jitter and failure injection apply to the model endpoints only, so
+    health probes (/api/tags, /api/ps, /api/version) stay fast and healthy unless
+    latency_all is set.
+
+    Can be used as a context manager in tests:
+
+        with MockOllamaServer(script=[{"match": "hello", "response": "hi"}]) as server:
+            client = ollama.Client(host=server.url)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, models: list[str] | None = None,
+                 script: list[dict] | None = None, default_response: str = DEFAULT_RESPONSE,
+                 embedding_dim: int = DEFAULT_EMBEDDING_DIM, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 token_latency_ms: float = 0.0, failure_rate: float = 0.0, failure_status: int = 503,
+                 seed: int = 0, latency_all: bool = False):
+        self.host = host
+        self.port = port
+        self.models = list(models or DEFAULT_MODELS)
+        self.script = list(script or [])
+        self.default_response = default_response
+        self.embedding_dim = embedding_dim
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_latency_ms = token_latency_ms
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.latency_all = latency_all
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._loaded = {} # model -> expires_at (datetime), mirrors keep_alive for /api/ps
+        self.request_counts = {} # path -> number of requests served
+        self.requests = [] # (path, parsed body) for every request, in order
+        self._httpd = None
+        self._thread = None
+
+    # --- Lifecycle ---
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _bind(self):
+        if self._httpd is None:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+            self._httpd.daemon_threads = True
+            self.port = self._httpd.server_address[1]
+
+    def start(self) -> str:
+        """Starts serving in a background thread and returns the base URL."""
+        self._bind()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        logger.info(f"Mock Ollama server listening on {self.url}")
+        return self.url
+
+    def serve_forever(self):
+        """Serves in the current thread until interrupted."""
+        self._bind()
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        """Stops the server and waits for the background thread to exit."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # --- Behaviour helpers (called from handler threads) ---
+
+    def _record(self, path: str, body: dict):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+            self.requests.append((path, body))
+
+    def _delay_seconds(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _should_fail(self) -> bool:
+        if self.failure_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.failure_rate
+
+    def _find_rule(self, endpoint: str, model: str, text: str) -> dict | None:
+        for rule in self.script:
+            if rule.get("endpoint") not in (None, endpoint):
+                continue
+            if rule.get("model") and rule["model"] not in model:
+                continue
+            pattern = rule.get("match")
+            if pattern and not re.search(pattern, text, re.IGNORECASE | re.DOTALL):
+                continue
+            return rule
+        return None
+
+    def _mark_loaded(self, model: str, keep_alive):
+        seconds = _keep_alive_seconds(keep_alive)
+        with self._lock:
+            if seconds == 0:
+                self._loaded.pop(model, None)
+            else:
+                self._loaded[model] = _utc_now() + datetime.timedelta(seconds=seconds if seconds > 0 else 10 ** 8)
+
+    def _model_entry(self, name: str) -> dict:
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()
+        return {
+            "name": name,
+            "model": name,
+            "modified_at": _timestamp(datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)),
+            "size": 1_000_000,
+            "digest": digest,
+            "details": {"format": "gguf", "family": "mock", "parameter_size": "1B", "quantization_level": "Q4_0"},
+        }
+
+
+def _keep_alive_seconds(keep_alive) -> float:
+    """Converts an Ollama keep_alive value ("5m", "1h", 300, -1) to seconds (-1 means forever)."""
+    if keep_alive is None:
+        return 300
+    if isinstance(keep_alive, (int, float)):
+        return float(keep_alive)
+    match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*([smh]?)\s*", str(keep_alive))
+    if not match:
+        return 300
+    value, unit = float(match.group(1)), match.group(2)
+    return value * {"": 1, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+def _split_words(text: str) -> list[str]:
+    """Splits text into streaming chunks, keeping whitespace attached to each word."""
+    return re.findall(r"\S+\s*|\s+", text) or [""]
+
+
+def _make_handler(server: MockOllamaServer):
+    """Builds a request handler class bound to the given server state."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug("mock_ollama: " + format % args)
+
+        # --- Plumbing ---
+
+        def _read_body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                return {}
+
+        def _send_json(self, payload: dict, status: int = 200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, chunks):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for index, chunk in enumerate(chunks):
+                if index and server.token_latency_ms:
+                    time.sleep(server.token_latency_ms / 1000)
+                line = json.dumps(chunk).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _simulate(self) -> bool:
+            """Applies latency and failure injection. Returns False if a failure was sent."""
+            delay = server._delay_seconds()
+            if delay:
+                time.sleep(delay)
+            if server._should_fail():
+                self._send_json({"error": "mock ollama: injected failure"}, status=server.failure_status)
+                return False
+            return True
+
+        # --- Routing ---
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            server._record(path, {})
+            if server.latency_all and not self._simulate():
+                return
+            if path == "/":
+                body = b"Ollama is running"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif path == "/api/version":
+                self._send_json({"version": MOCK_VERSION})
+            elif path == "/api/tags":
+                self._send_json({"models": [server._model_entry(name) for name in server.models]})
+            elif path == "/api/ps":
+                self._handle_ps()
+            else:
+                self._send_json({"error": f"unknown endpoint {path}"}, status=404)
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            path = self.path.split("?", 1)[0]
+            body = self._read_body()
+            server._record(path, body)
+            handlers = {
+                "/api/chat": self._handle_chat,
+                "/api/generate": self._handle_generate,
+                "/api/embed": self._handle_embed,
+                "/api/embeddings": self._handle_legacy_embeddings,
+                "/api/show": self._handle_show,
+            }
+            handler = handlers.get(path)
+            if handler is None:
+                self._send_json({"error": f"unknown endpoint {path}"}, status=404)
+                return
+            if path != "/api/show" and not self._simulate():
+                return
+            handler(body)
+
+        # --- Endpoints ---
+
+        def _handle_ps(self):
+            now = _utc_now()
+            with server._lock:
+                loaded = {name: expires for name, expires in server._loaded.items() if expires > now}
+                server._loaded = loaded
+            models = []
+            for name, expires_at in loaded.items():
+                entry = server._model_entry(name)
+                entry.update(expires_at=_timestamp(expires_at), size_vram=entry["size"])
+                models.append(entry)
+            self._send_json({"models": models})
+
+        def _handle_show(self, body: dict):
+            model = body.get("model") or body.get("name") or ""
+            if not self._known_model(model):
+                return
+            self._send_json({
+                "modelfile": f"FROM {model}",
+                "parameters": "",
+                "template": "{{ .Prompt }}",
+                "details": server._model_entry(model)["details"],
+                "capabilities": ["completion", "tools", "embedding"],
+            })
+
+        def _known_model(self, model: str) -> bool:
+            """Accepts configured names with or without the ':latest' tag; sends 404 otherwise."""
+            names = set(server.models) | {name.split(":", 1)[0] for name in server.models if name.endswith(":latest")}
+            if model in names:
+                return True
+            self._send_json({"error": f"model '{model}' not found"}, status=404)
+            return False
+
+        def _scripted_reply(self, endpoint: str, model: str, text: str):
+            """Returns (content, tool_calls) for the request, or None if a scripted error was sent."""
+            rule = server._find_rule(endpoint, model, text)
+            if rule is None:
+                return server.default_response, []
+            if rule.get("status"):
+                self._send_json({"error": rule.get("error", "mock ollama: scripted failure")}, status=int(rule["status"]))
+                return None
+            if rule.get("delay_ms"):
+                time.sleep(rule["delay_ms"] / 1000)
+            tool_calls = [
+                {"function": {"name": call["name"], "arguments": call.get("arguments", {})}}
+                for call in rule.get("tool_calls", [])
+            ]
+            return rule.get("response", ""), tool_calls
+
+        def _stats(self, prompt_text: str, content: str, started: float) -> dict:
+            elapsed_ns = int((time.monotonic() - started) * 1e9)
+            return {
+                "done_reason": "stop",
+                "total_duration": elapsed_ns,
+                "load_duration": 0,
+                "prompt_eval_count": len(_TOKEN_PATTERN.findall(prompt_text)),
+                "prompt_eval_duration": 0,
+                "eval_count": len(_split_words(content)),
+                "eval_duration": elapsed_ns,
+            }
+
+        def _handle_generate(self, body: dict):
+            started = time.monotonic()
+            model = body.get("model", "")
+            if not self._known_model(model):
+                return
+            server._mark_loaded(model, body.get("keep_alive"))
+            prompt = body.get("prompt", "")
+            if not prompt:
+                # An empty prompt only loads (or unloads) the model.
+                self._send_json({"model": model, "created_at": _timestamp(), "response": "", "done": True, "done_reason": "load"})
+                return
+            reply = self._scripted_reply("generate", model, prompt)
+            if reply is None:
+                return
+            content, _ = reply
+            if body.get("stream", True):
+                chunks = [{"model": model, "created_at": _timestamp(), "response": piece, "done": False}
+                          for piece in _split_words(content)]
+                final = {"model": model, "created_at": _timestamp(), "response": "", "done": True}
+                final.update(self._stats(prompt, content, started))
+                self._send_stream(chunks + [final])
+            else:
+                payload = {"model": model, "created_at": _timestamp(), "response": content, "done": True}
+                payload.update(self._stats(prompt, content, started))
+                self._send_json(payload)
+
+        def _handle_chat(self, body: dict):
+            started = time.monotonic()
+            model = body.get("model", "")
+            if not self._known_model(model):
+                return
+            server._mark_loaded(model, body.get("keep_alive"))
+            messages = body.get("messages") or []
+            user_messages = [m.get("content", "") for m in messages if m.get("role") == "user"]
+            text = user_messages[-1] if user_messages else (messages[-1].get("content", "") if messages else "")
+            prompt_text = " ".join(m.get("content", "") or "" for m in messages)
+            reply = self._scripted_reply("chat", model, text)
+            if reply is None:
+                return
+            content, tool_calls = reply
+            if body.get("stream", True):
+                chunks = [{"model": model, "created_at": _timestamp(),
+                           "message": {"role": "assistant", "content": piece}, "done": False}
+                          for piece in _split_words(content)]
+                if tool_calls:
+                    chunks.append({"model": model, "created_at": _timestamp(),
+                                   "message": {"role": "assistant", "content": "", "tool_calls": tool_calls}, "done": False})
+                final = {"model": model, "created_at": _timestamp(), "message": {"role": "assistant", "content": ""}, "done": True}
+                final.update(self._stats(prompt_text, content, started))
+                self._send_stream(chunks + [final])
+            else:
+                message = {"role": "assistant", "content": content}
+                if tool_calls:
+                    message["tool_calls"] = tool_calls
+                payload = {"model": model, "created_at": _timestamp(), "message": message, "done": True}
+                payload.update(self._stats(prompt_text, content, started))
+                self._send_json(payload)
+
+        def _handle_embed(self, body: dict):
+            model = body.get("model", "")
+            if not self._known_model(model):
+                return
+            server._mark_loaded(model, body.get("keep_alive"))
+            inputs = body.get("input", "")
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            embeddings = [pseudo_embedding(text, server.embedding_dim) for text in inputs]
+            self._send_json({"model": model, "embeddings": embeddings,
+                             "prompt_eval_count": sum(len(_TOKEN_PATTERN.findall(t)) for t in inputs)})
+
+        def _handle_legacy_embeddings(self, body: dict):
+            model = body.get("model", "")
+            if not self._known_model(model):
+                return
+            server._mark_loaded(model, body.get("keep_alive"))
+            self._send_json({"embedding": pseudo_embedding(body.get("prompt", ""), server.embedding_dim)})
+
+    return _Handler
+
+
+class HelpAction(argparse.Action):
+    """Custom argparse action to print the detailed help text and exit."""
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(HELP_TEXT)
+        parser.exit()
+
+
+def main():
+    """Parses command-line options and serves the mock API until interrupted."""
+    parser = argparse.ArgumentParser(description="Run a mock Ollama server.", add_help=False)
+    parser.add_argument("-h", "--help", action=HelpAction, help="Show this help message and exit.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--script")
+    parser.add_argument("--default-response", default=DEFAULT_RESPONSE)
+    parser.add_argument("--models")
+    parser.add_argument("--embedding-dim", type=int, default=DEFAULT_EMBEDDING_DIM)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        script = load_script(args.script) if args.script else []
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: Could not load script file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    server = MockOllamaServer(
+        host=args.host, port=args.port,
+        models=[m.strip() for m in args.models.split(",") if m.strip()] if args.models else configured_model_names(),
+        script=script, default_response=args.default_response, embedding_dim=args.embedding_dim,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, token_latency_ms=args.token_latency_ms,
+        failure_rate=args.failure_rate, failure_status=args.failure_status, seed=args.seed,
+    )
+    try:
+        server._bind()
+    except OSError as e:
+        print(f"❌ Error: Could not listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Mock Ollama server listening on {server.url} (models: {', '.join(server.models)}). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nℹ️ Mock Ollama server stopped.")
+
+
+if __name__ == "__main__":
+    main()
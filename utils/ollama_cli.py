@@ -15,7 +15,7 @@ try:
         sys.path.insert(0, project_root)
     # Now we can safely import from modules
     from modules import ollama_manager
-    from main import load_configuration # Import config loader from main
+    from main import load_configuration_early # Import config loader from main
 except ImportError as e:
     print(f"❌ Error: Could not import necessary modules. Ensure this script is run from within the micro_X project structure.", file=sys.stderr)
     print(f"   Details: {e}", file=sys.stderr)
@@ -60,11 +60,9 @@ async def main():
     """Main async function to parse arguments and execute ollama management commands."""
     # Load the main application configuration
     try:
-        # We need to call the global function from main, not an instance method
-        load_configuration()
-        # The configuration is loaded into a global 'config' variable in main.py,
-        # which we need to access.
-        from main import config
+        # main.py loads the merged default/user configuration at import time;
+        # reloading here picks up any edits made since this process started.
+        config = load_configuration_early()
     except Exception as e:
         print(f"❌ Error: Failed to load application configuration: {e}", file=sys.stderr)
         sys.exit(1)